@@ -0,0 +1,281 @@
+--------------------------------------------------------------------------------
+-- HDLRegs adapter for AXI4-Lite.
+--
+-- The write (AW/W/B) and read (AR/R) channels are buffered independently, so
+-- that the adapter accepts a new address, write data and read address in every
+-- clock cycle. One transaction per clock cycle is issued to the register file.
+-- When both a read and a write are pending, they are issued alternately.
+--
+-- The AXI4-Lite outputs are driven from registers only. Set READ_LATENCY to the
+-- number of clock cycles between a read access (regs_cs = '1' and
+-- regs_rnw = '1') and valid data on regs_dataout: 0 for the combinational
+-- read path of the generated register file, or more for a pipelined read path.
+-- The read data buffer holds READ_LATENCY + 2 words, so that reads issue in
+-- every cycle while RREADY is high, and never overflow while it is low.
+--------------------------------------------------------------------------------
+-- Copyright (c) 2013, Guy Eschemann
+-- All rights reserved.
+--
+-- Redistribution and use in source and binary forms, with or without
+-- modification, are permitted provided that the following conditions are met:
+--
+-- 1. Redistributions of source code must retain the above copyright notice, this
+--    list of conditions and the following disclaimer.
+-- 2. Redistributions in binary form must reproduce the above copyright notice,
+--    this list of conditions and the following disclaimer in the documentation
+--    and/or other materials provided with the distribution.
+--
+-- THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+-- ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+-- WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+-- DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+-- ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+-- (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+-- LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+-- ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+-- (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+-- SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+--
+-- The views and conclusions contained in the software and documentation are those
+-- of the authors and should not be interpreted as representing official policies,
+-- either expressed or implied, of the FreeBSD Project.
+--------------------------------------------------------------------------------
+
+library ieee;
+use ieee.std_logic_1164.all;
+
+entity axi4lite_adapter is
+	generic(
+		READ_LATENCY : natural := 0     -- clock cycles from read access to valid regs_dataout
+	);
+	port(
+		-- AXI4-Lite interface
+		S_AXI_ACLK    : in  std_logic;
+		S_AXI_ARESETN : in  std_logic;
+		S_AXI_AWADDR  : in  std_logic_vector(31 downto 0);
+		S_AXI_AWPROT  : in  std_logic_vector(2 downto 0); -- not used
+		S_AXI_AWVALID : in  std_logic;
+		S_AXI_AWREADY : out std_logic;
+		S_AXI_WDATA   : in  std_logic_vector(31 downto 0);
+		S_AXI_WSTRB   : in  std_logic_vector(3 downto 0); -- not implemented yet
+		S_AXI_WVALID  : in  std_logic;
+		S_AXI_WREADY  : out std_logic;
+		S_AXI_BRESP   : out std_logic_vector(1 downto 0);
+		S_AXI_BVALID  : out std_logic;
+		S_AXI_BREADY  : in  std_logic;
+		S_AXI_ARADDR  : in  std_logic_vector(31 downto 0);
+		S_AXI_ARPROT  : in  std_logic_vector(2 downto 0); -- not used
+		S_AXI_ARVALID : in  std_logic;
+		S_AXI_ARREADY : out std_logic;
+		S_AXI_RDATA   : out std_logic_vector(31 downto 0);
+		S_AXI_RRESP   : out std_logic_vector(1 downto 0);
+		S_AXI_RVALID  : out std_logic;
+		S_AXI_RREADY  : in  std_logic;
+		-- register file interface
+		regs_clk      : out std_logic;
+		regs_rst      : out std_logic;
+		regs_addr     : out std_logic_vector(31 downto 0);
+		regs_cs       : out std_logic;
+		regs_rnw      : out std_logic;
+		regs_datain   : out std_logic_vector(31 downto 0);
+		regs_dataout  : in  std_logic_vector(31 downto 0)
+	);
+end entity axi4lite_adapter;
+
+architecture RTL of axi4lite_adapter is
+	constant RDATA_DEPTH : positive := READ_LATENCY + 2;
+
+	type t_word_array is array (natural range <>) of std_logic_vector(31 downto 0);
+
+	-- Input channel buffers: the first entry feeds the register file, the
+	-- second ("skid") entry takes a word accepted while the first is stalled.
+	-- READY is high as long as the skid entry is empty.
+	signal s_aw_valid_r      : std_logic := '0';
+	signal s_aw_addr_r       : std_logic_vector(31 downto 0);
+	signal s_aw_skid_valid_r : std_logic := '0';
+	signal s_aw_skid_addr_r  : std_logic_vector(31 downto 0);
+	signal s_w_valid_r       : std_logic := '0';
+	signal s_w_data_r        : std_logic_vector(31 downto 0);
+	signal s_w_skid_valid_r  : std_logic := '0';
+	signal s_w_skid_data_r   : std_logic_vector(31 downto 0);
+	signal s_ar_valid_r      : std_logic := '0';
+	signal s_ar_addr_r       : std_logic_vector(31 downto 0);
+	signal s_ar_skid_valid_r : std_logic := '0';
+	signal s_ar_skid_addr_r  : std_logic_vector(31 downto 0);
+
+	-- Arbitration
+	signal s_write_ok      : std_logic;
+	signal s_read_ok       : std_logic;
+	signal s_write         : std_logic;
+	signal s_read          : std_logic;
+	signal s_last_read_r   : std_logic := '0';
+
+	-- Write response
+	signal s_bvalid_r : std_logic := '0';
+
+	-- Read data: reads in flight through the read path, and a FIFO of read data
+	signal s_read_pipe     : std_logic_vector(READ_LATENCY downto 0);
+	signal s_read_pipe_r   : std_logic_vector(READ_LATENCY downto 0) := (others => '0');
+	signal s_rdata_fifo_r  : t_word_array(0 to RDATA_DEPTH - 1);
+	signal s_rdata_head_r  : natural range 0 to RDATA_DEPTH - 1 := 0;
+	signal s_rdata_tail_r  : natural range 0 to RDATA_DEPTH - 1 := 0;
+	signal s_rdata_count_r : natural range 0 to RDATA_DEPTH := 0;
+	signal s_reads_r       : natural range 0 to RDATA_DEPTH := 0; -- in flight + buffered
+	signal s_rvalid        : std_logic;
+	signal s_rpop          : std_logic;
+begin
+	regs_clk <= S_AXI_ACLK;
+	regs_rst <= not S_AXI_ARESETN;
+
+	----------------------------------------------------------------------------
+	-- Arbitration: a write needs an address, write data and a free response
+	-- slot; a read needs room in the read data FIFO.
+	----------------------------------------------------------------------------
+	s_write_ok <= s_aw_valid_r and s_w_valid_r and (not s_bvalid_r or S_AXI_BREADY);
+	s_read_ok  <= s_ar_valid_r when s_reads_r < RDATA_DEPTH or s_rpop = '1' else '0';
+	s_read     <= s_read_ok and (not s_write_ok or not s_last_read_r);
+	s_write    <= s_write_ok and not s_read;
+
+	regs_cs     <= s_read or s_write;
+	regs_rnw    <= s_read;
+	regs_addr   <= s_ar_addr_r when s_read = '1' else s_aw_addr_r;
+	regs_datain <= s_w_data_r;
+
+	----------------------------------------------------------------------------
+	-- Input channel buffers
+	----------------------------------------------------------------------------
+	S_AXI_AWREADY <= not s_aw_skid_valid_r;
+	S_AXI_WREADY  <= not s_w_skid_valid_r;
+	S_AXI_ARREADY <= not s_ar_skid_valid_r;
+
+	input_buffers : process(S_AXI_ACLK) is
+	begin
+		if rising_edge(S_AXI_ACLK) then
+			if S_AXI_ARESETN = '0' then
+				s_aw_valid_r      <= '0';
+				s_aw_skid_valid_r <= '0';
+				s_w_valid_r       <= '0';
+				s_w_skid_valid_r  <= '0';
+				s_ar_valid_r      <= '0';
+				s_ar_skid_valid_r <= '0';
+				s_last_read_r     <= '0';
+			else
+				-- write address
+				if s_write = '1' or s_aw_valid_r = '0' then
+					if s_aw_skid_valid_r = '1' then
+						s_aw_addr_r       <= s_aw_skid_addr_r;
+						s_aw_skid_valid_r <= '0';
+					else
+						s_aw_addr_r  <= S_AXI_AWADDR;
+						s_aw_valid_r <= S_AXI_AWVALID;
+					end if;
+				elsif S_AXI_AWVALID = '1' and s_aw_skid_valid_r = '0' then
+					s_aw_skid_addr_r  <= S_AXI_AWADDR;
+					s_aw_skid_valid_r <= '1';
+				end if;
+				-- write data
+				if s_write = '1' or s_w_valid_r = '0' then
+					if s_w_skid_valid_r = '1' then
+						s_w_data_r       <= s_w_skid_data_r;
+						s_w_skid_valid_r <= '0';
+					else
+						s_w_data_r  <= S_AXI_WDATA;
+						s_w_valid_r <= S_AXI_WVALID;
+					end if;
+				elsif S_AXI_WVALID = '1' and s_w_skid_valid_r = '0' then
+					s_w_skid_data_r  <= S_AXI_WDATA;
+					s_w_skid_valid_r <= '1';
+				end if;
+				-- read address
+				if s_read = '1' or s_ar_valid_r = '0' then
+					if s_ar_skid_valid_r = '1' then
+						s_ar_addr_r       <= s_ar_skid_addr_r;
+						s_ar_skid_valid_r <= '0';
+					else
+						s_ar_addr_r  <= S_AXI_ARADDR;
+						s_ar_valid_r <= S_AXI_ARVALID;
+					end if;
+				elsif S_AXI_ARVALID = '1' and s_ar_skid_valid_r = '0' then
+					s_ar_skid_addr_r  <= S_AXI_ARADDR;
+					s_ar_skid_valid_r <= '1';
+				end if;
+				-- alternate between reads and writes when both are pending
+				if s_read = '1' or s_write = '1' then
+					s_last_read_r <= s_read;
+				end if;
+			end if;
+		end if;
+	end process input_buffers;
+
+	----------------------------------------------------------------------------
+	-- Write response
+	----------------------------------------------------------------------------
+	S_AXI_BVALID <= s_bvalid_r;
+	S_AXI_BRESP  <= "00";               -- OKAY
+
+	write_response : process(S_AXI_ACLK) is
+	begin
+		if rising_edge(S_AXI_ACLK) then
+			if S_AXI_ARESETN = '0' then
+				s_bvalid_r <= '0';
+			elsif s_write = '1' then
+				s_bvalid_r <= '1';
+			elsif S_AXI_BREADY = '1' then
+				s_bvalid_r <= '0';
+			end if;
+		end if;
+	end process write_response;
+
+	----------------------------------------------------------------------------
+	-- Read data: regs_dataout is captured READ_LATENCY cycles after the read
+	-- access, into a FIFO that drives the R channel. Bit i of s_read_pipe is
+	-- the read access of i cycles ago.
+	----------------------------------------------------------------------------
+	g_combinatorial_read : if READ_LATENCY = 0 generate
+		s_read_pipe(0) <= s_read;
+	end generate g_combinatorial_read;
+
+	g_pipelined_read : if READ_LATENCY > 0 generate
+		s_read_pipe <= s_read_pipe_r(READ_LATENCY - 1 downto 0) & s_read;
+	end generate g_pipelined_read;
+
+	s_rvalid    <= '1' when s_rdata_count_r > 0 else '0';
+	s_rpop      <= s_rvalid and S_AXI_RREADY;
+
+	S_AXI_RVALID <= s_rvalid;
+	S_AXI_RDATA  <= s_rdata_fifo_r(s_rdata_head_r);
+	S_AXI_RRESP  <= "00";               -- OKAY
+
+	read_data : process(S_AXI_ACLK) is
+		variable count : natural range 0 to RDATA_DEPTH;
+	begin
+		if rising_edge(S_AXI_ACLK) then
+			if S_AXI_ARESETN = '0' then
+				s_read_pipe_r   <= (others => '0');
+				s_rdata_head_r  <= 0;
+				s_rdata_tail_r  <= 0;
+				s_rdata_count_r <= 0;
+				s_reads_r       <= 0;
+			else
+				s_read_pipe_r <= s_read_pipe;
+				count         := s_rdata_count_r;
+				if s_read_pipe(READ_LATENCY) = '1' then
+					s_rdata_fifo_r(s_rdata_tail_r) <= regs_dataout;
+					s_rdata_tail_r                 <= (s_rdata_tail_r + 1) mod RDATA_DEPTH;
+					count                          := count + 1;
+				end if;
+				if s_rpop = '1' then
+					s_rdata_head_r <= (s_rdata_head_r + 1) mod RDATA_DEPTH;
+					count          := count - 1;
+				end if;
+				s_rdata_count_r <= count;
+				if s_read = '1' and s_rpop = '0' then
+					s_reads_r <= s_reads_r + 1;
+				elsif s_read = '0' and s_rpop = '1' then
+					s_reads_r <= s_reads_r - 1;
+				end if;
+			end if;
+		end if;
+	end process read_data;
+
+end architecture RTL;
@@ -0,0 +1,332 @@
+--------------------------------------------------------------------------------
+-- Throughput testbench for the HDLRegs AXI4-Lite adapter.
+--
+-- A model of the generic register file interface, with READ_LATENCY cycles of
+-- read latency, is connected to the adapter. Independent processes drive the
+-- AW, W and AR channels and consume the B and R channels, one beat per cycle.
+-- The testbench checks the read data, and reports the achieved transactions
+-- per clock for back-to-back writes, back-to-back reads, concurrent reads and
+-- writes, and concurrent reads and writes with random RREADY/BREADY.
+--------------------------------------------------------------------------------
+-- Copyright (c) 2013, Guy Eschemann
+-- All rights reserved.
+--
+-- Redistribution and use in source and binary forms, with or without
+-- modification, are permitted provided that the following conditions are met:
+--
+-- 1. Redistributions of source code must retain the above copyright notice, this
+--    list of conditions and the following disclaimer.
+-- 2. Redistributions in binary form must reproduce the above copyright notice,
+--    this list of conditions and the following disclaimer in the documentation
+--    and/or other materials provided with the distribution.
+--
+-- THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+-- ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+-- WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+-- DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+-- ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+-- (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+-- LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+-- ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+-- (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+-- SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+--
+-- The views and conclusions contained in the software and documentation are those
+-- of the authors and should not be interpreted as representing official policies,
+-- either expressed or implied, of the FreeBSD Project.
+--------------------------------------------------------------------------------
+
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+entity axi4lite_adapter_tb is
+	generic(
+		READ_LATENCY     : natural  := 0;
+		NUM_TRANSACTIONS : positive := 1000
+	);
+end entity axi4lite_adapter_tb;
+
+architecture sim of axi4lite_adapter_tb is
+	constant CLK_PERIOD : time     := 10 ns;
+	constant NUM_REGS   : positive := 16;
+	constant NUM_PHASES : positive := 4;
+
+	type t_word_array is array (natural range <>) of std_logic_vector(31 downto 0);
+	type t_count_array is array (1 to NUM_PHASES) of natural;
+
+	-- Phase 1: writes to all registers, phase 2: reads from all registers,
+	-- phase 3: writes to the lower and reads from the upper half of the
+	-- registers, phase 4: the same with the halves swapped and random
+	-- RREADY/BREADY.
+	constant NUM_WRITES : t_count_array := (NUM_TRANSACTIONS, 0, NUM_TRANSACTIONS, NUM_TRANSACTIONS);
+	constant NUM_READS  : t_count_array := (0, NUM_TRANSACTIONS, NUM_TRANSACTIONS, NUM_TRANSACTIONS);
+
+	-- Register index of the i-th write or read in a phase
+	function write_index(phase : natural; i : natural) return natural is
+	begin
+		case phase is
+			when 1      => return i mod NUM_REGS;
+			when 3      => return i mod (NUM_REGS / 2);
+			when others => return NUM_REGS / 2 + i mod (NUM_REGS / 2);
+		end case;
+	end function write_index;
+
+	function read_index(phase : natural; i : natural) return natural is
+	begin
+		case phase is
+			when 2      => return i mod NUM_REGS;
+			when 3      => return NUM_REGS / 2 + i mod (NUM_REGS / 2);
+			when others => return i mod (NUM_REGS / 2);
+		end case;
+	end function read_index;
+
+	-- Phase in which register n was last written before the given phase
+	function written_in(phase : natural; n : natural) return natural is
+	begin
+		if phase = 2 or (phase = 3 and n >= NUM_REGS / 2) then
+			return 1;
+		end if;
+		return 3;
+	end function written_in;
+
+	-- Value written to register n in the given phase
+	function pattern(phase : natural; n : natural) return std_logic_vector is
+	begin
+		return std_logic_vector(to_unsigned(phase * 65536 + 4 * n, 32));
+	end function pattern;
+
+	function address(n : natural) return std_logic_vector is
+	begin
+		return std_logic_vector(to_unsigned(4 * n, 32));
+	end function address;
+
+	signal clk   : std_logic := '0';
+	signal rst_n : std_logic := '0';
+	signal cycle : natural   := 0;
+	signal phase : natural   := 0;
+	signal done  : boolean   := false;
+	signal lfsr  : std_logic_vector(15 downto 0) := x"ACE1";
+
+	signal awaddr  : std_logic_vector(31 downto 0) := (others => '0');
+	signal awvalid : std_logic := '0';
+	signal awready : std_logic;
+	signal wdata   : std_logic_vector(31 downto 0) := (others => '0');
+	signal wvalid  : std_logic := '0';
+	signal wready  : std_logic;
+	signal bresp   : std_logic_vector(1 downto 0);
+	signal bvalid  : std_logic;
+	signal bready  : std_logic;
+	signal araddr  : std_logic_vector(31 downto 0) := (others => '0');
+	signal arvalid : std_logic := '0';
+	signal arready : std_logic;
+	signal rdata   : std_logic_vector(31 downto 0);
+	signal rresp   : std_logic_vector(1 downto 0);
+	signal rvalid  : std_logic;
+	signal rready  : std_logic;
+
+	signal regs_clk     : std_logic;
+	signal regs_rst     : std_logic;
+	signal regs_addr    : std_logic_vector(31 downto 0);
+	signal regs_cs      : std_logic;
+	signal regs_rnw     : std_logic;
+	signal regs_datain  : std_logic_vector(31 downto 0);
+	signal regs_dataout : std_logic_vector(31 downto 0);
+
+	signal responses   : natural := 0; -- B beats in the current phase
+	signal read_beats  : natural := 0; -- R beats in the current phase
+	signal read_errors : natural := 0;
+begin
+
+	clk <= not clk after CLK_PERIOD / 2 when not done;
+
+	cycle_counter : process(clk) is
+	begin
+		if rising_edge(clk) then
+			cycle <= cycle + 1;
+			lfsr  <= lfsr(14 downto 0) & (lfsr(15) xor lfsr(13) xor lfsr(12) xor lfsr(10));
+		end if;
+	end process cycle_counter;
+
+	bready <= lfsr(3) when phase = 4 else '1';
+	rready <= lfsr(7) when phase = 4 else '1';
+
+	dut : entity work.axi4lite_adapter
+		generic map(
+			READ_LATENCY => READ_LATENCY
+		)
+		port map(
+			S_AXI_ACLK    => clk,
+			S_AXI_ARESETN => rst_n,
+			S_AXI_AWADDR  => awaddr,
+			S_AXI_AWPROT  => "000",
+			S_AXI_AWVALID => awvalid,
+			S_AXI_AWREADY => awready,
+			S_AXI_WDATA   => wdata,
+			S_AXI_WSTRB   => "1111",
+			S_AXI_WVALID  => wvalid,
+			S_AXI_WREADY  => wready,
+			S_AXI_BRESP   => bresp,
+			S_AXI_BVALID  => bvalid,
+			S_AXI_BREADY  => bready,
+			S_AXI_ARADDR  => araddr,
+			S_AXI_ARPROT  => "000",
+			S_AXI_ARVALID => arvalid,
+			S_AXI_ARREADY => arready,
+			S_AXI_RDATA   => rdata,
+			S_AXI_RRESP   => rresp,
+			S_AXI_RVALID  => rvalid,
+			S_AXI_RREADY  => rready,
+			regs_clk      => regs_clk,
+			regs_rst      => regs_rst,
+			regs_addr     => regs_addr,
+			regs_cs       => regs_cs,
+			regs_rnw      => regs_rnw,
+			regs_datain   => regs_datain,
+			regs_dataout  => regs_dataout
+		);
+
+	-- Register file model with READ_LATENCY cycles of read latency
+	register_file : process(regs_clk, regs_cs, regs_rnw, regs_addr) is
+		variable regs     : t_word_array(0 to NUM_REGS - 1) := (others => (others => '0'));
+		variable pipeline : t_word_array(0 to READ_LATENCY);
+		variable n        : natural;
+	begin
+		n := to_integer(unsigned(regs_addr(5 downto 2)));
+		if rising_edge(regs_clk) then
+			for i in READ_LATENCY downto 1 loop
+				pipeline(i) := pipeline(i - 1);
+			end loop;
+			if regs_cs = '1' and regs_rnw = '0' then
+				regs(n) := regs_datain;
+			end if;
+		end if;
+		if regs_cs = '1' and regs_rnw = '1' then
+			pipeline(0) := regs(n);
+		else
+			pipeline(0) := (others => 'X');
+		end if;
+		regs_dataout <= pipeline(READ_LATENCY);
+	end process register_file;
+
+	write_address : process is
+	begin
+		for p in 1 to NUM_PHASES loop
+			wait until phase = p;
+			for i in 0 to NUM_WRITES(p) - 1 loop
+				awaddr  <= address(write_index(p, i));
+				awvalid <= '1';
+				loop
+					wait until rising_edge(clk);
+					exit when awready = '1';
+				end loop;
+			end loop;
+			awvalid <= '0';
+		end loop;
+		wait;
+	end process write_address;
+
+	write_data : process is
+	begin
+		for p in 1 to NUM_PHASES loop
+			wait until phase = p;
+			for i in 0 to NUM_WRITES(p) - 1 loop
+				wdata  <= pattern(p, write_index(p, i));
+				wvalid <= '1';
+				loop
+					wait until rising_edge(clk);
+					exit when wready = '1';
+				end loop;
+			end loop;
+			wvalid <= '0';
+		end loop;
+		wait;
+	end process write_data;
+
+	write_response : process is
+	begin
+		for p in 1 to NUM_PHASES loop
+			wait until phase = p;
+			responses <= 0;
+			for i in 0 to NUM_WRITES(p) - 1 loop
+				loop
+					wait until rising_edge(clk);
+					exit when bvalid = '1' and bready = '1';
+				end loop;
+				responses <= i + 1;
+			end loop;
+		end loop;
+		wait;
+	end process write_response;
+
+	read_address : process is
+	begin
+		for p in 1 to NUM_PHASES loop
+			wait until phase = p;
+			for i in 0 to NUM_READS(p) - 1 loop
+				araddr  <= address(read_index(p, i));
+				arvalid <= '1';
+				loop
+					wait until rising_edge(clk);
+					exit when arready = '1';
+				end loop;
+			end loop;
+			arvalid <= '0';
+		end loop;
+		wait;
+	end process read_address;
+
+	read_data : process is
+		variable n      : natural;
+		variable errors : natural := 0;
+	begin
+		for p in 1 to NUM_PHASES loop
+			wait until phase = p;
+			read_beats <= 0;
+			for i in 0 to NUM_READS(p) - 1 loop
+				loop
+					wait until rising_edge(clk);
+					exit when rvalid = '1' and rready = '1';
+				end loop;
+				n := read_index(p, i);
+				if rdata /= pattern(written_in(p, n), n) then
+					report "phase " & integer'image(p) & ": wrong read data from register " & integer'image(n) severity error;
+					errors := errors + 1;
+				end if;
+				read_errors <= errors;
+				read_beats  <= i + 1;
+			end loop;
+		end loop;
+		wait;
+	end process read_data;
+
+	stimulus : process is
+		variable start_cycle  : natural;
+		variable permille     : natural;
+		variable transactions : natural;
+	begin
+		rst_n <= '0';
+		wait for 5 * CLK_PERIOD;
+		wait until rising_edge(clk);
+		rst_n <= '1';
+		for p in 1 to NUM_PHASES loop
+			wait until rising_edge(clk);
+			start_cycle := cycle;
+			phase       <= p;
+			wait until responses = NUM_WRITES(p) and read_beats = NUM_READS(p) and phase = p for NUM_TRANSACTIONS * 100 * CLK_PERIOD;
+			assert responses = NUM_WRITES(p) and read_beats = NUM_READS(p)
+				report "phase " & integer'image(p) & ": timeout" severity failure;
+			transactions := NUM_WRITES(p) + NUM_READS(p);
+			permille     := (transactions * 1000) / (cycle - start_cycle);
+			report "phase " & integer'image(p) & ": " & integer'image(NUM_WRITES(p)) & " writes and " & integer'image(NUM_READS(p)) & " reads in " & integer'image(cycle - start_cycle) & " cycles = " & integer'image(permille / 1000) & "." & integer'image((permille mod 1000) / 100) & integer'image((permille mod 100) / 10) & integer'image(permille mod 10) & " transactions/clock" severity note;
+		end loop;
+		if read_errors = 0 then
+			report "axi4lite_adapter_tb (READ_LATENCY = " & integer'image(READ_LATENCY) & "): all checks passed" severity note;
+		else
+			report "axi4lite_adapter_tb (READ_LATENCY = " & integer'image(READ_LATENCY) & "): " & integer'image(read_errors) & " errors" severity error;
+		end if;
+		done <= true;
+		wait;
+	end process stimulus;
+
+end architecture sim;
@@ -33,6 +33,9 @@ library ieee;
 use ieee.std_logic_1164.all;
 
 entity ipif_adapter is
+	generic(
+		READ_LATENCY : natural range 0 to 1 := 0 -- register file read latency in clock cycles
+	);
 	port(
 		-- IPIF interface
 		Bus2IP_Clk    : in  std_logic;
@@ -58,6 +61,7 @@ entity ipif_adapter is
 end entity ipif_adapter;
 
 architecture RTL of ipif_adapter is
+	signal s_rdack_r : std_logic;
 begin
 	regs_clk     <= Bus2IP_Clk;
 	regs_rst     <= not Bus2IP_Resetn;
@@ -67,7 +71,26 @@ begin
 	regs_datain  <= Bus2IP_Data;
 	IP2Bus_Data  <= regs_dataout;
 	IP2Bus_WrAck <= Bus2IP_CS and not Bus2IP_RNW;
-	IP2Bus_RdAck <= Bus2IP_CS and Bus2IP_RNW;
 	IP2Bus_Error <= '0';
 
+	g_combinatorial_read : if READ_LATENCY = 0 generate
+		IP2Bus_RdAck <= Bus2IP_CS and Bus2IP_RNW;
+	end generate g_combinatorial_read;
+
+	-- registered read path (memories): acknowledge one cycle after the
+	-- register file has sampled the read
+	g_registered_read : if READ_LATENCY = 1 generate
+		rdack : process(Bus2IP_Clk)
+		begin
+			if rising_edge(Bus2IP_Clk) then
+				if Bus2IP_Resetn = '0' then
+					s_rdack_r <= '0';
+				else
+					s_rdack_r <= Bus2IP_CS and Bus2IP_RNW and not s_rdack_r;
+				end if;
+			end if;
+		end process rdack;
+		IP2Bus_RdAck <= s_rdack_r;
+	end generate g_registered_read;
+
 end architecture RTL;
@@ -0,0 +1,209 @@
+#!/usr/bin/python
+
+
+# Copyright (c) 2013, Guy Eschemann
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer. 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+# The views and conclusions contained in the software and documentation are those
+# of the authors and should not be interpreted as representing official policies, 
+# either expressed or implied, of the FreeBSD Project.
+
+
+#
+# HDLRegs benchmark suite: generates parameterized synthetic register
+# specifications and times parsing, elaboration and each code generator.
+#
+# usage: python benchmark.py [--registers 10,100,1000] [--fields 1,8]
+#                            [--auto 0,0.5,1] [--access-mix rw:0.6,ro:0.3,wo:0.1]
+#                            [--repeat 3] [-o results.json] [--compare baseline.json]
+#
+
+import os
+import sys
+import json
+import random
+import argparse
+import datetime
+import platform
+from timeit import default_timer as timer
+
+import hdlregs
+
+# Generators timed by the benchmark, in execution order
+GENERATORS = (hdlregs.HtmlGenerator,
+              hdlregs.HtmlPagesGenerator,
+              hdlregs.CHeaderGenerator,
+              hdlregs.CAccessorHeaderGenerator,
+              hdlregs.CProfileGenerator,
+              hdlregs.VhdlPackageGenerator,
+              hdlregs.VhdlComponentGenerator,
+              hdlregs.VhdlTestbenchGenerator,
+              hdlregs.SystemVerilogPackageGenerator,
+              hdlregs.SystemVerilogModuleGenerator,
+              hdlregs.PythonModuleGenerator,
+              hdlregs.PythonModelGenerator,
+              hdlregs.ResourceEstimator)
+
+ACCESS_MODES = {"rw": "read-write", "ro": "read-only", "wo": "write-only"}
+
+#
+# Returns a synthetic register specification (as JSON data)
+#   num_registers: number of registers
+#   num_fields:    number of fields per register (1..32)
+#   auto_fraction: fraction of registers and fields without explicit addressOffset/bitOffset
+#   access_mix:    list of (access mode, weight) pairs
+#   seed:          random seed, so that the same parameters yield the same spec
+def synthetic_spec(num_registers, num_fields, auto_fraction, access_mix, seed=0):
+    rng = random.Random(seed)
+    field_width = max(1, 32 // num_fields)
+    modes = [mode for mode, weight in access_mix]
+    total_weight = float(sum([weight for mode, weight in access_mix]))
+    def random_access():
+        x = rng.random() * total_weight
+        for mode, weight in access_mix:
+            x -= weight
+            if x < 0:
+                return mode
+        return modes[-1]
+    registers = []
+    for i in range(num_registers):
+        register = {"name": "reg%d" % i,
+                    "description": "synthetic register %d" % i,
+                    "access": random_access()}
+        if rng.random() >= auto_fraction:
+            register["addressOffset"] = "0x%X" % (4 * i)
+        fields = []
+        for j in range(num_fields):
+            field = {"name": "field%d" % j,
+                     "description": "synthetic field %d of register %d" % (j, i),
+                     "bitWidth": field_width}
+            if rng.random() >= auto_fraction:
+                field["bitOffset"] = j * field_width
+            if rng.random() < 0.25:
+                field["access"] = random_access()
+            fields.append(field)
+        register["fields"] = fields
+        registers.append(register)
+    return {"name": "synthetic",
+            "description": "synthetic register map for benchmarking",
+            "width": 32,
+            "registers": registers}
+
+#
+# Times a function, returning the best wall time of 'repeat' runs and the
+# result of the last run
+def best_of(repeat, function, *args):
+    best = None
+    for i in range(repeat):
+        start = timer()
+        result = function(*args)
+        elapsed = timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+#
+# Runs one benchmark case and returns a dict of phase -> seconds
+def run_case(spec_text, repeat):
+    timings = {}
+    timings["parse"], json_data = best_of(repeat, json.loads, spec_text)
+    timings["elaborate"], module = best_of(repeat, hdlregs.Module, json_data)
+    for generator in GENERATORS:
+        timings[generator.__name__], g = best_of(repeat, generator, module)
+    return timings
+
+#
+# Parses a comma-separated list of numbers
+def number_list(text, convert):
+    return [convert(x) for x in text.split(",")]
+
+#
+# Parses an access mix such as 'rw:0.6,ro:0.3,wo:0.1'
+def access_mix(text):
+    mix = []
+    for item in text.split(","):
+        mode, weight = item.split(":")
+        mix.append((ACCESS_MODES[mode], float(weight)))
+    return mix
+
+#
+# Prints a comparison of two result sets, matched by case parameters
+def compare(results, baseline):
+    baseline_cases = dict([(json.dumps(c["params"], sort_keys=True), c["timings"]) for c in baseline["results"]])
+    for case in results["results"]:
+        key = json.dumps(case["params"], sort_keys=True)
+        if key not in baseline_cases:
+            continue
+        print "%s:" % case_name(case["params"])
+        for phase, seconds in sorted(case["timings"].items()):
+            base = baseline_cases[key].get(phase)
+            if base:
+                print "    %-26s %10.6f s  (baseline %10.6f s, x%.2f)" % (phase, seconds, base, seconds / base)
+
+#
+# Returns a short name for a benchmark case
+def case_name(params):
+    return "registers=%d fields=%d auto=%.2f" % (params["registers"], params["fields"], params["auto_fraction"])
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="HDLRegs benchmark suite")
+    parser.add_argument("--registers", default="10,100,1000", help="comma-separated register counts (default: %(default)s)")
+    parser.add_argument("--fields", default="1,8", help="comma-separated field counts per register (default: %(default)s)")
+    parser.add_argument("--auto", default="0,0.5,1", help="comma-separated fractions of auto-placed offsets (default: %(default)s)")
+    parser.add_argument("--access-mix", default="rw:0.6,ro:0.3,wo:0.1", help="access-mode weights (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per phase, the best time is reported (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the synthetic specs (default: %(default)s)")
+    parser.add_argument("-o", "--output", help="write the results to a JSON file")
+    parser.add_argument("--compare", help="compare the results against a previous JSON results file")
+    args = parser.parse_args()
+
+    mix = access_mix(args.access_mix)
+    results = {"hdlregs_version": hdlregs.HDLREGS_VERSION,
+               "python_version": platform.python_version(),
+               "date_time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+               "access_mix": args.access_mix,
+               "repeat": args.repeat,
+               "results": []}
+    devnull = open(os.devnull, 'w')
+    for num_registers in number_list(args.registers, int):
+        for num_fields in number_list(args.fields, int):
+            for auto_fraction in number_list(args.auto, float):
+                params = dict(registers=num_registers, fields=num_fields, auto_fraction=auto_fraction, seed=args.seed)
+                spec_text = json.dumps(synthetic_spec(num_registers, num_fields, auto_fraction, mix, args.seed))
+                # silence the elaboration messages
+                stdout = sys.stdout
+                sys.stdout = devnull
+                try:
+                    timings = run_case(spec_text, args.repeat)
+                finally:
+                    sys.stdout = stdout
+                results["results"].append({"params": params, "timings": timings})
+                print "%-40s total %.4f s (elaborate %.4f s)" % (case_name(params), sum(timings.values()), timings["elaborate"])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(results, json.load(f))
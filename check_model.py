@@ -0,0 +1,151 @@
+#!/usr/bin/python
+
+
+# Copyright (c) 2013, Guy Eschemann
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer. 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# 
+# The views and conclusions contained in the software and documentation are those
+# of the authors and should not be interpreted as representing official policies, 
+# either expressed or implied, of the FreeBSD Project.
+
+
+#
+# Python model consistency check: runs the same random stimulus through the
+# batch fast path of the generated model (run()) and through the per-cycle
+# path (bus_read() and clock()), and reports any difference in the read data
+# or in the register and strobe state.
+#
+# usage: python check_model.py [--cycles 10000] [--seed 0] [SPEC.json ...]
+#
+
+import sys
+import json
+import random
+import argparse
+
+import hdlregs
+
+#
+# Register map with read-write, write-only and read-only registers and
+# self-clearing fields, used when no specification is given
+CHECK_SPEC = {"name": "model_check",
+              "description": "register map for the Python model consistency check",
+              "width": 32,
+              "registers": [{"name": "control", "description": "control register", "access": "read-write",
+                             "fields": [{"name": "start", "description": "self-clearing start bit",
+                                         "bitWidth": 1, "selfClear": True},
+                                        {"name": "mode", "description": "mode", "bitWidth": 4}]},
+                            {"name": "command", "description": "command register", "access": "write-only",
+                             "fields": [{"name": "opcode", "description": "self-clearing opcode",
+                                         "bitWidth": 8, "selfClear": True}]},
+                            {"name": "data", "description": "data register", "access": "read-write",
+                             "fields": [{"name": "value", "description": "value", "bitWidth": 32}]},
+                            {"name": "status", "description": "status register", "access": "read-only",
+                             "fields": [{"name": "busy", "description": "busy flag", "bitWidth": 1}]}]}
+
+#
+# Returns the model class generated for a module
+def model_class(module):
+    namespace = {}
+    exec(hdlregs.PythonModelGenerator(module)._code, namespace)
+    for name, value in namespace.items():
+        if name.endswith("RegsModel"):
+            return value
+
+#
+# Runs the stimulus through both paths of a fresh model and returns the list
+# of differences
+def compare_paths(cls, cs, rnw, addr, datain):
+    fast = cls()
+    generic = cls()
+    fast_data = fast.run(cs, rnw, addr, datain)
+    generic_data = generic._run_generic(cs, rnw, addr, datain, None, None)
+    errors = []
+    for cycle, (x, y) in enumerate(zip(fast_data, generic_data)):
+        if x != y:
+            errors.append("cycle %d: run() read %r, per-cycle path read %r" % (cycle, x, y))
+            break
+    if fast.regs != generic.regs:
+        errors.append("register state differs: %r != %r" % (fast.regs, generic.regs))
+    if fast.strobes != generic.strobes:
+        errors.append("strobe state differs: %r != %r" % (fast.strobes, generic.strobes))
+    return errors
+
+#
+# Random bus stimulus over the register addresses of a module (plus one
+# unmapped address), with back-to-back accesses to the same register
+def random_stimulus(module, cycles, seed):
+    rng = random.Random(seed)
+    addresses = [r.addressOffset for r in module.registers] + [max([r.addressOffset for r in module.registers]) + 4]
+    cs, rnw, addr, datain = [], [], [], []
+    for i in range(cycles):
+        cs.append(int(rng.random() < 0.8))
+        rnw.append(rng.randint(0, 1))
+        if i == 0 or rng.random() < 0.5:
+            addr.append(rng.choice(addresses))
+        else:
+            addr.append(addr[-1])
+        datain.append(rng.randint(0, 0xFFFFFFFF))
+    return cs, rnw, addr, datain
+
+#
+# Checks one module, returns the number of failures
+def check_module(module, cycles, seed):
+    cls = model_class(module)
+    failures = 0
+    # directed case: write a self-clearing bit, then read it back in the next cycle
+    for r in module.registers:
+        if r.is_bus_readable() and any([f.selfClear for f in r.fields]):
+            errors = compare_paths(cls, [1, 1], [0, 1], [r.addressOffset] * 2, [0xFFFFFFFF, 0])
+            for error in errors:
+                print "%s: write/read of %s: %s" % (module.name, r.name, error)
+            if errors:
+                failures += 1
+    errors = compare_paths(cls, *random_stimulus(module, cycles, seed))
+    for error in errors:
+        print "%s: random stimulus: %s" % (module.name, error)
+    if errors:
+        failures += 1
+    return failures
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="HDLRegs Python model consistency check")
+    parser.add_argument("--cycles", type=int, default=10000, help="random stimulus cycles per specification (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument("spec", nargs="*", help="JSON specification files (default: a built-in register map)")
+    args = parser.parse_args()
+
+    specs = []
+    for filename in args.spec:
+        with open(filename, 'r') as f:
+            specs.append(json.load(f))
+    if not specs:
+        specs.append(CHECK_SPEC)
+    failures = 0
+    for spec in specs:
+        failures += check_module(hdlregs.Module(spec), args.cycles, args.seed)
+    if failures:
+        print "FAILED (%d)" % failures
+        sys.exit(1)
+    print "OK"
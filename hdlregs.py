@@ -29,9 +29,25 @@
 
 import re
 import sys
+import keyword
 import json
+import os
+import struct
+import argparse
+import bisect
+import cProfile
+from timeit import default_timer
 import datetime
 from string import Template
+from xml.sax.saxutils import escape as xml_escape
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:  # Python 3.9+
+    from xml.etree import ElementTree
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 # ------------------------------------------------------------------------------
 # Constants
@@ -41,22 +57,88 @@ HDLREGS_VERSION = "0.5"
 
 INDENTATION_WIDTH = 4
 
-RESERVED_VHDL_KEYWORDS = ("abs", "access", "after", "alias", "all", "and", "architecture", "array", "assert", "attribute", "begin", "block", "body", "buffer", "bus", "case", "component", "configuration", "constant", "disconnect", "downto", "else", "elsif", "end", "entity", "exit", "file", "for", "function", "generate", "generic", "group", "guarded", "if", "impure", "in", "inertial", "inout", "is", "label", "library", "linkage", "literal", "loop", "map", "mod", "nand", "new", "next", "nor", "not", "null", "of", "on", "open", "or", "others", "out", "package", "port", "postponed", "procedure", "process", "pure", "range", "record", "register", "reject", "rem", "report", "return", "rol", "ror", "select", "severity", "signal", "shared", "sla", "sll", "sra", "srl", "subtype", "then", "to", "transport", "type", "unaffected", "units", "until", "use", "variable", "wait", "when", "while", "with", "xnor", "xor")
+# Generation date in the header of generated files, e.g. '2013-12-17 21:45'
+GENERATION_DATE = re.compile(r'\d{4}-\d\d-\d\d \d\d:\d\d')
 
-RESERVED_C_KEYWORDS  = ("auto", "else", "long", "switch", "break", "enum", "register", "typedef", "case", "extern", "return", "union", "char", "float", "short", "unsigned", "const", "for", "signed", "void", "continue", "goto", "sizeof", "volatile", "default", "if", "static", "while", "do", "int", "struct", "_Packed", "double")
+RESERVED_VHDL_KEYWORDS = frozenset(("abs", "access", "after", "alias", "all", "and", "architecture", "array", "assert", "attribute", "begin", "block", "body", "buffer", "bus", "case", "component", "configuration", "constant", "disconnect", "downto", "else", "elsif", "end", "entity", "exit", "file", "for", "function", "generate", "generic", "group", "guarded", "if", "impure", "in", "inertial", "inout", "is", "label", "library", "linkage", "literal", "loop", "map", "mod", "nand", "new", "next", "nor", "not", "null", "of", "on", "open", "or", "others", "out", "package", "port", "postponed", "procedure", "process", "pure", "range", "record", "register", "reject", "rem", "report", "return", "rol", "ror", "select", "severity", "signal", "shared", "sla", "sll", "sra", "srl", "subtype", "then", "to", "transport", "type", "unaffected", "units", "until", "use", "variable", "wait", "when", "while", "with", "xnor", "xor"))
+
+RESERVED_C_KEYWORDS  = frozenset(("auto", "else", "long", "switch", "break", "enum", "register", "typedef", "case", "extern", "return", "union", "char", "float", "short", "unsigned", "const", "for", "signed", "void", "continue", "goto", "sizeof", "volatile", "default", "if", "static", "while", "do", "int", "struct", "_Packed", "double"))
+RESERVED_SYSTEMVERILOG_KEYWORDS = frozenset(("always", "always_comb", "always_ff", "always_latch", "assign", "automatic", "begin", "bit", "break", "byte", "case", "casex", "casez", "class", "const", "continue", "default", "do", "else", "end", "endcase", "endfunction", "endgenerate", "endinterface", "endmodule", "endpackage", "enum", "export", "extern", "final", "for", "force", "forever", "fork", "function", "generate", "genvar", "if", "import", "initial", "inout", "input", "int", "integer", "interface", "join", "localparam", "logic", "longint", "module", "negedge", "new", "null", "output", "package", "packed", "parameter", "posedge", "priority", "real", "reg", "repeat", "return", "shortint", "signed", "static", "string", "struct", "super", "task", "this", "time", "type", "typedef", "union", "unique", "unsigned", "var", "virtual", "void", "wait", "while", "wire"))
+
+# VHDL basic identifier: letter { [ underline ] letter_or_digit }
+IDENTIFIER_PATTERN = re.compile(r'[a-zA-Z](_?[a-zA-Z0-9])*$')
 
+# ------------------------------------------------------------------------------
+# Template compilation
+#
+
+#
+# A string.Template that is split once into its literal and placeholder
+# segments, so that rendering is a sequence of list appends instead of a
+# regular expression substitution. Supports the string.Template syntax
+# ($name, ${name} and $$) and its substitute() interface.
+#
+class CompiledTemplate(object):
+    def __init__(self, template):
+        self.template = template
+        self._segments = []  # (literal text, placeholder name) pairs
+        literal = []
+        pos = 0
+        for match in Template.pattern.finditer(template):
+            literal.append(template[pos:match.start()])
+            pos = match.end()
+            name = match.group("named") or match.group("braced")
+            if name is not None:
+                self._segments.append(("".join(literal), name))
+                literal = []
+            elif match.group("escaped") is not None:
+                literal.append(Template.delimiter)
+            else:
+                raise ValueError("invalid placeholder in template: line %d" % (template.count("\n", 0, match.start()) + 1))
+        literal.append(template[pos:])
+        self._tail = "".join(literal)
+        self.placeholders = frozenset(name for literal, name in self._segments)
+    #
+    # Returns the template filled in with the values of the given mapping
+    # and/or keyword arguments
+    def substitute(self, mapping=None, **kws):
+        if mapping is None:
+            mapping = kws
+        elif kws:
+            mapping = dict(mapping, **kws)
+        parts = []
+        self.render_into(parts, mapping)
+        return "".join(parts)
+    #
+    # Appends the segments of the filled-in template to the list 'parts'
+    def render_into(self, parts, mapping):
+        append = parts.append
+        for literal, name in self._segments:
+            append(literal)
+            append("%s" % (mapping[name],))
+        append(self._tail)
+
+#
+# Returns the compiled form of a template text. Templates are compiled only
+# once, however often they are requested.
+#
+def compile_template(template):
+    try:
+        return _template_cache[template]
+    except KeyError:
+        pass
+    compiled = CompiledTemplate(template)
+    _template_cache[template] = compiled
+    return compiled
+
+_template_cache = {}
+
 # ------------------------------------------------------------------------------
 # String templates for C, VHDL and HTML documents
 #
 
-HTML_DOC_TEMPLATE = Template("""
-<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01//EN"
-        "http://www.w3.org/TR/html4/strict.dtd">
-<html lang="en">
-<head>
-    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
-    <title>Registers in '$module_name' module</title>
-    <style type="text/css" media="screen,print">
+# Style sheet shared by the single- and multi-page HTML documents
+HTML_STYLE = """
 
     body, html{
         margin:0;
@@ -193,7 +275,16 @@ HTML_DOC_TEMPLATE = Template("""
         padding:10px;
     }        
     
-    </style>
+"""
+
+HTML_DOC_TEMPLATE = compile_template("""
+<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01//EN"
+        "http://www.w3.org/TR/html4/strict.dtd">
+<html lang="en">
+<head>
+    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+    <title>Registers in '$module_name' module</title>
+    <style type="text/css" media="screen,print">""" + HTML_STYLE + """    </style>
     
 </head>
 <body>
@@ -224,7 +315,7 @@ $overview
 
 # ------------------------------------------------------------------------------
 
-HTML_REGISTER_TEMPLATE = Template("""    
+HTML_REGISTER_TEMPLATE = compile_template("""    
   <p>
   <a id="$register_name"></a>
   <table class="register">
@@ -241,7 +332,7 @@ HTML_REGISTER_TEMPLATE = Template("""
 
 # ------------------------------------------------------------------------------
 
-HTML_REGISTER_FIELD_TEMPLATE = Template("""
+HTML_REGISTER_FIELD_TEMPLATE = compile_template("""
     <tr class="BitField">
       <td class="BitFieldIndex" rowspan="2">[$field_range]</td>
       <td class="BitFieldName">$field_name</td>
@@ -257,7 +348,96 @@ HTML_REGISTER_FIELD_TEMPLATE = Template("""
 
 # ------------------------------------------------------------------------------
 
-c_header_template = Template("""
+# Page of the multi-page HTML documentation (index or register group page)
+HTML_PAGE_TEMPLATE = compile_template("""<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01//EN"
+        "http://www.w3.org/TR/html4/strict.dtd">
+<html lang="en">
+<head>
+    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+    <title>$title</title>
+    <style type="text/css" media="screen,print">""" + HTML_STYLE + """
+    div#navigation {
+        padding:0 10px;
+    }
+    table#search_results td {
+        padding-left: 1em;
+    }
+    input#search {
+        width: 180px;
+    }
+    table.pages {
+        width: 100%;
+        border-collapse: collapse;
+    }
+    table.pages td {
+        padding: 2px 0.5em;
+    }
+    </style>
+    <script type="text/javascript">
+    // The search index is only loaded (by injecting a script element, which
+    // also works for documents opened from the file system) once the user
+    // starts searching.
+    var hdlregsSearchIndex = null;
+    function hdlregsSearch() {
+        var query = document.getElementById("search").value.toLowerCase();
+        if (hdlregsSearchIndex === null) {
+            if (!document.getElementById("search_index")) {
+                var script = document.createElement("script");
+                script.id = "search_index";
+                script.src = "$search_index";
+                script.onload = hdlregsSearch;
+                document.getElementsByTagName("head")[0].appendChild(script);
+            }
+            return;
+        }
+        var html = "";
+        var count = 0;
+        for (var i = 0; query.length > 0 && i < hdlregsSearchIndex.length && count < $max_results; i++) {
+            var entry = hdlregsSearchIndex[i];  // [name, address, page, anchor]
+            if (entry[0].toLowerCase().indexOf(query) >= 0) {
+                html += '<tr><td><a class="overview" href="' + entry[2] + '#' + entry[3] + '">' + entry[0] + '</a></td><td>' + entry[1] + '</td></tr>';
+                count++;
+            }
+        }
+        document.getElementById("results").innerHTML = html;
+    }
+    </script>
+</head>
+<body>
+
+    <div id="wrap">
+
+        <div id="header">
+            <h1>$title</h1>
+        </div>
+
+        <div id="navigation">
+            <p>$navigation</p>
+        </div>
+
+        <div id="sidebar">
+            <h2>Search</h2>
+            <input id="search" type="text" onfocus="hdlregsSearch()" onkeyup="hdlregsSearch()">
+            <table id="search_results"><tbody id="results"></tbody></table>
+$overview
+        </div>
+
+        <div id="main">
+$main
+        </div>
+
+        <div id="footer">
+        <p>Generated: $date_time by <a href="https://github.com/noasic/hdlregs">HDLRegs</a> version $hdlregs_version</p>
+        </div>
+    </div>
+
+</body>
+</html>
+""")  # html_page_template
+
+# ------------------------------------------------------------------------------
+
+c_header_template = compile_template("""
 // Header for module '${json_module_name}'
 // automatically generated by HDLRegs version $hdlregs_version on $date_time
 
@@ -274,7 +454,83 @@ $fields
 
 # ------------------------------------------------------------------------------
 
-vhdl_package_template = Template("""
+c_accessor_header_template = compile_template("""
+// Register accessors for module '${json_module_name}'
+// automatically generated by HDLRegs version $hdlregs_version on $date_time
+
+#ifndef ${module_name}_ACCESS_H
+#define ${module_name}_ACCESS_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include "${header_file}"
+
+//
+// Register block overlay
+//
+typedef struct {
+$struct_members} ${prefix}_regs_t;
+
+// compile-time checks of the overlay size and member offsets
+typedef char ${prefix}_regs_size_check[(sizeof(${prefix}_regs_t) == 0x$size) ? 1 : -1];
+$offset_checks
+//
+// Shadow copies of the bus-writable bits of registers with write-only fields.
+// Initialize with ${prefix}_shadow_init() whenever the register file is reset.
+//
+typedef struct {
+$shadow_members} ${prefix}_shadow_t;
+
+static inline void ${prefix}_shadow_init(${prefix}_shadow_t *shadow)
+{
+$shadow_init}
+$accessors
+#endif // ${module_name}_ACCESS_H
+""")
+
+# ------------------------------------------------------------------------------
+
+c_profiles_template = compile_template("""
+// Configuration profiles for module '${json_module_name}'
+// automatically generated by HDLRegs version $hdlregs_version on $date_time
+
+#ifndef ${module_name}_PROFILES_H
+#define ${module_name}_PROFILES_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include "${header_file}"
+
+//
+// One register write of a profile: address offset, value and the mask of the
+// fields set by the profile. The fields that the profile does not set are
+// written with their reset values. The tables are sorted by address, and the
+// binary files ${json_module_name}_regs_profile_<name>.bin hold the same entries as
+// little-endian 32-bit words, e.g. for a DMA descriptor list.
+//
+typedef struct {
+    uint32_t addr;
+    uint32_t value;
+    uint32_t mask;
+} ${prefix}_init_t;
+
+//
+// Write the count entries of a profile table to the register block at base
+//
+static inline void ${prefix}_apply_profile(volatile uint32_t *base, const ${prefix}_init_t *table, size_t count)
+{
+    size_t i;
+    for (i = 0; i < count; i++) {
+        base[table[i].addr / 4] = table[i].value;
+    }
+}
+$profiles
+#endif // ${module_name}_PROFILES_H
+""")
+
+# ------------------------------------------------------------------------------
+
+vhdl_package_template = compile_template("""
 -- VHDL package for module '${json_module_name}'
 -- automatically generated by HDLRegs version $hdlregs_version on $date_time
 
@@ -287,20 +543,20 @@ end package $package_name;
 
 # ------------------------------------------------------------------------------
 
-vhdl_component_template = Template("""
+vhdl_component_template = compile_template("""
 -- VHDL component for module '${json_module_name}'
 -- automatically generated by HDLRegs version $hdlregs_version on $date_time
 
 library ieee;
 
 use ieee.std_logic_1164.all;
-use work.$package_name.all;
+${libraries}use work.$package_name.all;
 
 entity $entity_name is
     port(
         clk     : in  std_logic;                     -- system clock
         rst     : in  std_logic;                     -- synchronous, high-active
-        addr    : in  std_logic_vector(31 downto 0); -- read/write address
+${user_ports}        addr    : in  std_logic_vector(31 downto 0); -- read/write address
         cs      : in  std_logic;                     -- chip select
         rnw     : in  std_logic;                     -- read (1) or write (0)
         datain  : in  std_logic_vector(31 downto 0); -- write data
@@ -321,6 +577,699 @@ end architecture RTL;
 
 """)
 
+# ------------------------------------------------------------------------------
+
+systemverilog_package_template = compile_template("""
+// SystemVerilog package for module '${json_module_name}'
+// automatically generated by HDLRegs version $hdlregs_version on $date_time
+
+package $package_name;
+$declarations
+endpackage : $package_name
+""")
+
+# ------------------------------------------------------------------------------
+
+systemverilog_module_template = compile_template("""
+// SystemVerilog module for module '${json_module_name}'
+// automatically generated by HDLRegs version $hdlregs_version on $date_time
+
+module $module_name
+    import $package_name::*;
+(
+    input  logic        clk,       // system clock
+    input  logic        rst,       // synchronous, high-active
+${user_ports}    input  logic [31:0] addr,      // read/write address
+    input  logic        cs,        // chip select
+    input  logic        rnw,       // read (1) or write (0)
+    input  logic [31:0] datain,    // write data
+    output logic [31:0] dataout,   // read data
+    //
+    output t_regs2user  regs2user, // register file -> user logic
+    input  t_user2regs  user2regs  // user logic -> register file
+);
+$signal_declarations
+$register_write_proc
+$register_read_proc
+$concurrent_signal_assignments
+endmodule : $module_name
+""")
+
+# ------------------------------------------------------------------------------
+
+vhdl_testbench_template = compile_template("""
+-- Self-checking VHDL testbench for module '${json_module_name}'
+-- automatically generated by HDLRegs version $hdlregs_version on $date_time
+--
+-- Checks the reset values and the read/write behaviour of every field, then
+-- checks that back-to-back bus writes, each issued once the busy flag of the
+-- previous one has cleared, all cross to the user clock domain, and finally
+-- measures the achieved transactions per clock for back-to-back accesses,
+-- each of which completes when it is acknowledged.
+-- Set USE_IPIF to true to access the register file through
+-- adapters/ipif_adapter.vhd.
+
+library ieee;
+
+use ieee.std_logic_1164.all;
+use work.$package_name.all;
+
+entity $tb_entity_name is
+    generic(
+        USE_IPIF         : boolean := false;
+        NUM_TRANSACTIONS : positive := 1000
+    );
+end entity $tb_entity_name;
+
+architecture sim of $tb_entity_name is
+    type t_addr_array is array (natural range <>) of std_logic_vector(31 downto 0);
+    constant CLK_PERIOD : time := 10 ns;
+    constant PATTERN_A  : std_logic_vector(31 downto 0) := x"A5A5A5A5";
+    constant PATTERN_B  : std_logic_vector(31 downto 0) := x"5A5A5A5A";
+    constant ZERO       : std_logic_vector(31 downto 0) := x"00000000";
+    constant ACK_TIMEOUT : positive := 16; -- clock cycles
+${user_clock_constants}$address_arrays
+    signal clk       : std_logic := '0';
+    signal rst       : std_logic := '1';
+    signal addr      : std_logic_vector(31 downto 0) := (others => '0');
+    signal cs        : std_logic := '0';
+    signal rnw       : std_logic := '1';
+    signal datain    : std_logic_vector(31 downto 0) := (others => '0');
+    signal dataout   : std_logic_vector(31 downto 0);
+    signal wrack     : std_logic;
+    signal rdack     : std_logic := '0';
+    signal regs2user : t_regs2user;
+    signal user2regs : t_user2regs;
+    signal cycle     : natural := 0;
+    signal done      : boolean := false;
+${user_clock_signals}begin
+
+    clk <= not clk after CLK_PERIOD / 2 when not done;
+${user_clock_generation}
+    cycle_counter : process(clk) is
+    begin
+        if rising_edge(clk) then
+            cycle <= cycle + 1;
+        end if;
+    end process cycle_counter;
+$cdc_counters
+    direct : if not USE_IPIF generate
+        dut : entity work.$entity_name
+            port map(
+                clk       => clk,
+                rst       => rst,
+${user_port_map}                addr      => addr,
+                cs        => cs,
+                rnw       => rnw,
+                datain    => datain,
+                dataout   => dataout,
+                regs2user => regs2user,
+                user2regs => user2regs
+            );
+        -- acknowledges of the direct interface: writes complete in the cycle
+        -- in which they are issued, reads after the read latency
+        wrack <= cs and not rnw;
+$direct_rdack    end generate direct;
+
+    ipif : if USE_IPIF generate
+        signal rst_n        : std_logic;
+        signal regs_clk     : std_logic;
+        signal regs_rst     : std_logic;
+        signal regs_addr    : std_logic_vector(31 downto 0);
+        signal regs_cs      : std_logic;
+        signal regs_rnw     : std_logic;
+        signal regs_datain  : std_logic_vector(31 downto 0);
+        signal regs_dataout : std_logic_vector(31 downto 0);
+    begin
+        rst_n <= not rst;
+        adapter : entity work.ipif_adapter
+            generic map(
+                READ_LATENCY => $read_latency
+            )
+            port map(
+                Bus2IP_Clk    => clk,
+                Bus2IP_Resetn => rst_n,
+                Bus2IP_Addr   => addr,
+                Bus2IP_RNW    => rnw,
+                Bus2IP_BE     => "1111",
+                Bus2IP_CS     => cs,
+                Bus2IP_Data   => datain,
+                IP2Bus_Data   => dataout,
+                IP2Bus_WrAck  => wrack,
+                IP2Bus_RdAck  => rdack,
+                IP2Bus_Error  => open,
+                regs_clk      => regs_clk,
+                regs_rst      => regs_rst,
+                regs_addr     => regs_addr,
+                regs_cs       => regs_cs,
+                regs_rnw      => regs_rnw,
+                regs_datain   => regs_datain,
+                regs_dataout  => regs_dataout
+            );
+        dut : entity work.$entity_name
+            port map(
+                clk       => regs_clk,
+                rst       => regs_rst,
+${user_port_map}                addr      => regs_addr,
+                cs        => regs_cs,
+                rnw       => regs_rnw,
+                datain    => regs_datain,
+                dataout   => regs_dataout,
+                regs2user => regs2user,
+                user2regs => user2regs
+            );
+    end generate ipif;
+
+    stimulus : process is
+        variable errors      : natural := 0;
+        variable data        : std_logic_vector(31 downto 0);
+        variable start_cycle : natural;
+        --
+        -- Bus-functional model: signals are driven at the falling edge and
+        -- held until the acknowledge is sampled at a rising edge; the read
+        -- data is sampled with the read acknowledge.
+        procedure wait_ack(signal ack : in std_logic; constant name : in string) is
+        begin
+            for i in 1 to ACK_TIMEOUT loop
+                wait until rising_edge(clk);
+                if ack = '1' then
+                    return;
+                end if;
+            end loop;
+            report "no " & name & " acknowledge within " & integer'image(ACK_TIMEOUT) & " cycles" severity error;
+            errors := errors + 1;
+        end procedure wait_ack;
+        --
+        procedure bus_write(constant a : in std_logic_vector(31 downto 0);
+                            constant d : in std_logic_vector(31 downto 0)) is
+        begin
+            wait until falling_edge(clk);
+            cs     <= '1';
+            rnw    <= '0';
+            addr   <= a;
+            datain <= d;
+            wait_ack(wrack, "write");
+            cs     <= '0';
+        end procedure bus_write;
+        --
+        procedure bus_read(constant a : in std_logic_vector(31 downto 0);
+                           variable d : out std_logic_vector(31 downto 0)) is
+        begin
+            wait until falling_edge(clk);
+            cs   <= '1';
+            rnw  <= '1';
+            addr <= a;
+            wait_ack(rdack, "read");
+            d    := dataout;
+            cs   <= '0';
+        end procedure bus_read;
+        --
+        procedure check(constant actual   : in std_logic_vector;
+                        constant expected : in std_logic_vector;
+                        constant message  : in string) is
+        begin
+            if actual /= expected then
+                report message severity error;
+                errors := errors + 1;
+            end if;
+        end procedure check;
+        --
+        procedure check(constant actual   : in std_logic;
+                        constant expected : in std_logic;
+                        constant message  : in string) is
+        begin
+            if actual /= expected then
+                report message severity error;
+                errors := errors + 1;
+            end if;
+        end procedure check;
+        --
+        procedure check_masked(constant actual   : in std_logic_vector(31 downto 0);
+                               constant expected : in std_logic_vector(31 downto 0);
+                               constant mask     : in std_logic_vector(31 downto 0);
+                               constant message  : in string) is
+        begin
+            check(actual and mask, expected and mask, message);
+        end procedure check_masked;
+        --
+        procedure report_throughput(constant name         : in string;
+                                    constant transactions : in natural;
+                                    constant cycles       : in natural) is
+            variable permille : natural;
+        begin
+            permille := (transactions * 1000) / cycles;
+            report name & ": " & integer'image(transactions) & " transactions in " & integer'image(cycles) & " cycles = " & integer'image(permille / 1000) & "." & integer'image((permille mod 1000) / 100) & integer'image((permille mod 100) / 10) & integer'image(permille mod 10) & " transactions/clock" severity note;
+        end procedure report_throughput;
+${cdc_procedures}    begin
+        -- user-logic inputs idle
+$user2regs_init
+        -- reset
+        for i in 1 to 4 loop
+            wait until falling_edge(clk);
+        end loop;
+        rst <= '0';
+        --
+        -- reset values
+$reset_checks
+        --
+        -- bus-writable fields
+$write_checks
+${cdc_checks}        --
+        -- user-writable fields
+$user_checks
+${memory_checks}        --
+        -- throughput
+$throughput
+        --
+        if errors = 0 then
+            report "$tb_entity_name: all checks passed" severity note;
+        else
+            report "$tb_entity_name: " & integer'image(errors) & " check(s) failed" severity failure;
+        end if;
+        done <= true;
+        wait;
+    end process stimulus;
+
+end architecture sim;
+""")
+
+# Polling of the busy flags of the clock-domain crossings, part of the
+# declarations of the testbench's stimulus process
+cdc_procedure_template = """        --
+        -- Reads a busy flag of the clock-domain crossings until the user clock
+        -- domain has acknowledged the last bus write to its register
+        procedure wait_cdc(constant a     : in std_logic_vector(31 downto 0);
+                           constant index : in natural;
+                           constant name  : in string) is
+            variable d : std_logic_vector(31 downto 0);
+        begin
+            for i in 1 to CDC_POLLS loop
+                bus_read(a, d);
+                if d(index) = '0' then
+                    return;
+                end if;
+            end loop;
+            report "bus write to " & name & " not acknowledged by the user clock domain" severity error;
+            errors := errors + 1;
+        end procedure wait_cdc;
+        --
+        variable start_writes : natural;
+"""
+
+# State of the back-to-back user-logic writes across the clock-domain
+# crossings, part of the declarations of the testbench's stimulus process
+cdc_read_variables_template = """        --
+        variable cdc_cycles   : natural; -- user clock cycles with a user-logic write
+        variable cdc_accepted : natural; -- user-logic writes taken over by the crossing
+        variable cdc_reading  : boolean; -- bus read in progress
+        variable cdc_pattern  : std_logic_vector(31 downto 0);
+        variable cdc_expected : std_logic_vector(31 downto 0);
+"""
+
+# ------------------------------------------------------------------------------
+
+python_module_template = compile_template("""
+# Python register-access module for module '${json_module_name}'
+# automatically generated by HDLRegs version $hdlregs_version on $date_time
+#
+# Example:
+#
+#   with ${class_name}('/dev/uio0') as regs:
+#       value = regs.${example_register}.read()
+#       values = regs.read_many([${example_address}])
+
+import mmap
+import struct
+
+#
+# Register address offsets
+#
+$address_offsets
+#
+# Register block size in bytes
+#
+SIZE = 0x$size
+
+$fields
+#
+# Register layout: address -> (reset value, bus-readable mask, self-clearing mask)
+#
+LAYOUT = {
+$layout}
+
+_WORD = struct.Struct('=I')
+_WORD_MASK = 0xFFFFFFFF
+
+#
+# Returns the (getter, setter) pair of a field property
+def _field_property(field):
+    addr, offset, width = field
+    mask = (2 ** width - 1) << offset
+    def getter(self):
+        return (self._block.read(addr) & mask) >> offset
+    def setter(self, value):
+        self._block.set_field(field, value)
+    return property(getter, setter)
+
+#
+# Base class of the typed register accessors
+class Register(object):
+    ADDRESS = None
+    FIELDS = {}
+    #
+    def __init__(self, block):
+        self._block = block
+    #
+    # Read the whole register
+    def read(self):
+        return self._block.read(self.ADDRESS)
+    #
+    # Write the whole register
+    def write(self, value):
+        self._block.write(self.ADDRESS, value)
+    #
+    # Update several fields with a single register write
+    def update(self, **values):
+        self._block.set_fields([(self.FIELDS[name], value) for name, value in values.items()])
+
+#
+# Memory-mapped register block. 'path' is a UIO device, /dev/mem or a plain
+# file of at least SIZE bytes; 'offset' is the block's byte offset in that file.
+class RegisterBlock(object):
+    #
+    def __init__(self, path, offset=0):
+        page_offset = offset - offset % mmap.ALLOCATIONGRANULARITY
+        self._base = offset - page_offset
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), self._base + SIZE, offset=page_offset)
+        self._shadow = dict((addr, layout[0]) for addr, layout in LAYOUT.items())
+        self._plans = {}
+    #
+    def close(self):
+        self._map.close()
+        self._file.close()
+    #
+    def __enter__(self):
+        return self
+    #
+    def __exit__(self, *args):
+        self.close()
+    #
+    # Read one register. Bits that are not bus-readable (e.g. write-only
+    # fields) are taken from the shadow copy, so write-only registers are
+    # never read from the bus.
+    def read(self, addr):
+        reset, readable, selfclear = LAYOUT[addr]
+        if readable == 0:
+            return self._shadow[addr]
+        value = _WORD.unpack_from(self._map, self._base + addr)[0]
+        return (value & readable) | (self._shadow[addr] & ~readable & _WORD_MASK)
+    #
+    # Write one register and update its shadow copy
+    def write(self, addr, value):
+        _WORD.pack_into(self._map, self._base + addr, value)
+        self._shadow[addr] = value & ~LAYOUT[addr][2] & _WORD_MASK
+    #
+    # Read several registers, returning their values in the given order.
+    # Contiguous addresses are fetched with a single access.
+    def read_many(self, addrs):
+        addrs = tuple(addrs)
+        plan = self._plans.get(addrs)
+        if plan is None:
+            plan = self._plans[addrs] = self._plan([a for a in addrs if LAYOUT[a][1] != 0])
+        values = {}
+        for start, run in plan:
+            words = run.unpack_from(self._map, self._base + start)
+            for i in range(len(words)):
+                values[start + 4 * i] = words[i]
+        result = []
+        for addr in addrs:
+            readable = LAYOUT[addr][1]
+            shadow = self._shadow[addr] & ~readable & _WORD_MASK
+            result.append((values.get(addr, 0) & readable) | shadow)
+        return result
+    #
+    # Write several (address, value) pairs. Contiguous addresses are written
+    # with a single access.
+    def write_many(self, items):
+        items = dict(items)
+        for start, run in self._plan(items.keys()):
+            words = [items[start + 4 * i] for i in range(run.size // 4)]
+            run.pack_into(self._map, self._base + start, *words)
+        for addr, value in items.items():
+            self._shadow[addr] = value & ~LAYOUT[addr][2] & _WORD_MASK
+    #
+    # Read a field, given as an (address, bit offset, bit width) tuple
+    def get_field(self, field):
+        addr, offset, width = field
+        return (self.read(addr) >> offset) & (2 ** width - 1)
+    #
+    # Write a field using a read-modify-write of its register
+    def set_field(self, field, value):
+        self.set_fields([(field, value)])
+    #
+    # Write several fields; fields in the same register are merged into a
+    # single read-modify-write.
+    def set_fields(self, values):
+        updates = {}
+        for (addr, offset, width), value in values:
+            mask = (2 ** width - 1) << offset
+            if addr not in updates:
+                updates[addr] = [0, 0]
+            updates[addr][0] |= mask
+            updates[addr][1] = (updates[addr][1] & ~mask) | ((value << offset) & mask)
+        old = dict(zip(updates.keys(), self.read_many(updates.keys())))
+        self.write_many([(addr, (old[addr] & ~mask & _WORD_MASK) | bits) for addr, (mask, bits) in updates.items()])
+    #
+    # Returns a list of (start address, struct) pairs covering the given
+    # addresses in runs of contiguous registers
+    def _plan(self, addrs):
+        plan = []
+        start = end = None
+        for addr in sorted(set(addrs)):
+            if addr != end:
+                if start is not None:
+                    plan.append((start, struct.Struct('=%dI' % ((end - start) // 4))))
+                start = addr
+            end = addr + 4
+        if start is not None:
+            plan.append((start, struct.Struct('=%dI' % ((end - start) // 4))))
+        return plan
+$registers
+#
+# Register block for module '${json_module_name}' with typed register accessors
+class ${class_name}(RegisterBlock):
+    #
+    def __init__(self, path, offset=0):
+        RegisterBlock.__init__(self, path, offset)
+$register_instances
+""")
+
+# ------------------------------------------------------------------------------
+
+python_model_template = compile_template("""
+# Python behavioural model of the register file of module '${json_module_name}'
+# automatically generated by HDLRegs version $hdlregs_version on $date_time
+#
+# The model follows the generated ${entity_name}.vhd cycle by cycle: clock()
+# models one rising edge of clk (register_write process), bus_read() models
+${bus_read_description}
+# Data that the VHDL component drives as 'X' is returned as None (whole word)
+# or as 0 (bits outside read_mask()).
+
+#
+# Register address offsets
+#
+$address_offsets
+#
+# Register index -> (name, address, reset value)
+#
+REGISTERS = (
+$registers)
+
+#
+# Address -> (register index, bus-writable mask)
+#
+BUS_WRITE = {
+$bus_write}
+
+#
+# Address -> (register index, bus-readable mask)
+#
+BUS_READ = {
+$bus_read}
+
+#
+# Indices of the registers with a strobe signal
+#
+STROBED = ($strobed)
+
+#
+# (register index, mask of the bits to keep) of registers with self-clearing fields
+#
+SELF_CLEAR = ($self_clear)
+
+#
+# (register, field) -> (register index, bit offset, bit mask) of user-writable fields
+#
+USER2REGS = {
+$user2regs}
+
+#
+# (register, field) -> (register index, bit offset, bit mask) of pass-through fields
+#
+PASS_THROUGH = {
+$pass_through}
+
+#
+# (register, field) -> (register index, bit offset, bit mask) of bus-writable fields
+#
+REGS2USER = {
+$regs2user}
+
+class ${class_name}(object):
+    #
+    def __init__(self):
+        self.regs = [r[2] for r in REGISTERS]
+        self.strobes = [0] * len(REGISTERS)
+        self.live = [0] * len(REGISTERS)  # values of the pass-through fields
+    #
+    # Returns the mask of the data bits driven for a read of 'addr'
+    def read_mask(self, addr):
+        entry = BUS_READ.get(addr)
+        if entry is None:
+            return 0
+        return entry[1]
+    #
+    # Read data for the current bus signals (see above)
+    def bus_read(self, cs, rnw, addr):
+        if cs and rnw:
+            entry = BUS_READ.get(addr)
+            if entry is not None:
+                return (self.regs[entry[0]] | self.live[entry[0]]) & entry[1]
+        return None
+    #
+    # One rising clock edge. 'user2regs' maps (register, field) to the value
+    # of the fields whose user2regs strobe is high in this cycle.
+    def clock(self, rst=0, cs=0, rnw=1, addr=0, datain=0, user2regs=None):
+        regs = self.regs
+        if rst:
+            for i in range(len(REGISTERS)):
+                regs[i] = REGISTERS[i][2]
+            return
+        strobes = self.strobes
+        for i in STROBED:
+            strobes[i] = 0
+        for i, keep in SELF_CLEAR:
+            regs[i] &= keep
+        if cs and not rnw:
+            entry = BUS_WRITE.get(addr)
+            if entry is not None:
+                i, mask = entry
+                regs[i] = (regs[i] & ~mask) | (datain & mask)
+                strobes[i] = 1
+        if user2regs:
+            for key, value in user2regs.items():
+                i, offset, mask = USER2REGS[key]
+                regs[i] = (regs[i] & ~mask) | ((value << offset) & mask)
+    #
+    # Drive the value of a pass-through field, which is read without a clock
+    # edge and is not affected by the reset
+    def drive(self, register, field, value):
+        i, offset, mask = PASS_THROUGH[(register, field)]
+        self.live[i] = (self.live[i] & ~mask) | ((value << offset) & mask)
+    #
+    # Returns the (value, strobe) pair of a regs2user field
+    def regs2user(self, register, field):
+        i, offset, mask = REGS2USER[(register, field)]
+        return (self.regs[i] & mask) >> offset, self.strobes[i]
+    #
+    # Bus write transaction (one clock cycle)
+    def write(self, addr, data):
+        self.clock(cs=1, rnw=0, addr=addr, datain=data)
+    #
+    # Bus read transaction (one clock cycle)
+    def read(self, addr):
+        data = self.bus_read(1, 1, addr)
+        self.clock(cs=1, rnw=1, addr=addr)
+        return data
+    #
+    # Apply a batch of stimulus, one clock cycle per element of the equally
+    # long 'cs', 'rnw', 'addr' and 'datain' sequences. 'rst' and 'user2regs'
+    # are optional sequences of per-cycle values (user2regs elements as in
+    # clock()). Returns the list of read data sampled before each clock edge.
+    def run(self, cs, rnw, addr, datain, rst=None, user2regs=None):
+        if rst is not None or user2regs is not None:
+            return self._run_generic(cs, rnw, addr, datain, rst, user2regs)
+        # fast path: bus transactions only
+        regs = self.regs
+        strobes = self.strobes
+        live = self.live
+        bus_read = BUS_READ.get
+        bus_write = BUS_WRITE.get
+        dataout = []
+        append = dataout.append
+        for i in STROBED:
+            strobes[i] = 0
+        strobed = None
+        for cs_i, rnw_i, addr_i, datain_i in zip(cs, rnw, addr, datain):
+            if strobed is not None:
+                strobes[strobed] = 0
+                strobed = None
+            # the read data is sampled before the clock edge, i.e. before
+            # the self-clearing fields are cleared and the write is applied
+            entry = bus_read(addr_i) if cs_i and rnw_i else None
+            if entry is None:
+                append(None)
+            else:
+                append((regs[entry[0]] | live[entry[0]]) & entry[1])
+            for i, keep in SELF_CLEAR:
+                regs[i] &= keep
+            if cs_i and not rnw_i:
+                entry = bus_write(addr_i)
+                if entry is not None:
+                    i, mask = entry
+                    regs[i] = (regs[i] & ~mask) | (datain_i & mask)
+                    strobes[i] = 1
+                    strobed = i
+        return dataout
+    #
+    def _run_generic(self, cs, rnw, addr, datain, rst, user2regs):
+        n = len(cs)
+        if rst is None:
+            rst = [0] * n
+        if user2regs is None:
+            user2regs = [None] * n
+        dataout = []
+        for i in range(n):
+            dataout.append(self.bus_read(cs[i], rnw[i], addr[i]))
+            self.clock(rst[i], cs[i], rnw[i], addr[i], datain[i], user2regs[i])
+        return dataout
+""")
+
+# Templates that can be replaced with --template NAME=FILE
+USER_TEMPLATES = ("HTML_DOC_TEMPLATE", "HTML_REGISTER_TEMPLATE", "HTML_REGISTER_FIELD_TEMPLATE", "HTML_PAGE_TEMPLATE",
+                  "c_header_template", "c_accessor_header_template", "vhdl_package_template", "vhdl_component_template",
+                  "vhdl_testbench_template", "python_module_template", "python_model_template",
+                  "systemverilog_package_template", "systemverilog_module_template", "c_profiles_template")
+
+#
+# Replace one of the USER_TEMPLATES (name case-insensitive) with the template
+# in the given file. The replacement may only use placeholders of the
+# template it replaces.
+def load_template(name, filename):
+    for template_name in USER_TEMPLATES:
+        if template_name.lower() == name.lower():
+            break
+    else:
+        raise ValueError("unknown template '%s' -- valid names are: %s" % (name, ", ".join(USER_TEMPLATES)))
+    with open(filename) as f:
+        template = compile_template(f.read())
+    unknown = template.placeholders - globals()[template_name].placeholders
+    if unknown:
+        raise ValueError("template '%s' uses unknown placeholder(s): %s" % (filename, ", ".join(sorted(unknown))))
+    globals()[template_name] = template
+
 # ------------------------------------------------------------------------------
 # VHDL code blocks
 #
@@ -358,8 +1307,9 @@ class VhdlRecord:
     
 class VhdlPackage:
     #
-    def __init__(self, name):
+    def __init__(self, name, json_module_name):
         self.name = name
+        self.json_module_name = json_module_name
         self.declarations_ = []
     #
     def add_declaration(self, declaration):
@@ -371,7 +1321,7 @@ class VhdlPackage:
             str_declarations += d.to_str(1)
         d = dict(package_name = self.name, 
                  declarations = str_declarations,
-                 json_module_name = module.name,
+                 json_module_name = self.json_module_name,
                  hdlregs_version = HDLREGS_VERSION,
                  date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
         return vhdl_package_template.substitute(d)
@@ -409,6 +1359,15 @@ class VhdlClockedProcess:
         level += 1
         s += indent(level) + "if rising_edge(%s) then\n" % self.clock
         level += 1
+        # without reset statements, the reset branch is omitted
+        if len(self.reset_statements) == 0:
+            for st in self.statements:
+                s += st.to_str(level)
+            level -= 1
+            s += indent(level) + "end if;\n"
+            level -= 1
+            s += indent(level) + 'end process %s;\n' % self.name
+            return s
         s += indent(level) + "if %s = '1' then\n" % self.reset
         level += 1
         for st in self.reset_statements:
@@ -453,6 +1412,24 @@ class VhdlAsyncProcess():
     def __str__(self):
         raise NotImplementedError
         
+# A block of code belonging to one register, delimited by marker comments so
+# that it can be located in the generated file
+class VhdlSection():
+    #
+    def __init__(self, name):
+        self.name = name
+        self.statements = []
+    #
+    def to_str(self, level):
+        s = indent(level) + '-- begin %s\n' % self.name
+        for st in self.statements:
+            s += st.to_str(level)
+        s += indent(level) + '-- end %s\n' % self.name
+        return s
+    #
+    def __str__(self):
+        raise NotImplementedError
+
 class VhdlCodeBlock():
     #
     def __init__(self):
@@ -510,8 +1487,44 @@ class CodeGenerator():
     def bitMask_identifier(self, field):
         return 'MASK_' + field.parent_reg.name.upper() + '_' + field.name.upper()
     #
-    # Returns the name of the record type corresponding to this field
-    def vhdl_record_name(self, field):        
+    # Returns a field's bit mask, e.g. 0x80000000 for a 1-bit field at bit offset 31
+    def bitMask(self, field):
+        return (2 ** field.bitWidth - 1) << field.bitOffset
+    #
+    # Returns the mask of a register's bus-readable bits
+    def bus_readable_mask(self, register):
+        mask = 0
+        for f in register.fields:
+            if f.is_bus_readable():
+                mask |= self.bitMask(f)
+        return mask
+    #
+    # Returns the mask of a register's pass-through bits
+    def pass_through_mask(self, register):
+        mask = 0
+        for f in register.fields:
+            if f.is_pass_through():
+                mask |= self.bitMask(f)
+        return mask
+    #
+    # Returns the mask of a register's bus-writable bits
+    def bus_writable_mask(self, register):
+        mask = 0
+        for f in register.fields:
+            if f.is_bus_writable():
+                mask |= self.bitMask(f)
+        return mask
+    #
+    # Returns the mask of a register's self-clearing bits
+    def selfClear_mask(self, register):
+        mask = 0
+        for f in register.fields:
+            if f.selfClear:
+                mask |= self.bitMask(f)
+        return mask
+    #
+    # Returns the name of the record type corresponding to this field
+    def vhdl_record_name(self, field):        
         return 't_' + field.parent_reg.name.lower() + '_' + field.name.lower()
     #
     # Returns the name of the VHDL package for a module
@@ -533,151 +1546,611 @@ class CodeGenerator():
     # Returns the name of the VHDL entity for a module
     def vhdl_entity_name(self, module):
         return module.name.lower() + '_regs'      
+    #
+    # Returns a field's index range, e.g. 'OFFSET_CONTROL_RESET + WIDTH_CONTROL_RESET - 1 downto OFFSET_CONTROL_RESET'
+    def vhdl_field_range(self, field):
+        return "%s + %s - 1 downto %s" % (self.bitOffset_identifier(field), self.bitWidth_identifier(field), self.bitOffset_identifier(field))
+    #
+    # Returns the name of a register's clock-domain crossing signal, e.g. 's_control_wsync_r'
+    def vhdl_cdc_signal(self, register, kind):
+        return 's_%s_%s_r' % (register.name.lower(), kind)
+    #
+    # Returns True if the user-logic interface of any field of the module is
+    # in the user clock domain
+    def has_user_clock(self, module):
+        return any([f.is_user_clocked() for r in module.registers for f in r.fields]) or any([m.is_user_clocked() for m in module.memories])
+    #
+    # Returns the name of the VHDL code section of a register, e.g. "register 'control'"
+    def vhdl_section_name(self, register):
+        return "register '%s'" % register.name
+    #
+    # Returns the module's registers in canonical order (by address), so that
+    # the generated code does not depend on the order of the specification
+    def sorted_registers(self, module):
+        return sorted(module.registers, key=lambda r: r.addressOffset)
+    #
+    # Returns the register's fields in canonical order (by bit offset)
+    def sorted_fields(self, register):
+        return sorted(register.fields, key=lambda f: f.bitOffset)
+    #
+    # Returns the module's memories in canonical order (by address)
+    def sorted_memories(self, module):
+        return sorted(module.memories, key=lambda m: m.addressOffset)
+    #
+    # Returns a memory's depth identifier, e.g. 'DEPTH_COEFFS'
+    def depth_identifier(self, memory):
+        return 'DEPTH_' + memory.name.upper()
+    #
+    # Returns a memory's word address width identifier, e.g. 'ADDR_WIDTH_COEFFS'
+    def address_width_identifier(self, memory):
+        return 'ADDR_WIDTH_' + memory.name.upper()
+    #
+    # Returns the name of a memory's RAM signal, e.g. 's_coeffs_ram'
+    def vhdl_ram_signal(self, memory):
+        return 's_' + memory.name.lower() + '_ram'
+    #
+    # Returns the name of the VHDL code section of a memory, e.g. "memory 'coeffs'"
+    def vhdl_memory_section_name(self, memory):
+        return "memory '%s'" % memory.name
+    #
+    # Returns the number of clock cycles from a bus read access to valid
+    # dataout: block RAM has a registered output, so the read path of a module
+    # with bus-readable memories is registered as a whole
+    def read_latency(self, module):
+        if any([m.is_bus_readable() for m in module.memories]):
+            return 1
+        return 0
+    #
+    # Write the generated code to a file, unless the file already holds the
+    # same code apart from the generation date, so that the file only gets a
+    # new modification time when its contents change. Returns True if the
+    # file was written.
+    def save_if_changed(self, filename):
+        try:
+            with open(filename) as f:
+                changed = GENERATION_DATE.sub("", f.read(), 1) != GENERATION_DATE.sub("", self._code, 1)
+        except IOError:
+            changed = True
+        if changed:
+            with open(filename, 'w') as f:
+                f.write(self._code)
+        return changed
        
 #
 # VHDL component generator
 #
 class VhdlComponentGenerator(CodeGenerator):
-    def __init__(self, module):
+    SPLIT_OPTIONS = ("register", "group")  # units of the --split-processes option
+    READ_TREE_FANIN = 6  # number of inputs of each OR gate of a split read multiplexer (one LUT)
+    # Clock-domain crossing signals of a register (see vhdl_cdc_signal)
+    CDC_SIGNALS = ("wtoggle", "whold", "wsync", "wack", "user", "ustrobe", "rtoggle", "rhold", "rsync", "rack")
+    #
+    def __init__(self, module, split_processes=None, compact=False):
+        self.compact = compact
+        registers = self.sorted_registers(module)
         #
         # Signal declarations
         signal_declarations = VhdlCodeBlock()
-        for r in module.registers:
-            signal_declarations.statements.append(VhdlStatement('signal %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.vhdl_data_signal(r), r.reset())))
+        for r in registers:
+            section = VhdlSection(self.vhdl_section_name(r))
+            section.statements.append(VhdlStatement('signal %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.vhdl_data_signal(r), r.reset())))
             if r.is_bus_writable():
-                signal_declarations.statements.append(VhdlStatement("signal %s : std_logic := '0';\n" % (self.vhdl_strobe_signal(r))))
+                section.statements.append(VhdlStatement("signal %s : std_logic := '0';\n" % (self.vhdl_strobe_signal(r))))
+            if len(self.cdc_write_fields(r)) > 0:
+                section.statements.append(VhdlStatement("signal %s : std_logic := '0';\n" % self.vhdl_cdc_signal(r, "wtoggle")))
+                section.statements.append(VhdlStatement('signal %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.vhdl_cdc_signal(r, "whold"), r.reset())))
+                section.statements.append(VhdlStatement('signal %s : std_logic_vector(2 downto 0) := "000";\n' % self.vhdl_cdc_signal(r, "wsync")))
+                section.statements.append(VhdlStatement('signal %s : std_logic_vector(1 downto 0) := "00";\n' % self.vhdl_cdc_signal(r, "wack")))
+                section.statements.append(VhdlStatement('signal %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.vhdl_cdc_signal(r, "user"), r.reset())))
+                section.statements.append(VhdlStatement("signal %s : std_logic := '0';\n" % self.vhdl_cdc_signal(r, "ustrobe")))
+            if len(self.cdc_read_fields(r)) > 0:
+                section.statements.append(VhdlStatement("signal %s : std_logic := '0';\n" % self.vhdl_cdc_signal(r, "rtoggle")))
+                section.statements.append(VhdlStatement('signal %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.vhdl_cdc_signal(r, "rhold"), r.reset())))
+                section.statements.append(VhdlStatement('signal %s : std_logic_vector(2 downto 0) := "000";\n' % self.vhdl_cdc_signal(r, "rsync")))
+                section.statements.append(VhdlStatement('signal %s : std_logic_vector(1 downto 0) := "00";\n' % self.vhdl_cdc_signal(r, "rack")))
+            signal_declarations.statements.append(section)
+        # Keep synchronizer flip-flops together and away from optimizations (Xilinx)
+        synchronizers = []
+        for r in registers:
+            if len(self.cdc_write_fields(r)) > 0:
+                synchronizers.append(self.vhdl_cdc_signal(r, "wsync"))
+                synchronizers.append(self.vhdl_cdc_signal(r, "wack"))
+            if len(self.cdc_read_fields(r)) > 0:
+                synchronizers.append(self.vhdl_cdc_signal(r, "rsync"))
+                synchronizers.append(self.vhdl_cdc_signal(r, "rack"))
+        if len(synchronizers) > 0:
+            code_block = VhdlCodeBlock()
+            code_block.statements.append(VhdlDeclaration("attribute ASYNC_REG : string;\n"))
+            for signal in synchronizers:
+                code_block.statements.append(VhdlDeclaration('attribute ASYNC_REG of %s : signal is "TRUE";\n' % signal))
+            signal_declarations.statements.append(code_block)
+        memories = self.sorted_memories(module)
+        for m in memories:
+            section = VhdlSection(self.vhdl_memory_section_name(m))
+            section.statements.append(VhdlDeclaration("type t_%s_ram is array (0 to 2 ** %s - 1) of std_logic_vector(31 downto 0);\n" % (m.name.lower(), self.address_width_identifier(m))))
+            section.statements.append(VhdlDeclaration("signal %s : t_%s_ram := (others => (others => '0'));\n" % (self.vhdl_ram_signal(m), m.name.lower())))
+            if m.is_bus_readable():
+                section.statements.append(VhdlDeclaration("signal s_%s_rdata_q : std_logic_vector(31 downto 0);\n" % m.name.lower()))
+                section.statements.append(VhdlDeclaration("signal s_%s_read_q : std_logic := '0';\n" % m.name.lower()))
+            code_block = VhdlCodeBlock()
+            code_block.statements.append(section)
+            signal_declarations.statements.append(code_block)
+        # With a registered read path, the register read multiplexer drives
+        # s_rdata_regs, which is registered along with the memory outputs
+        read_latency = self.read_latency(module)
+        if read_latency > 0:
+            read_target = "s_rdata_regs"
+            code_block = VhdlCodeBlock()
+            code_block.statements.append(VhdlDeclaration("signal s_rdata_regs : std_logic_vector(31 downto 0);\n"))
+            code_block.statements.append(VhdlDeclaration("signal s_rdata_regs_q : std_logic_vector(31 downto 0);\n"))
+            signal_declarations.statements.append(code_block)
+        else:
+            read_target = "dataout"
         
+        if split_processes is None:
+            #
+            # Register-write process
+            register_write_proc = self.register_write_process("register_write", registers).to_str(1)
+            #
+            # Bus-read process
+            register_read_proc = self.bus_read_process("bus_read", registers, read_target, "'X'").to_str(1)
+        else:
+            #
+            # One register-write and one bus-read process per register or
+            # group, and a multiplexer tree combining the read data
+            register_write_proc = ""
+            register_read_proc = ""
+            read_data_signals = []
+            for name, description, unit_registers in self.split_units(registers, split_processes):
+                code_block = VhdlCodeBlock()
+                code_block.statements.append(VhdlStatement("-- %s\n" % description))
+                code_block.statements.append(self.register_write_process(name + "_write", unit_registers))
+                register_write_proc += code_block.to_str(1)
+                readable_registers = [r for r in unit_registers if r.is_bus_readable()]
+                if len(readable_registers) > 0:
+                    read_data_signal = "s_%s_rdata" % name
+                    read_data_signals.append(read_data_signal)
+                    code_block = VhdlCodeBlock()
+                    code_block.statements.append(VhdlStatement("-- %s\n" % description))
+                    code_block.statements.append(self.bus_read_process(name + "_read", readable_registers, read_data_signal, "'0'"))
+                    register_read_proc += code_block.to_str(1)
+            read_mux, read_mux_signals = self.read_mux_tree(read_data_signals, read_target)
+            register_read_proc += read_mux.to_str(1)
+            code_block = VhdlCodeBlock()
+            for signal in read_data_signals + read_mux_signals:
+                code_block.statements.append(VhdlStatement("signal %s : std_logic_vector(31 downto 0);\n" % signal))
+            signal_declarations.statements.append(code_block)
         #
-        # Register-write process
-        register_write_proc = VhdlClockedProcess("register_write", "clk", "rst")
-        # resets
-        for r in module.registers:
-            register_write_proc.reset_statements.append(VhdlStatement('%s <= x"%.8X";\n' % (self.vhdl_data_signal(r), r.reset())))
-        # defaults
-        register_write_proc.statements.append(VhdlStatement("-- defaults:\n"))
-        for r in module.registers:
-            if r.is_bus_writable():
-                register_write_proc.statements.append(VhdlStatement("%s <= '0';\n" % self.vhdl_strobe_signal(r)))
-        # self-clearing fields
-        register_write_proc.statements.append(VhdlStatement("-- self-clearing fields:\n"))
-        for r in module.registers:
-            if r.is_bus_writable():
-                reg_data_signal = self.vhdl_data_signal(r)
-                for f in r.fields:
-                    if f.selfClear:
-                        index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
-                        index_low = self.bitOffset_identifier(f)
-                        register_write_proc.statements.append(VhdlStatement("%s(%s downto %s) <= (others => '0');\n" % (reg_data_signal, index_high, index_low)))
-        # bus-write
-        register_write_proc.statements.append(VhdlStatement("-- bus write:\n"))
-        bus_write_block = VhdlIfStatement("cs = '1' and rnw = '0'")
-        for r in module.registers:
-            reg_data_signal = self.vhdl_data_signal(r)
-            reg_strobe_signal = self.vhdl_strobe_signal(r)
-            if r.is_bus_writable():
-                register_write_block = VhdlIfStatement("addr = %s" % self.address_identifier(r))
-                for f in r.fields:
-                    if f.is_bus_writable():
-                        index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
-                        index_low = self.bitOffset_identifier(f)
-                        register_write_block.statements.append(VhdlStatement("%s(%s downto %s) <= datain(%s downto %s);\n" % (reg_data_signal, index_high, index_low, index_high, index_low)))
-                        register_write_block.statements.append(VhdlStatement("%s <= '1';\n" % (reg_strobe_signal)))
-                bus_write_block.statements.append(register_write_block)
-        register_write_proc.statements.append(bus_write_block)
-        # user-logic write
-        register_write_proc.statements.append(VhdlStatement("-- user-logic write:\n"))        
-        for r in module.registers:
-            for f in r.fields:
-                if f.is_user_writable():
-                    field_write_block = VhdlIfStatement("user2regs.%s.%s.strobe = '1'" % (r.name, f.name))
-                    field_write_block.statements.append(VhdlStatement("%s(%s + %s - 1 downto %s) <= user2regs.%s.%s.value;\n" % (self.vhdl_data_signal(r), self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f), r.name, f.name)))
-                    register_write_proc.statements.append(field_write_block)
+        # User clock domain side of the clock-domain crossings
+        for r in registers:
+            if len(self.cdc_write_fields(r)) > 0 or len(self.cdc_read_fields(r)) > 0:
+                section = VhdlSection(self.vhdl_section_name(r))
+                section.statements.append(self.user_clock_process(r))
+                code_block = VhdlCodeBlock()
+                code_block.statements.append(section)
+                register_write_proc += code_block.to_str(1)
         #
-        # Bus-read process
-        bus_read_proc = VhdlAsyncProcess("bus_read")
-        bus_read_proc.sensitivity.append('cs')
-        bus_read_proc.sensitivity.append('rnw')
-        bus_read_proc.sensitivity.append('addr')
-        bus_read_proc.statements.append(VhdlStatement("dataout <= (others => 'X'); -- default\n"))
-        cs_block = VhdlIfStatement("cs = '1' and rnw = '1'")
-        for r in module.registers:
-            if r.is_bus_readable():
-                bus_read_proc.sensitivity.append(self.vhdl_data_signal(r))
-                reg_read_block = VhdlIfStatement("addr = %s" % self.address_identifier(r))
-                for f in r.fields:
-                    if f.is_bus_readable():
-                        index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
-                        index_low = self.bitOffset_identifier(f)
-                        reg_read_block.statements.append(VhdlStatement("dataout(%s downto %s) <= %s(%s downto %s);\n" % (index_high, index_low, self.vhdl_data_signal(r), index_high, index_low)))
-                cs_block.statements.append(reg_read_block)                
-        bus_read_proc.statements.append(cs_block)
+        # Memory ports, and the registered read path
+        for m in memories:
+            section = VhdlSection(self.vhdl_memory_section_name(m))
+            section.statements.append(self.memory_bus_port(m))
+            section.statements.append(VhdlCodeBlock())
+            section.statements.append(self.memory_user_port(m))
+            code_block = VhdlCodeBlock()
+            code_block.statements.append(section)
+            register_read_proc += code_block.to_str(1)
+        if read_latency > 0:
+            register_read_proc += self.read_data_process(memories).to_str(1)
         #
         # Concurrent signal assignments
         concurrent_signal_assignments = VhdlCodeBlock()
-        for r in module.registers:
-            for f in r.fields:
-                if f.is_bus_writable():
-                    concurrent_signal_assignments.statements.append(VhdlStatement("regs2user.%s.%s.value <= %s(%s + %s - 1 downto %s);\n" % (r.name, f.name, self.vhdl_data_signal(r), self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f))))
-                    concurrent_signal_assignments.statements.append(VhdlStatement("regs2user.%s.%s.strobe <= %s;\n" % (r.name, f.name, self.vhdl_strobe_signal(r))))                   
+        for r in registers:
+            section = VhdlSection(self.vhdl_section_name(r))
+            for f in self.sorted_fields(r):
+                if f.is_bus_writable() and f.is_user_clocked():
+                    section.statements.append(VhdlStatement("regs2user.%s.%s.value <= %s(%s);\n" % (r.name, f.name, self.vhdl_cdc_signal(r, "user"), self.field_range(f))))
+                    section.statements.append(VhdlStatement("regs2user.%s.%s.strobe <= %s;\n" % (r.name, f.name, self.vhdl_cdc_signal(r, "ustrobe"))))
+                elif f.is_bus_writable():
+                    section.statements.append(VhdlStatement("regs2user.%s.%s.value <= %s(%s);\n" % (r.name, f.name, self.vhdl_data_signal(r), self.field_range(f))))
+                    section.statements.append(VhdlStatement("regs2user.%s.%s.strobe <= %s;\n" % (r.name, f.name, self.vhdl_strobe_signal(r))))                   
+            if len(self.cdc_read_fields(r)) > 0:
+                section.statements.append(VhdlStatement("regs2user.%s.%s <= %s xor %s(1);\n" % (r.name, Module.CDC_BUSY_NAME, self.vhdl_cdc_signal(r, "rtoggle"), self.vhdl_cdc_signal(r, "rack"))))
+            if len(section.statements) > 0:
+                concurrent_signal_assignments.statements.append(section)
+        user_ports = ""
+        if self.has_user_clock(module):
+            user_ports += indent(2) + "user_clk : in  std_logic;                    -- user-logic clock\n"
+            user_ports += indent(2) + "user_rst : in  std_logic;                    -- synchronous to user_clk, high-active\n"
+        libraries = ""
+        if len(memories) > 0:
+            libraries = "use ieee.numeric_std.all;\n"
         d = dict(entity_name = self.vhdl_entity_name(module),
+                 libraries = libraries,
+                 user_ports = user_ports,
                  signal_declarations = signal_declarations.to_str(1),
                  package_name = self.vhdl_package_name(module),
-                 register_write_proc = register_write_proc.to_str(1),
+                 register_write_proc = register_write_proc,
                  concurrent_signal_assignments = concurrent_signal_assignments.to_str(1),
-                 register_read_proc = bus_read_proc.to_str(1),
+                 register_read_proc = register_read_proc,
                  json_module_name = module.name,
                  hdlregs_version = HDLREGS_VERSION,
                  date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
         self._code = vhdl_component_template.substitute(d)        
     #
-    # Save the generated VHDL component to a file
+    # Returns the (name, description, registers) units of a component whose
+    # processes are split per register or per register group
+    def split_units(self, registers, split_processes):
+        if split_processes == "register":
+            return [(r.name.lower(), self.vhdl_section_name(r), [r]) for r in registers]
+        groups = []
+        group_registers = {}
+        for r in registers:
+            if r.group not in group_registers:
+                groups.append(r.group)
+                group_registers[r.group] = []
+            group_registers[r.group].append(r)
+        units = []
+        for i, group in enumerate(groups):
+            description = "group '%s'" % group if group is not None else "registers without a group"
+            units.append(("group_%d" % i, description, group_registers[group]))
+        return units
+    #
+    # Returns the clocked process writing the given registers
+    def register_write_process(self, name, registers):
+        register_write_proc = VhdlClockedProcess(name, "clk", "rst")
+        # resets
+        for r in registers:
+            register_write_proc.reset_statements.append(VhdlStatement('%s <= x"%.8X";\n' % (self.vhdl_data_signal(r), r.reset())))
+        for r in registers:
+            section = VhdlSection(self.vhdl_section_name(r))
+            section.statements = self.register_write_statements(r)
+            if len(section.statements) > 0:
+                register_write_proc.statements.append(section)
+        return register_write_proc
+    #
+    # Returns the process multiplexing the bus-readable registers among the
+    # given ones onto the target signal, which is set to the default value
+    # when none of them is read
+    def bus_read_process(self, name, registers, target, default):
+        bus_read_proc = VhdlAsyncProcess(name)
+        bus_read_proc.sensitivity.append('cs')
+        bus_read_proc.sensitivity.append('rnw')
+        bus_read_proc.sensitivity.append('addr')
+        bus_read_proc.statements.append(VhdlStatement("%s <= (others => %s); -- default\n" % (target, default)))
+        cs_block = VhdlIfStatement("cs = '1' and rnw = '1'")
+        for r in registers:
+            if r.is_bus_readable():
+                if any([f.is_bus_readable() and not f.is_pass_through() for f in r.fields]):
+                    bus_read_proc.sensitivity.append(self.vhdl_data_signal(r))
+                for f in self.sorted_fields(r):
+                    if f.is_pass_through():
+                        bus_read_proc.sensitivity.append("user2regs.%s.%s.value" % (r.name, f.name))
+                section = VhdlSection(self.vhdl_section_name(r))
+                section.statements.append(self.register_read_block(r, target))
+                cs_block.statements.append(section)
+        bus_read_proc.statements.append(cs_block)
+        return bus_read_proc
+    #
+    # Returns the OR tree combining the read data signals of a split component
+    # (which are zero unless their registers are read) into the target signal,
+    # and the list of its intermediate signals
+    def read_mux_tree(self, read_data_signals, target="dataout"):
+        code_block = VhdlCodeBlock()
+        intermediate_signals = []
+        signals = read_data_signals
+        level = 1
+        while len(signals) > self.READ_TREE_FANIN:
+            outputs = []
+            for i in range(0, len(signals), self.READ_TREE_FANIN):
+                output = "s_read_or_l%d_%d" % (level, len(outputs))
+                code_block.statements.append(VhdlStatement("%s <= %s;\n" % (output, " or ".join(signals[i:i + self.READ_TREE_FANIN]))))
+                outputs.append(output)
+            intermediate_signals += outputs
+            signals = outputs
+            level += 1
+        if len(signals) > 0:
+            code_block.statements.append(VhdlStatement("%s <= %s;\n" % (target, " or ".join(signals))))
+        else:
+            code_block.statements.append(VhdlStatement("%s <= (others => '0');\n" % target))
+        return code_block, intermediate_signals
+    #
+    # Returns the statements of the register-write process that update one
+    # register: strobe default, self-clearing fields, bus write and user-logic
+    # write, in this order of precedence
+    def register_write_statements(self, register):
+        statements = []
+        reg_data_signal = self.vhdl_data_signal(register)
+        reg_strobe_signal = self.vhdl_strobe_signal(register)
+        fields = self.sorted_fields(register)
+        if register.is_bus_writable():
+            statements.append(VhdlStatement("%s <= '0'; -- default\n" % reg_strobe_signal))
+            for index_range in self.field_ranges([f for f in fields if f.selfClear]):
+                statements.append(VhdlStatement("%s(%s) <= (others => '0'); -- self-clearing\n" % (reg_data_signal, index_range)))
+            condition = "cs = '1' and rnw = '0' and addr = %s" % self.address_identifier(register)
+            if register.cdc_busy_field is not None:
+                # the previous write has not crossed to the user clock domain yet
+                busy = register.cdc_busy_field
+                condition += " and %s(%s) = '0'" % (self.vhdl_data_signal(busy.parent_reg), self.field_index(busy))
+            bus_write_block = VhdlIfStatement(condition)
+            for index_range in self.field_ranges([f for f in fields if f.is_bus_writable()]):
+                bus_write_block.statements.append(VhdlStatement("%s(%s) <= datain(%s);\n" % (reg_data_signal, index_range, index_range)))
+                if not self.compact:
+                    bus_write_block.statements.append(VhdlStatement("%s <= '1';\n" % (reg_strobe_signal)))
+            if self.compact:
+                bus_write_block.statements.append(VhdlStatement("%s <= '1';\n" % (reg_strobe_signal)))
+            # clock-domain crossing: hold the written data and signal the write by a toggle
+            cdc_write_fields = self.cdc_write_fields(register)
+            for index_range in self.field_ranges(cdc_write_fields):
+                bus_write_block.statements.append(VhdlStatement("%s(%s) <= datain(%s);\n" % (self.vhdl_cdc_signal(register, "whold"), index_range, index_range)))
+            if len(cdc_write_fields) > 0:
+                bus_write_block.statements.append(VhdlStatement("%s <= not %s;\n" % (self.vhdl_cdc_signal(register, "wtoggle"), self.vhdl_cdc_signal(register, "wtoggle"))))
+            statements.append(bus_write_block)
+            # clock-domain crossing: synchronize the toggle value acknowledged by the user clock domain
+            if len(cdc_write_fields) > 0:
+                wack = self.vhdl_cdc_signal(register, "wack")
+                statements.append(VhdlStatement("%s <= %s(0) & %s(2);\n" % (wack, wack, self.vhdl_cdc_signal(register, "wsync"))))
+        # clock-domain crossing: take over the held user-logic data when the synchronized toggle changes
+        cdc_read_fields = self.cdc_read_fields(register)
+        if len(cdc_read_fields) > 0:
+            rsync = self.vhdl_cdc_signal(register, "rsync")
+            statements.append(VhdlStatement("%s <= %s(1 downto 0) & %s;\n" % (rsync, rsync, self.vhdl_cdc_signal(register, "rtoggle"))))
+            cdc_block = VhdlIfStatement("%s(2) /= %s(1)" % (rsync, rsync))
+            for index_range in self.field_ranges(cdc_read_fields):
+                cdc_block.statements.append(VhdlStatement("%s(%s) <= %s(%s);\n" % (reg_data_signal, index_range, self.vhdl_cdc_signal(register, "rhold"), index_range)))
+            statements.append(cdc_block)
+        # busy flags of the clock-domain crossings: set by a bus write to their
+        # register, cleared when the acknowledge has been synchronized back
+        for f in fields:
+            if f.cdc_register is not None:
+                bit = "%s(%s)" % (reg_data_signal, self.field_index(f))
+                statements.append(VhdlStatement("%s <= %s xor %s(1);\n" % (bit, self.vhdl_cdc_signal(f.cdc_register, "wtoggle"), self.vhdl_cdc_signal(f.cdc_register, "wack"))))
+                busy_block = VhdlIfStatement("cs = '1' and rnw = '0' and addr = %s" % self.address_identifier(f.cdc_register))
+                busy_block.statements.append(VhdlStatement("%s <= '1';\n" % bit))
+                statements.append(busy_block)
+        for f in fields:
+            if f.is_user_writable() and not f.is_user_clocked() and not f.is_pass_through():
+                field_write_block = VhdlIfStatement("user2regs.%s.%s.strobe = '1'" % (register.name, f.name))
+                field_write_block.statements.append(VhdlStatement("%s(%s) <= user2regs.%s.%s.value;\n" % (reg_data_signal, self.field_range(f), register.name, f.name)))
+                statements.append(field_write_block)
+        return statements
+    #
+    # Returns the index range of a field's bits, e.g. 'OFFSET_CONTROL_START +
+    # WIDTH_CONTROL_START - 1 downto OFFSET_CONTROL_START', or with literal
+    # indexes in a compact component, e.g. '0 downto 0'
+    def field_range(self, field):
+        if self.compact:
+            return "%d downto %d" % (field.bitOffset + field.bitWidth - 1, field.bitOffset)
+        return self.vhdl_field_range(field)
+    #
+    # Returns the index of a one-bit field, e.g. 'OFFSET_CDC_STATUS_CONTROL_BUSY',
+    # or a literal index in a compact component
+    def field_index(self, field):
+        if self.compact:
+            return "%d" % field.bitOffset
+        return self.bitOffset_identifier(field)
+    #
+    # Returns the index ranges of the given fields. In a compact component,
+    # the fields at adjacent bit offsets share one range.
+    def field_ranges(self, fields):
+        if not self.compact:
+            return [self.vhdl_field_range(f) for f in fields]
+        ranges = []
+        for f in sorted(fields, key=lambda f: f.bitOffset):
+            if len(ranges) > 0 and ranges[-1][0] + 1 == f.bitOffset:
+                ranges[-1][0] = f.bitOffset + f.bitWidth - 1
+            else:
+                ranges.append([f.bitOffset + f.bitWidth - 1, f.bitOffset])
+        return ["%d downto %d" % (high, low) for high, low in ranges]
+    #
+    # Returns a register's bus-writable fields in the user clock domain
+    def cdc_write_fields(self, register):
+        return [f for f in self.sorted_fields(register) if f.is_bus_writable() and f.is_user_clocked()]
+    #
+    # Returns a register's user-writable fields in the user clock domain
+    def cdc_read_fields(self, register):
+        return [f for f in self.sorted_fields(register) if f.is_user_writable() and f.is_user_clocked()]
+    #
+    # Returns the user_clk process of a register's clock-domain crossings.
+    # Bus writes are signalled by a toggle, which is synchronized by two
+    # flip-flops; the third one detects its edges, upon which the held data is
+    # taken over and a strobe is generated. User-logic writes cross to the bus
+    # clock domain in the same way. A crossing takes 2-3 cycles of the
+    # receiving clock. The third flip-flop is synchronized back to the bus
+    # clock as the acknowledge of bus writes; until it arrives, the busy flag
+    # in the status register is set and further bus writes are ignored.
+    # User-logic writes are acknowledged back to user_clk the same way; until
+    # then, the held value stays stable, cdc_busy is set in regs2user and
+    # further user strobes are ignored.
+    def user_clock_process(self, register):
+        process = VhdlClockedProcess(register.name.lower() + "_cdc", "user_clk", "user_rst")
+        cdc_write_fields = self.cdc_write_fields(register)
+        if len(cdc_write_fields) > 0:
+            user = self.vhdl_cdc_signal(register, "user")
+            ustrobe = self.vhdl_cdc_signal(register, "ustrobe")
+            wsync = self.vhdl_cdc_signal(register, "wsync")
+            process.reset_statements.append(VhdlStatement('%s <= x"%.8X";\n' % (user, register.reset())))
+            process.reset_statements.append(VhdlStatement("%s <= '0';\n" % ustrobe))
+            process.statements.append(VhdlStatement("%s <= %s(1 downto 0) & %s;\n" % (wsync, wsync, self.vhdl_cdc_signal(register, "wtoggle"))))
+            process.statements.append(VhdlStatement("%s <= '0'; -- default\n" % ustrobe))
+            for index_range in self.field_ranges([f for f in cdc_write_fields if f.selfClear]):
+                process.statements.append(VhdlStatement("%s(%s) <= (others => '0'); -- self-clearing\n" % (user, index_range)))
+            cdc_block = VhdlIfStatement("%s(2) /= %s(1)" % (wsync, wsync))
+            for index_range in self.field_ranges(cdc_write_fields):
+                cdc_block.statements.append(VhdlStatement("%s(%s) <= %s(%s);\n" % (user, index_range, self.vhdl_cdc_signal(register, "whold"), index_range)))
+            cdc_block.statements.append(VhdlStatement("%s <= '1';\n" % ustrobe))
+            process.statements.append(cdc_block)
+        cdc_read_fields = self.cdc_read_fields(register)
+        if len(cdc_read_fields) > 0:
+            rtoggle = self.vhdl_cdc_signal(register, "rtoggle")
+            rack = self.vhdl_cdc_signal(register, "rack")
+            process.statements.append(VhdlStatement("%s <= %s(0) & %s(2);\n" % (rack, rack, self.vhdl_cdc_signal(register, "rsync"))))
+            # strobes are ignored until the previous value has been acknowledged
+            ready = "%s = %s(1)" % (rtoggle, rack)
+            strobes = []
+            for f in cdc_read_fields:
+                strobe = "user2regs.%s.%s.strobe" % (register.name, f.name)
+                strobes.append("%s = '1'" % strobe)
+                hold_block = VhdlIfStatement("%s = '1' and %s" % (strobe, ready))
+                hold_block.statements.append(VhdlStatement("%s(%s) <= user2regs.%s.%s.value;\n" % (self.vhdl_cdc_signal(register, "rhold"), self.field_range(f), register.name, f.name)))
+                process.statements.append(hold_block)
+            if len(strobes) > 1:
+                strobes = "(%s)" % " or ".join(strobes)
+            else:
+                strobes = strobes[0]
+            toggle_block = VhdlIfStatement("%s and %s" % (strobes, ready))
+            toggle_block.statements.append(VhdlStatement("%s <= not %s;\n" % (rtoggle, rtoggle)))
+            process.statements.append(toggle_block)
+        return process
+    #
+    # Returns the condition that addr is in a memory's address window
+    def memory_hit(self, memory):
+        return "addr(31 downto %s + 2) = %s(31 downto %s + 2)" % (self.address_width_identifier(memory), self.address_identifier(memory), self.address_width_identifier(memory))
+    #
+    # Returns the process of a memory's bus port, which writes the RAM (unless
+    # the memory is read-only) and reads it into s_<memory>_rdata_q (unless it
+    # is write-only). The RAM has no reset.
+    def memory_bus_port(self, memory):
+        process = VhdlAsyncProcess(memory.name.lower() + "_bus_port")
+        process.sensitivity.append("clk")
+        clock_block = VhdlIfStatement("rising_edge(clk)")
+        index = "to_integer(unsigned(addr(%s + 1 downto 2)))" % self.address_width_identifier(memory)
+        if memory.is_bus_writable():
+            write_block = VhdlIfStatement("cs = '1' and rnw = '0' and %s" % self.memory_hit(memory))
+            write_block.statements.append(VhdlStatement("%s(%s) <= datain;\n" % (self.vhdl_ram_signal(memory), index)))
+            clock_block.statements.append(write_block)
+        if memory.is_bus_readable():
+            clock_block.statements.append(VhdlStatement("s_%s_rdata_q <= %s(%s);\n" % (memory.name.lower(), self.vhdl_ram_signal(memory), index)))
+        process.statements.append(clock_block)
+        return process
+    #
+    # Returns the process of a memory's user-logic port, which writes the RAM
+    # if the memory is read-only, and always reads it
+    def memory_user_port(self, memory):
+        clock = "user_clk" if memory.is_user_clocked() else "clk"
+        process = VhdlAsyncProcess(memory.name.lower() + "_user_port")
+        process.sensitivity.append(clock)
+        clock_block = VhdlIfStatement("rising_edge(%s)" % clock)
+        index = "to_integer(unsigned(user2regs.%s.addr))" % memory.name
+        if memory.is_user_writable():
+            write_block = VhdlIfStatement("user2regs.%s.we = '1'" % memory.name)
+            write_block.statements.append(VhdlStatement("%s(%s) <= user2regs.%s.data;\n" % (self.vhdl_ram_signal(memory), index, memory.name)))
+            clock_block.statements.append(write_block)
+        clock_block.statements.append(VhdlStatement("regs2user.%s.data <= %s(%s);\n" % (memory.name, self.vhdl_ram_signal(memory), index)))
+        process.statements.append(clock_block)
+        return process
+    #
+    # Returns the registered read path of a component with bus-readable
+    # memories: the register read data is registered like the RAM outputs, and
+    # dataout selects the memory that was read in the previous cycle, if any
+    def read_data_process(self, memories):
+        readable_memories = [m for m in memories if m.is_bus_readable()]
+        code_block = VhdlCodeBlock()
+        process = VhdlAsyncProcess("read_data")
+        process.sensitivity.append("clk")
+        clock_block = VhdlIfStatement("rising_edge(clk)")
+        clock_block.statements.append(VhdlStatement("s_rdata_regs_q <= s_rdata_regs;\n"))
+        for m in readable_memories:
+            clock_block.statements.append(VhdlStatement("s_%s_read_q <= '0';\n" % m.name.lower()))
+            read_block = VhdlIfStatement("cs = '1' and rnw = '1' and %s" % self.memory_hit(m))
+            read_block.statements.append(VhdlStatement("s_%s_read_q <= '1';\n" % m.name.lower()))
+            clock_block.statements.append(read_block)
+        process.statements.append(clock_block)
+        code_block.statements.append(process)
+        code_block.statements.append(VhdlCodeBlock())
+        selection = "dataout <= "
+        for m in readable_memories:
+            selection += "s_%s_rdata_q when s_%s_read_q = '1' else\n%s" % (m.name.lower(), m.name.lower(), indent(1) + " " * len("dataout <= "))
+        selection += "s_rdata_regs_q;\n"
+        code_block.statements.append(VhdlStatement(selection))
+        return code_block
+    #
+    # Returns the bus-read multiplexer branch of a register, driving the target signal
+    def register_read_block(self, register, target):
+        reg_read_block = VhdlIfStatement("addr = %s" % self.address_identifier(register))
+        if self.compact:
+            registered_fields = [f for f in self.sorted_fields(register) if f.is_bus_readable() and not f.is_pass_through()]
+            for index_range in self.field_ranges(registered_fields):
+                reg_read_block.statements.append(VhdlStatement("%s(%s) <= %s(%s);\n" % (target, index_range, self.vhdl_data_signal(register), index_range)))
+        for f in self.sorted_fields(register):
+            if f.is_bus_readable():
+                index_range = self.field_range(f)
+                if f.is_pass_through():
+                    reg_read_block.statements.append(VhdlStatement("%s(%s) <= user2regs.%s.%s.value;\n" % (target, index_range, register.name, f.name)))
+                elif not self.compact:
+                    reg_read_block.statements.append(VhdlStatement("%s(%s) <= %s(%s);\n" % (target, index_range, self.vhdl_data_signal(register), index_range)))
+        return reg_read_block
+    #
+    # Save the generated VHDL component to a file, if it has changed
     def save(self, filename):
-        with open(filename, 'w') as f:
-            f.write(self._code)    
+        self.save_if_changed(filename)
 
 #
 # VHDL package generator
 #
 class VhdlPackageGenerator(CodeGenerator):
     def __init__(self, module):
-        vhdl_package = VhdlPackage(self.vhdl_package_name(module))
+        vhdl_package = VhdlPackage(self.vhdl_package_name(module), module.name)
         # Interface record types     
         user2regs = VhdlRecord('t_user2regs', 'User-logic -> register file interface', [])
         regs2user = VhdlRecord('t_regs2user', 'Register file -> user-logic interface', [])
-        # Register address offsets
-        for r in module.registers:
-            vhdl_package.add_declaration(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.address_identifier(r), r.addressOffset)))
-        # Lowest address in register file 
-        identifier = module.name.upper() + "_REGS_BASEADDR"
-        base_register_identifier = self.address_identifier(module.base_register())
-        vhdl_package.add_declaration(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := %s; -- lowest register address\n' % (identifier, base_register_identifier)))        
-        # Highest address in register file
-        identifier = module.name.upper() + "_REGS_HIGHADDR"
-        high_register_identifier = self.address_identifier(module.high_register())
-        vhdl_package.add_declaration(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := %s; -- highest register address\n' % (identifier, high_register_identifier)))
-        # Field constants:
-        for r in module.registers:
-            for f in r.fields:
-                vhdl_package.add_declaration(self.to_vhdl_constants(f))
-        # Field record types
-        field_types = ''
-        for r in module.registers:
-            for f in r.fields:
+        # One section per register: address offset, field constants, field
+        # record types and register record types (XXX_regs2user and/or XXX_user2regs)
+        for r in self.sorted_registers(module):
+            section = VhdlSection(self.vhdl_section_name(r))
+            section.statements.append(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.address_identifier(r), r.addressOffset)))
+            fields = self.sorted_fields(r)
+            for f in fields:
+                section.statements.append(self.to_vhdl_constants(f))
+            for f in fields:
                 description = "Field '%s' of register '%s' (%s)" % (f.name, r.name, f.access())
                 elements = []
                 elements.append("value : std_logic_vector(%s - 1 downto 0)" % (self.bitWidth_identifier(f)))
-                elements.append("strobe : std_logic")
+                if f.is_pass_through():
+                    description += ", pass-through"
+                else:
+                    elements.append("strobe : std_logic")
                 record = VhdlRecord(self.vhdl_record_name(f), description, elements)
-                vhdl_package.add_declaration(record)       
-        # Register record types (XXX_regs2user and/or XXX_user2regs)
-        for r in module.registers:
+                section.statements.append(record)
             records = self.to_vhdl_records(r)
             for record in records:
                 if record.name.endswith('user2regs'):
                     user2regs.add_element(r.name + ": " + record.name)
                 if record.name.endswith('regs2user'):
                     regs2user.add_element(r.name + ": " + record.name)
-                vhdl_package.add_declaration(record)
+                section.statements.append(record)
+            code_block = VhdlCodeBlock()
+            code_block.statements.append(section)
+            vhdl_package.add_declaration(code_block)
+        # One section per memory: address offset, depth, word address width and
+        # the record types of the user-logic port
+        for m in self.sorted_memories(module):
+            section = VhdlSection(self.vhdl_memory_section_name(m))
+            section.statements.append(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.address_identifier(m), m.addressOffset)))
+            section.statements.append(VhdlDeclaration("constant %s : natural := %d;\n" % (self.depth_identifier(m), m.depth)))
+            section.statements.append(VhdlDeclaration("constant %s : natural := %d; -- word address bits\n" % (self.address_width_identifier(m), m.address_width())))
+            elements = ["addr : std_logic_vector(%s - 1 downto 0)" % self.address_width_identifier(m)]
+            if m.is_user_writable():
+                elements.append("data : std_logic_vector(31 downto 0)")
+                elements.append("we : std_logic")
+            record = VhdlRecord("t_%s_user2regs" % m.name, "Memory '%s' (%s): user-logic port" % (m.name, m.access), elements)
+            user2regs.add_element(m.name + ": " + record.name)
+            section.statements.append(record)
+            record = VhdlRecord("t_%s_regs2user" % m.name, "Memory '%s': data at addr, one clock cycle later" % m.name, ["data : std_logic_vector(31 downto 0)"])
+            regs2user.add_element(m.name + ": " + record.name)
+            section.statements.append(record)
+            code_block = VhdlCodeBlock()
+            code_block.statements.append(section)
+            vhdl_package.add_declaration(code_block)
+        # Lowest address in register file 
+        identifier = module.name.upper() + "_REGS_BASEADDR"
+        base_register_identifier = self.address_identifier(module.base_register())
+        code_block = VhdlCodeBlock()
+        code_block.statements.append(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := %s; -- lowest register address\n' % (identifier, base_register_identifier)))        
+        # Highest address in register file
+        identifier = module.name.upper() + "_REGS_HIGHADDR"
+        high_register_identifier = self.address_identifier(module.high_register())
+        code_block.statements.append(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := %s; -- highest register address\n' % (identifier, high_register_identifier)))
+        vhdl_package.add_declaration(code_block)
         # Add dummy signals in case of empty records, as these are not allowed in VHDL
         if 0 == user2regs.num_elements():
             user2regs.add_element("dummy : std_logic")
@@ -706,8 +2179,8 @@ class VhdlPackageGenerator(CodeGenerator):
         name = "t_%s_user2regs" % (register.name)
         description = "Register '%s'" % register.name
         elements = []
-        for f in register.fields:
-            if f.access() == "read-only":
+        for f in self.sorted_fields(register):
+            if f.is_user_writable():
                 elements.append('%s : %s' % (f.name, self.vhdl_record_name(f)))
         if len(elements) > 0:
             records.append(VhdlRecord(name, description, elements))
@@ -715,17 +2188,765 @@ class VhdlPackageGenerator(CodeGenerator):
         name = "t_%s_regs2user" % (register.name)
         description = "Register '%s'" % register.name
         elements = []
-        for f in register.fields:
+        for f in self.sorted_fields(register):
             if f.access() == "read-write" or f.access() == "write-only":
                 elements.append('%s : %s' % (f.name, self.vhdl_record_name(f)))       
+        if any([f.is_user_writable() and f.is_user_clocked() for f in register.fields]):
+            elements.append('%s : std_logic' % Module.CDC_BUSY_NAME)
         if len(elements) > 0:
             records.append(VhdlRecord(name, description, elements))        
         return records 
     #
+    # Save the generated VHDL package to a file, if it has changed
+    def save(self, filename):
+        self.save_if_changed(filename)
+#
+# VHDL testbench generator
+#
+class VhdlTestbenchGenerator(CodeGenerator):
+    def __init__(self, module):
+        readable_registers = [r for r in module.registers if r.is_bus_readable()]
+        writable_registers = [r for r in module.registers if r.is_bus_writable()]
+        # The parts are joined once, as repeated += of unicode strings is quadratic
+        # Address arrays for the throughput measurements
+        address_arrays = []
+        if len(readable_registers) > 0:
+            address_arrays.append(indent(1) + "constant READ_ADDRS  : t_addr_array := (%s);\n" % self.address_aggregate(readable_registers))
+        if len(writable_registers) > 0:
+            address_arrays.append(indent(1) + "constant WRITE_ADDRS : t_addr_array := (%s);\n" % self.address_aggregate(writable_registers))
+        # Idle user-logic inputs
+        user2regs_init = []
+        for r in module.registers:
+            for f in r.fields:
+                if f.is_user_writable():
+                    user2regs_init.append(indent(2) + "user2regs.%s.%s.value <= (others => '0');\n" % (r.name, f.name))
+                    if not f.is_pass_through():
+                        user2regs_init.append(indent(2) + "user2regs.%s.%s.strobe <= '0';\n" % (r.name, f.name))
+        for m in self.sorted_memories(module):
+            user2regs_init.append(indent(2) + "user2regs.%s.addr <= (others => '0');\n" % m.name)
+            if m.is_user_writable():
+                user2regs_init.append(indent(2) + "user2regs.%s.data <= (others => '0');\n" % m.name)
+                user2regs_init.append(indent(2) + "user2regs.%s.we <= '0';\n" % m.name)
+        if not any([r.is_user_writable() for r in module.registers]) and len(module.memories) == 0:
+            user2regs_init.append(indent(2) + "user2regs.dummy <= '0';\n")
+        # Reset values
+        reset_checks = []
+        for r in readable_registers:
+            reset_checks.append(indent(2) + "bus_read(%s, data);\n" % self.address_identifier(r))
+            reset_checks.append(indent(2) + 'check_masked(data, x"%.8X", x"%.8X", "reset value of register \'%s\'");\n' % (r.reset(), self.bus_readable_mask(r) & ~self.pass_through_mask(r), r.name))
+        # Bus writes: regs2user values and strobes, read-back of read-write fields
+        write_checks = []
+        for r in writable_registers:
+            bus_fields = [f for f in r.fields if f.is_bus_writable() and not f.is_user_clocked()]
+            cdc_fields = [f for f in r.fields if f.is_bus_writable() and f.is_user_clocked()]
+            for pattern in ("PATTERN_A", "PATTERN_B"):
+                write_checks.append(indent(2) + "bus_write(%s, %s);\n" % (self.address_identifier(r), pattern))
+                write_checks.append(indent(2) + "wait until falling_edge(clk);\n")
+                write_checks.append(self.regs2user_checks(r, bus_fields, pattern))
+                if any([f.selfClear for f in bus_fields]):
+                    write_checks.append(indent(2) + "wait until falling_edge(clk);\n")
+                    write_checks.append(self.selfClear_checks(r, bus_fields))
+                # USER_CLK_PERIOD is chosen such that the strobe in the user clock
+                # domain cannot have passed before this point
+                if len(cdc_fields) > 0:
+                    write_checks.append(indent(2) + "wait until rising_edge(user_clk) and regs2user.%s.%s.strobe = '1' for CDC_TIMEOUT;\n" % (r.name, cdc_fields[0].name))
+                    write_checks.append(self.regs2user_checks(r, cdc_fields, pattern))
+                    if any([f.selfClear for f in cdc_fields]):
+                        write_checks.append(indent(2) + "wait until falling_edge(user_clk);\n")
+                        write_checks.append(self.selfClear_checks(r, cdc_fields))
+                    # bus writes are ignored until the crossing has been acknowledged
+                    write_checks.append(self.wait_cdc(r))
+                readback_mask = self.bus_readable_mask(r) & self.bus_writable_mask(r) & ~self.selfClear_mask(r)
+                if readback_mask != 0:
+                    write_checks.append(indent(2) + "bus_read(%s, data);\n" % self.address_identifier(r))
+                    write_checks.append(indent(2) + 'check_masked(data, %s, x"%.8X", "read-back of register \'%s\'");\n' % (pattern, readback_mask, r.name))
+        # User-logic writes, read back over the bus
+        user_checks = []
+        for r in module.registers:
+            user_fields = [f for f in r.fields if f.is_user_writable() and not f.is_user_clocked()]
+            if len(user_fields) > 0:
+                user_checks.append(self.user_write_check(r, user_fields, "clk"))
+            cdc_fields = [f for f in r.fields if f.is_user_writable() and f.is_user_clocked()]
+            if len(cdc_fields) > 0:
+                user_checks.append(self.user_write_check(r, cdc_fields, "user_clk"))
+                user_checks.append(self.cdc_read_checks(r, cdc_fields))
+        # Clock-domain crossings: back-to-back bus writes, each issued once the
+        # busy flag of the previous one has cleared, must all reach the user
+        # clock domain
+        cdc_registers = [r for r in module.registers if r.cdc_busy_field is not None]
+        cdc_checks = []
+        cdc_counters = []
+        cdc_procedures = []
+        for r in cdc_registers:
+            cdc_checks.append(self.cdc_write_checks(r))
+        if len(cdc_registers) > 0:
+            cdc_checks.insert(0, indent(2) + "--\n" + indent(2) + "-- clock-domain crossings\n")
+            cdc_counters.append("\n" + indent(1) + "-- bus writes that reached the user clock domain\n")
+            cdc_counters.append(indent(1) + "cdc_write_counter : process(user_clk) is\n")
+            cdc_counters.append(indent(1) + "begin\n")
+            cdc_counters.append(indent(2) + "if rising_edge(user_clk) then\n")
+            for r in cdc_registers:
+                cdc_counters.append(indent(3) + "if regs2user.%s.%s.strobe = '1' then\n" % (r.name, self.cdc_strobe_field(r).name))
+                cdc_counters.append(indent(4) + "cdc_writes_%s <= cdc_writes_%s + 1;\n" % (r.name, r.name))
+                cdc_counters.append(indent(3) + "end if;\n")
+            cdc_counters.append(indent(2) + "end if;\n")
+            cdc_counters.append(indent(1) + "end process cdc_write_counter;\n")
+            cdc_procedures.append(cdc_procedure_template)
+        if any([f.is_user_writable() and f.is_user_clocked() for r in module.registers for f in r.fields]):
+            cdc_procedures.append(cdc_read_variables_template)
+        # Memories: bus writes and reads of the first and the last word, user-logic
+        # port reads and writes
+        memory_checks = []
+        for m in self.sorted_memories(module):
+            memory_checks.append(self.memory_checks(m))
+        if len(memory_checks) > 0:
+            memory_checks.insert(0, indent(2) + "--\n" + indent(2) + "-- memories\n")
+        # Read acknowledge of the direct interface, as generated by the IPIF adapter
+        read_latency = self.read_latency(module)
+        if read_latency > 0:
+            direct_rdack = indent(2) + "rdack <= cs and rnw and not rdack when rising_edge(clk); -- registered read path\n"
+        else:
+            direct_rdack = indent(2) + "rdack <= cs and rnw;\n"
+        # Throughput of back-to-back accesses
+        throughput = []
+        if len(writable_registers) > 0:
+            throughput.append(self.throughput_loop("back-to-back writes", ["bus_write(WRITE_ADDRS(i mod WRITE_ADDRS'length), PATTERN_A);"]))
+        if len(readable_registers) > 0:
+            throughput.append(self.throughput_loop("back-to-back reads", ["bus_read(READ_ADDRS(i mod READ_ADDRS'length), data);"]))
+        if len(readable_registers) > 0 and len(writable_registers) > 0:
+            throughput.append(self.throughput_loop("alternating writes and reads", ["if i mod 2 = 0 then",
+                                                                                    indent(1) + "bus_write(WRITE_ADDRS((i / 2) mod WRITE_ADDRS'length), PATTERN_B);",
+                                                                                    "else",
+                                                                                    indent(1) + "bus_read(READ_ADDRS((i / 2) mod READ_ADDRS'length), data);",
+                                                                                    "end if;"]))
+        # User clock domain
+        user_clock_constants = []
+        user_clock_signals = []
+        user_clock_generation = []
+        user_port_map = []
+        if self.has_user_clock(module):
+            user_clock_constants.append(indent(1) + "constant USER_CLK_PERIOD : time := 7 ns;\n")
+            user_clock_constants.append(indent(1) + "constant CDC_TIMEOUT     : time := 20 * CLK_PERIOD;\n")
+            user_clock_constants.append(indent(1) + "constant CDC_POLLS       : positive := 20; -- bus reads of a busy flag\n")
+            user_clock_constants.append(indent(1) + "constant CDC_STROBES     : positive := 40; -- back-to-back user-logic writes\n")
+            user_clock_signals.append(indent(1) + "signal user_clk  : std_logic := '0';\n")
+            user_clock_signals.append(indent(1) + "signal user_rst  : std_logic := '1';\n")
+            for r in cdc_registers:
+                user_clock_signals.append(indent(1) + "signal cdc_writes_%s : natural := 0;\n" % r.name)
+            user_clock_generation.append(indent(1) + "user_clk <= not user_clk after USER_CLK_PERIOD / 2 when not done;\n")
+            user_clock_generation.append(indent(1) + "user_rst <= rst when rising_edge(user_clk);\n")
+            user_port_map.append(indent(4) + "user_clk  => user_clk,\n")
+            user_port_map.append(indent(4) + "user_rst  => user_rst,\n")
+        d = dict(tb_entity_name = self.vhdl_entity_name(module) + "_tb",
+                 entity_name = self.vhdl_entity_name(module),
+                 package_name = self.vhdl_package_name(module),
+                 user_clock_constants = "".join(user_clock_constants),
+                 user_clock_signals = "".join(user_clock_signals),
+                 user_clock_generation = "".join(user_clock_generation),
+                 user_port_map = "".join(user_port_map),
+                 address_arrays = "".join(address_arrays),
+                 user2regs_init = "".join(user2regs_init),
+                 reset_checks = "".join(reset_checks),
+                 write_checks = "".join(write_checks),
+                 cdc_checks = "".join(cdc_checks),
+                 cdc_counters = "".join(cdc_counters),
+                 cdc_procedures = "".join(cdc_procedures),
+                 user_checks = "".join(user_checks),
+                 memory_checks = "".join(memory_checks),
+                 direct_rdack = direct_rdack,
+                 read_latency = read_latency,
+                 throughput = "".join(throughput),
+                 json_module_name = module.name,
+                 hdlregs_version = HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self._code = vhdl_testbench_template.substitute(d)
+    #
+    # Returns the checks of the regs2user values and strobes after a bus write
+    def regs2user_checks(self, register, fields, pattern):
+        s = ""
+        for f in fields:
+            s += indent(2) + 'check(regs2user.%s.%s.value, %s(%s), "regs2user value of field \'%s.%s\'");\n' % (register.name, f.name, pattern, self.vhdl_field_range(f), register.name, f.name)
+            s += indent(2) + 'check(regs2user.%s.%s.strobe, \'1\', "regs2user strobe of field \'%s.%s\'");\n' % (register.name, f.name, register.name, f.name)
+        return s
+    #
+    # Returns the checks of the self-clearing fields one clock cycle after a bus write
+    def selfClear_checks(self, register, fields):
+        s = ""
+        for f in fields:
+            if f.selfClear:
+                s += indent(2) + 'check(regs2user.%s.%s.value, ZERO(%s), "self-clearing of field \'%s.%s\'");\n' % (register.name, f.name, self.vhdl_field_range(f), register.name, f.name)
+        return s
+    #
+    # Returns the polling of the busy flag of a register's clock-domain crossing
+    def wait_cdc(self, register):
+        busy = register.cdc_busy_field
+        return indent(2) + 'wait_cdc(%s, %s, "register \'%s\'");\n' % (self.address_identifier(busy.parent_reg), self.bitOffset_identifier(busy), register.name)
+    #
+    # Returns the field whose regs2user strobe signals the bus writes of a
+    # register in the user clock domain
+    def cdc_strobe_field(self, register):
+        return [f for f in register.fields if f.is_bus_writable() and f.is_user_clocked()][0]
+    #
+    # Returns back-to-back bus writes of PATTERN_A, PATTERN_B, ZERO and
+    # PATTERN_A to a register with a clock-domain crossing: the busy flag must
+    # be set after each write and clear once the user clock domain has taken
+    # over the written value, and every write must cause one strobe there
+    def cdc_write_checks(self, register):
+        busy = register.cdc_busy_field
+        status_address = self.address_identifier(busy.parent_reg)
+        fields = [f for f in register.fields if f.is_bus_writable() and f.is_user_clocked() and not f.selfClear]
+        patterns = ("PATTERN_A", "PATTERN_B", "ZERO", "PATTERN_A")
+        s = indent(2) + "start_writes := cdc_writes_%s;\n" % register.name
+        for pattern in patterns:
+            s += indent(2) + "bus_write(%s, %s);\n" % (self.address_identifier(register), pattern)
+            s += indent(2) + "bus_read(%s, data);\n" % status_address
+            s += indent(2) + 'check(data(%s), \'1\', "busy flag of register \'%s\' after a bus write");\n' % (self.bitOffset_identifier(busy), register.name)
+            s += self.wait_cdc(register)
+            for f in fields:
+                s += indent(2) + 'check(regs2user.%s.%s.value, %s(%s), "regs2user value of field \'%s.%s\' after back-to-back writes");\n' % (register.name, f.name, pattern, self.vhdl_field_range(f), register.name, f.name)
+        s += indent(2) + "if cdc_writes_%s - start_writes /= %d then\n" % (register.name, len(patterns))
+        s += indent(3) + 'report "lost bus writes to register \'%s\' in the user clock domain" severity error;\n' % register.name
+        s += indent(3) + "errors := errors + 1;\n"
+        s += indent(2) + "end if;\n"
+        return s
+    #
+    # Returns a user-logic write of the given fields, driven in the clock domain
+    # of the fields, and its read-back over the bus
+    def user_write_check(self, register, fields, clock):
+        s = indent(2) + "wait until falling_edge(%s);\n" % clock
+        user_mask = 0
+        for f in fields:
+            user_mask |= self.bitMask(f)
+            s += indent(2) + "user2regs.%s.%s.value <= PATTERN_A(%s);\n" % (register.name, f.name, self.vhdl_field_range(f))
+            if not f.is_pass_through():
+                s += indent(2) + "user2regs.%s.%s.strobe <= '1';\n" % (register.name, f.name)
+        s += indent(2) + "wait until falling_edge(%s);\n" % clock
+        for f in fields:
+            if not f.is_pass_through():
+                s += indent(2) + "user2regs.%s.%s.strobe <= '0';\n" % (register.name, f.name)
+        if clock != "clk":
+            s += indent(2) + "wait for CDC_TIMEOUT;\n"
+        s += indent(2) + "bus_read(%s, data);\n" % self.address_identifier(register)
+        s += indent(2) + 'check_masked(data, PATTERN_A, x"%.8X", "user-logic write of register \'%s\'");\n' % (user_mask, register.name)
+        return s
+    #
+    # Returns back-to-back user-logic writes of PATTERN_B and PATTERN_A, one
+    # per user clock cycle, to the given user-clocked fields of a register,
+    # while the register is read over the bus again and again: no other value
+    # may be read, cdc_busy must keep strobes from being taken over while a
+    # value crosses, and the last value taken over must be read at the end
+    def cdc_read_checks(self, register, fields):
+        user_mask = 0
+        for f in fields:
+            user_mask |= self.bitMask(f)
+        address = self.address_identifier(register)
+        s = indent(2) + "cdc_cycles := 0;\n"
+        s += indent(2) + "cdc_accepted := 0;\n"
+        s += indent(2) + "cdc_reading := false;\n"
+        s += indent(2) + "cdc_expected := PATTERN_A;\n"
+        s += indent(2) + "while (cdc_cycles <= CDC_STROBES or cdc_reading) and cdc_cycles < CDC_STROBES + ACK_TIMEOUT loop\n"
+        s += indent(3) + "wait until falling_edge(user_clk) or falling_edge(clk) or rising_edge(clk);\n"
+        s += indent(3) + "if rising_edge(clk) and cdc_reading and rdack = '1' then\n"
+        s += indent(4) + 'if (dataout and x"%.8X") /= (PATTERN_A and x"%.8X") and (dataout and x"%.8X") /= (PATTERN_B and x"%.8X") then\n' % (user_mask, user_mask, user_mask, user_mask)
+        s += indent(5) + 'report "corrupted value of register \'%s\' during back-to-back user-logic writes" severity error;\n' % register.name
+        s += indent(5) + "errors := errors + 1;\n"
+        s += indent(4) + "end if;\n"
+        s += indent(4) + "cs <= '0';\n"
+        s += indent(4) + "cdc_reading := false;\n"
+        s += indent(3) + "elsif falling_edge(clk) and not cdc_reading and cdc_cycles <= CDC_STROBES then\n"
+        s += indent(4) + "cs   <= '1';\n"
+        s += indent(4) + "rnw  <= '1';\n"
+        s += indent(4) + "addr <= %s;\n" % address
+        s += indent(4) + "cdc_reading := true;\n"
+        s += indent(3) + "end if;\n"
+        s += indent(3) + "if falling_edge(user_clk) and cdc_cycles < CDC_STROBES then\n"
+        s += indent(4) + "if cdc_cycles mod 2 = 0 then\n"
+        s += indent(5) + "cdc_pattern := PATTERN_B;\n"
+        s += indent(4) + "else\n"
+        s += indent(5) + "cdc_pattern := PATTERN_A;\n"
+        s += indent(4) + "end if;\n"
+        s += indent(4) + "-- cdc_busy does not change until the next rising edge\n"
+        s += indent(4) + "if regs2user.%s.%s = '0' then\n" % (register.name, Module.CDC_BUSY_NAME)
+        s += indent(5) + "cdc_expected := cdc_pattern;\n"
+        s += indent(5) + "cdc_accepted := cdc_accepted + 1;\n"
+        s += indent(4) + "end if;\n"
+        for f in fields:
+            s += indent(4) + "user2regs.%s.%s.value <= cdc_pattern(%s);\n" % (register.name, f.name, self.vhdl_field_range(f))
+            s += indent(4) + "user2regs.%s.%s.strobe <= '1';\n" % (register.name, f.name)
+        s += indent(4) + "cdc_cycles := cdc_cycles + 1;\n"
+        s += indent(3) + "elsif falling_edge(user_clk) then\n"
+        for f in fields:
+            s += indent(4) + "user2regs.%s.%s.strobe <= '0';\n" % (register.name, f.name)
+        s += indent(4) + "cdc_cycles := cdc_cycles + 1;\n"
+        s += indent(3) + "end if;\n"
+        s += indent(2) + "end loop;\n"
+        s += indent(2) + "if cdc_reading then\n"
+        s += indent(3) + 'report "no read acknowledge during back-to-back user-logic writes" severity error;\n'
+        s += indent(3) + "errors := errors + 1;\n"
+        s += indent(3) + "cs <= '0';\n"
+        s += indent(2) + "end if;\n"
+        s += indent(2) + "if regs2user.%s.%s = '1' then\n" % (register.name, Module.CDC_BUSY_NAME)
+        s += indent(3) + "wait until regs2user.%s.%s = '0' for CDC_TIMEOUT;\n" % (register.name, Module.CDC_BUSY_NAME)
+        s += indent(2) + "end if;\n"
+        s += indent(2) + 'check(regs2user.%s.%s, \'0\', "cdc_busy of register \'%s\' after back-to-back user-logic writes");\n' % (register.name, Module.CDC_BUSY_NAME, register.name)
+        s += indent(2) + "bus_read(%s, data);\n" % address
+        s += indent(2) + 'check_masked(data, cdc_expected, x"%.8X", "last of back-to-back user-logic writes of register \'%s\'");\n' % (user_mask, register.name)
+        s += indent(2) + "if cdc_accepted < 2 then\n"
+        s += indent(3) + 'report "back-to-back user-logic writes of register \'%s\' not taken over" severity error;\n' % register.name
+        s += indent(3) + "errors := errors + 1;\n"
+        s += indent(2) + "end if;\n"
+        return s
+    #
+    # Returns the checks of a memory: PATTERN_A and PATTERN_B are written to
+    # its first and last word, through the bus or the user-logic port, and
+    # read back through the other port(s)
+    def memory_checks(self, memory):
+        s = ""
+        clock = "user_clk" if memory.is_user_clocked() else "clk"
+        words = ((0, "PATTERN_A"), (memory.depth - 1, "PATTERN_B"))
+        if memory.is_bus_writable():
+            for index, pattern in words:
+                s += indent(2) + 'bus_write(x"%.8X", %s);\n' % (memory.addressOffset + 4 * index, pattern)
+        else:
+            for index, pattern in words:
+                s += indent(2) + "wait until falling_edge(%s);\n" % clock
+                s += indent(2) + "user2regs.%s.addr <= %s;\n" % (memory.name, self.memory_index(memory, index))
+                s += indent(2) + "user2regs.%s.data <= %s;\n" % (memory.name, pattern)
+                s += indent(2) + "user2regs.%s.we <= '1';\n" % memory.name
+            s += indent(2) + "wait until falling_edge(%s);\n" % clock
+            s += indent(2) + "user2regs.%s.we <= '0';\n" % memory.name
+        if memory.is_bus_readable():
+            for index, pattern in words:
+                s += indent(2) + 'bus_read(x"%.8X", data);\n' % (memory.addressOffset + 4 * index)
+                s += indent(2) + 'check(data, %s, "bus read of word %d of memory \'%s\'");\n' % (pattern, index, memory.name)
+        for index, pattern in words:
+            s += indent(2) + "wait until falling_edge(%s);\n" % clock
+            s += indent(2) + "user2regs.%s.addr <= %s;\n" % (memory.name, self.memory_index(memory, index))
+            s += indent(2) + "wait until falling_edge(%s);\n" % clock
+            s += indent(2) + 'check(regs2user.%s.data, %s, "user-logic read of word %d of memory \'%s\'");\n' % (memory.name, pattern, index, memory.name)
+        return s
+    #
+    # Returns a bit-string literal of a memory word index
+    def memory_index(self, memory, index):
+        return '"%s"' % format(index, "0%db" % memory.address_width())
+    #
+    # Returns a named-association aggregate of register addresses
+    def address_aggregate(self, registers):
+        return ", ".join(["%d => %s" % (i, self.address_identifier(r)) for i, r in enumerate(registers)])
+    #
+    # Returns a loop of NUM_TRANSACTIONS back-to-back accesses with a throughput report
+    def throughput_loop(self, name, body):
+        s = indent(2) + "start_cycle := cycle;\n"
+        s += indent(2) + "for i in 0 to NUM_TRANSACTIONS - 1 loop\n"
+        for line in body:
+            s += indent(3) + line + "\n"
+        s += indent(2) + "end loop;\n"
+        s += indent(2) + 'report_throughput("%s", NUM_TRANSACTIONS, cycle - start_cycle);\n' % name
+        return s
+    #
     def save(self, filename):
         with open(filename, 'w') as f:
             f.write(self._code)
 #
+# SystemVerilog generators: a package with packed-struct regs2user/user2regs
+# types and a module that is functionally equivalent to the VHDL component,
+# written in the synthesizable subset that Verilator lints and simulates
+#
+class SystemVerilogGenerator(CodeGenerator):
+    #
+    # Raise a ModuleError if a name of the module is a SystemVerilog keyword
+    def check_identifiers(self, module):
+        names = [module.name] + [r.name for r in module.registers] + [f.name for r in module.registers for f in r.fields] + [m.name for m in module.memories]
+        for name in names:
+            if name.lower() in RESERVED_SYSTEMVERILOG_KEYWORDS:
+                raise ModuleError(module, "'%s' is a reserved SystemVerilog keyword" % name)
+    #
+    # Returns the name of the SystemVerilog package, e.g. 'example_regs_pkg'
+    def sv_package_name(self, module):
+        return module.name.lower() + '_regs_pkg'
+    #
+    # Returns the indexed part-select of a field's bits, e.g. 'OFFSET_CONTROL_START +: WIDTH_CONTROL_START'
+    def sv_field_range(self, field):
+        return "%s +: %s" % (self.bitOffset_identifier(field), self.bitWidth_identifier(field))
+    #
+    # Returns the condition that addr is in a memory's address window
+    def sv_memory_hit(self, memory):
+        return "addr[31:%s + 2] == %s[31:%s + 2]" % (self.address_width_identifier(memory), self.address_identifier(memory), self.address_width_identifier(memory))
+    #
+    # Returns a register's bus-writable fields in the user clock domain
+    def cdc_write_fields(self, register):
+        return [f for f in self.sorted_fields(register) if f.is_bus_writable() and f.is_user_clocked()]
+    #
+    # Returns a register's user-writable fields in the user clock domain
+    def cdc_read_fields(self, register):
+        return [f for f in self.sorted_fields(register) if f.is_user_writable() and f.is_user_clocked()]
+    #
+    def save(self, filename):
+        self.save_if_changed(filename)
+#
+# SystemVerilog package generator
+#
+class SystemVerilogPackageGenerator(SystemVerilogGenerator):
+    def __init__(self, module):
+        self.check_identifiers(module)
+        declarations = []  # joined once, as repeated += of unicode strings is quadratic
+        user2regs = []
+        regs2user = []
+        for r in self.sorted_registers(module):
+            s = "\n" + indent(1) + "// register '%s'\n" % r.name
+            s += indent(1) + "localparam logic [31:0] %s = 32'h%.8X;\n" % (self.address_identifier(r), r.addressOffset)
+            fields = self.sorted_fields(r)
+            for f in fields:
+                s += indent(1) + "// field '%s' (%s%s)\n" % (f.name, f.access(), ", pass-through" if f.is_pass_through() else "")
+                s += indent(1) + "localparam int %s = %d;\n" % (self.bitOffset_identifier(f), f.bitOffset)
+                s += indent(1) + "localparam int %s = %d;\n" % (self.bitWidth_identifier(f), f.bitWidth)
+                s += indent(1) + "localparam logic [31:0] %s = 32'h%.8X;\n" % (self.bitMask_identifier(f), self.bitMask(f))
+                members = ["logic [%s - 1:0] value;" % self.bitWidth_identifier(f)]
+                if not f.is_pass_through():
+                    members.append("logic strobe;")
+                s += self.struct(self.vhdl_record_name(f), members)
+            members = ["%s %s;" % (self.vhdl_record_name(f), f.name) for f in fields if f.is_user_writable()]
+            if len(members) > 0:
+                s += self.struct("t_%s_user2regs" % r.name, members)
+                user2regs.append("t_%s_user2regs %s;" % (r.name, r.name))
+            members = ["%s %s;" % (self.vhdl_record_name(f), f.name) for f in fields if f.is_bus_writable()]
+            if len(self.cdc_read_fields(r)) > 0:
+                members.append("logic %s;" % Module.CDC_BUSY_NAME)
+            if len(members) > 0:
+                s += self.struct("t_%s_regs2user" % r.name, members)
+                regs2user.append("t_%s_regs2user %s;" % (r.name, r.name))
+            declarations.append(s)
+        for m in self.sorted_memories(module):
+            s = "\n" + indent(1) + "// memory '%s' (%s)\n" % (m.name, m.access)
+            s += indent(1) + "localparam logic [31:0] %s = 32'h%.8X;\n" % (self.address_identifier(m), m.addressOffset)
+            s += indent(1) + "localparam int %s = %d;\n" % (self.depth_identifier(m), m.depth)
+            s += indent(1) + "localparam int %s = %d; // word address bits\n" % (self.address_width_identifier(m), m.address_width())
+            members = ["logic [%s - 1:0] addr;" % self.address_width_identifier(m)]
+            if m.is_user_writable():
+                members.append("logic [31:0] data;")
+                members.append("logic we;")
+            s += self.struct("t_%s_user2regs" % m.name, members)
+            user2regs.append("t_%s_user2regs %s;" % (m.name, m.name))
+            s += self.struct("t_%s_regs2user" % m.name, ["logic [31:0] data; // data at addr, one clock cycle later"])
+            regs2user.append("t_%s_regs2user %s;" % (m.name, m.name))
+            declarations.append(s)
+        # empty structs are not allowed
+        if len(user2regs) == 0:
+            user2regs.append("logic dummy;")
+        if len(regs2user) == 0:
+            regs2user.append("logic dummy;")
+        declarations.append("\n" + indent(1) + "// user logic -> register file interface\n")
+        declarations.append(self.struct("t_user2regs", user2regs))
+        declarations.append("\n" + indent(1) + "// register file -> user logic interface\n")
+        declarations.append(self.struct("t_regs2user", regs2user))
+        d = dict(package_name = self.sv_package_name(module),
+                 declarations = "".join(declarations),
+                 json_module_name = module.name,
+                 hdlregs_version = HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self._code = systemverilog_package_template.substitute(d)
+    #
+    # Returns a packed struct typedef
+    def struct(self, name, members):
+        s = indent(1) + "typedef struct packed {\n"
+        for member in members:
+            s += indent(2) + member + "\n"
+        s += indent(1) + "} %s;\n" % name
+        return s
+#
+# SystemVerilog module generator. Unlike the VHDL component, the module does
+# not rely on initial values: all flip-flops are set by the resets, except for
+# the toggles, synchronizers and data holding registers of the clock-domain
+# crossings. As in the VHDL component, these are initialized and
+# never reset, so that a reset of only one clock domain cannot signal a
+# crossing. Reads of unmapped addresses return zero.
+#
+class SystemVerilogModuleGenerator(SystemVerilogGenerator):
+    def __init__(self, module):
+        self.check_identifiers(module)
+        registers = self.sorted_registers(module)
+        memories = self.sorted_memories(module)
+        read_latency = self.read_latency(module)
+        #
+        # Signal declarations
+        signal_declarations = []
+        for r in registers:
+            signal_declarations.append("\n" + indent(1) + "// %s\n" % self.vhdl_section_name(r))
+            signal_declarations.append(indent(1) + "logic [31:0] %s;\n" % self.vhdl_data_signal(r))
+            if r.is_bus_writable():
+                signal_declarations.append(indent(1) + "logic %s;\n" % self.vhdl_strobe_signal(r))
+            if len(self.cdc_write_fields(r)) > 0:
+                signal_declarations.append(indent(1) + "logic %s = 1'b0;\n" % self.vhdl_cdc_signal(r, "wtoggle"))
+                signal_declarations.append(indent(1) + "logic [31:0] %s = 32'h%.8X;\n" % (self.vhdl_cdc_signal(r, "whold"), r.reset()))
+                signal_declarations.append(indent(1) + '(* ASYNC_REG = "TRUE" *) logic [2:0] %s = \'0;\n' % self.vhdl_cdc_signal(r, "wsync"))
+                signal_declarations.append(indent(1) + '(* ASYNC_REG = "TRUE" *) logic [1:0] %s = \'0;\n' % self.vhdl_cdc_signal(r, "wack"))
+                signal_declarations.append(indent(1) + "logic [31:0] %s;\n" % self.vhdl_cdc_signal(r, "user"))
+                signal_declarations.append(indent(1) + "logic %s;\n" % self.vhdl_cdc_signal(r, "ustrobe"))
+            if len(self.cdc_read_fields(r)) > 0:
+                signal_declarations.append(indent(1) + "logic %s = 1'b0;\n" % self.vhdl_cdc_signal(r, "rtoggle"))
+                signal_declarations.append(indent(1) + "logic [31:0] %s = 32'h%.8X;\n" % (self.vhdl_cdc_signal(r, "rhold"), r.reset()))
+                signal_declarations.append(indent(1) + '(* ASYNC_REG = "TRUE" *) logic [2:0] %s = \'0;\n' % self.vhdl_cdc_signal(r, "rsync"))
+                signal_declarations.append(indent(1) + '(* ASYNC_REG = "TRUE" *) logic [1:0] %s = \'0;\n' % self.vhdl_cdc_signal(r, "rack"))
+        for m in memories:
+            signal_declarations.append("\n" + indent(1) + "// %s\n" % self.vhdl_memory_section_name(m))
+            signal_declarations.append(indent(1) + "logic [31:0] %s [2 ** %s];\n" % (self.vhdl_ram_signal(m), self.address_width_identifier(m)))
+            signal_declarations.append(indent(1) + "logic [31:0] s_%s_udata_q;\n" % m.name.lower())
+            if m.is_bus_readable():
+                signal_declarations.append(indent(1) + "logic [31:0] s_%s_rdata_q;\n" % m.name.lower())
+                signal_declarations.append(indent(1) + "logic s_%s_read_q;\n" % m.name.lower())
+        # With a registered read path, the register read multiplexer drives
+        # s_rdata_regs, which is registered along with the memory outputs
+        if read_latency > 0:
+            read_target = "s_rdata_regs"
+            signal_declarations.append("\n" + indent(1) + "logic [31:0] s_rdata_regs;\n")
+            signal_declarations.append(indent(1) + "logic [31:0] s_rdata_regs_q;\n")
+        else:
+            read_target = "dataout"
+        #
+        # Register-write process, user clock domain side of the clock-domain
+        # crossings and memory ports
+        register_write_proc = [self.register_write_process(registers)]
+        for r in registers:
+            if len(self.cdc_write_fields(r)) > 0 or len(self.cdc_read_fields(r)) > 0:
+                register_write_proc.append("\n" + self.user_clock_process(r))
+        for m in memories:
+            register_write_proc.append("\n" + self.memory_bus_port(m))
+            register_write_proc.append("\n" + self.memory_user_port(m))
+        #
+        # Bus-read process
+        register_read_proc = [self.bus_read_process(registers, read_target)]
+        if read_latency > 0:
+            register_read_proc.append("\n" + self.read_data_process(memories))
+        #
+        # Continuous assignments
+        concurrent_signal_assignments = []
+        for r in registers:
+            for f in self.sorted_fields(r):
+                if f.is_bus_writable() and f.is_user_clocked():
+                    concurrent_signal_assignments.append(indent(1) + "assign regs2user.%s.%s.value = %s[%s];\n" % (r.name, f.name, self.vhdl_cdc_signal(r, "user"), self.sv_field_range(f)))
+                    concurrent_signal_assignments.append(indent(1) + "assign regs2user.%s.%s.strobe = %s;\n" % (r.name, f.name, self.vhdl_cdc_signal(r, "ustrobe")))
+                elif f.is_bus_writable():
+                    concurrent_signal_assignments.append(indent(1) + "assign regs2user.%s.%s.value = %s[%s];\n" % (r.name, f.name, self.vhdl_data_signal(r), self.sv_field_range(f)))
+                    concurrent_signal_assignments.append(indent(1) + "assign regs2user.%s.%s.strobe = %s;\n" % (r.name, f.name, self.vhdl_strobe_signal(r)))
+            if len(self.cdc_read_fields(r)) > 0:
+                concurrent_signal_assignments.append(indent(1) + "assign regs2user.%s.%s = %s ^ %s[1];\n" % (r.name, Module.CDC_BUSY_NAME, self.vhdl_cdc_signal(r, "rtoggle"), self.vhdl_cdc_signal(r, "rack")))
+        for m in memories:
+            concurrent_signal_assignments.append(indent(1) + "assign regs2user.%s.data = s_%s_udata_q;\n" % (m.name, m.name.lower()))
+        if not any([r.is_bus_writable() or len(self.cdc_read_fields(r)) > 0 for r in registers]) and len(memories) == 0:
+            concurrent_signal_assignments.append(indent(1) + "assign regs2user.dummy = 1'b0;\n")
+        user_ports = ""
+        if self.has_user_clock(module):
+            user_ports += indent(1) + "input  logic        user_clk,  // user-logic clock\n"
+            user_ports += indent(1) + "input  logic        user_rst,  // synchronous to user_clk, high-active\n"
+        d = dict(module_name = self.vhdl_entity_name(module),
+                 package_name = self.sv_package_name(module),
+                 user_ports = user_ports,
+                 signal_declarations = "".join(signal_declarations),
+                 register_write_proc = "".join(register_write_proc),
+                 register_read_proc = "".join(register_read_proc),
+                 concurrent_signal_assignments = "".join(concurrent_signal_assignments),
+                 json_module_name = module.name,
+                 hdlregs_version = HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self._code = systemverilog_module_template.substitute(d)
+    #
+    # Returns the clocked process writing the registers, with the bus clock
+    # domain side of the clock-domain crossings
+    def register_write_process(self, registers):
+        parts = [indent(1) + "always_ff @(posedge clk) begin : register_write\n"]
+        parts.append(indent(2) + "if (rst) begin\n")
+        for r in registers:
+            parts.append(indent(3) + "%s <= 32'h%.8X;\n" % (self.vhdl_data_signal(r), r.reset()))
+            if r.is_bus_writable():
+                parts.append(indent(3) + "%s <= 1'b0;\n" % self.vhdl_strobe_signal(r))
+        parts.append(indent(2) + "end else begin\n")
+        for r in registers:
+            statements = self.register_write_statements(r)
+            if len(statements) > 0:
+                parts.append(indent(3) + "// %s\n" % self.vhdl_section_name(r))
+                parts.append(statements)
+        parts.append(indent(2) + "end\n")
+        parts.append(indent(1) + "end : register_write\n")
+        return "".join(parts)
+    #
+    # Returns the statements of the register-write process that update one
+    # register: strobe default, self-clearing fields, bus write and user-logic
+    # write, in this order of precedence
+    def register_write_statements(self, register):
+        s = ""
+        data = self.vhdl_data_signal(register)
+        strobe = self.vhdl_strobe_signal(register)
+        fields = self.sorted_fields(register)
+        if register.is_bus_writable():
+            s += indent(3) + "%s <= 1'b0; // default\n" % strobe
+            for f in fields:
+                if f.selfClear:
+                    s += indent(3) + "%s[%s] <= '0; // self-clearing\n" % (data, self.sv_field_range(f))
+            condition = "cs && !rnw && addr == %s" % self.address_identifier(register)
+            if register.cdc_busy_field is not None:
+                # the previous write has not crossed to the user clock domain yet
+                busy = register.cdc_busy_field
+                condition += " && !%s[%s]" % (self.vhdl_data_signal(busy.parent_reg), self.sv_field_range(busy))
+            s += indent(3) + "if (%s) begin\n" % condition
+            for f in fields:
+                if f.is_bus_writable():
+                    s += indent(4) + "%s[%s] <= datain[%s];\n" % (data, self.sv_field_range(f), self.sv_field_range(f))
+            s += indent(4) + "%s <= 1'b1;\n" % strobe
+            # clock-domain crossing: hold the written data and signal the write by a toggle
+            cdc_write_fields = self.cdc_write_fields(register)
+            for f in cdc_write_fields:
+                s += indent(4) + "%s[%s] <= datain[%s];\n" % (self.vhdl_cdc_signal(register, "whold"), self.sv_field_range(f), self.sv_field_range(f))
+            if len(cdc_write_fields) > 0:
+                wtoggle = self.vhdl_cdc_signal(register, "wtoggle")
+                s += indent(4) + "%s <= !%s;\n" % (wtoggle, wtoggle)
+            s += indent(3) + "end\n"
+            # clock-domain crossing: synchronize the toggle value acknowledged by the user clock domain
+            if len(cdc_write_fields) > 0:
+                wack = self.vhdl_cdc_signal(register, "wack")
+                s += indent(3) + "%s <= {%s[0], %s[2]};\n" % (wack, wack, self.vhdl_cdc_signal(register, "wsync"))
+        # clock-domain crossing: take over the held user-logic data when the synchronized toggle changes
+        cdc_read_fields = self.cdc_read_fields(register)
+        if len(cdc_read_fields) > 0:
+            rsync = self.vhdl_cdc_signal(register, "rsync")
+            s += indent(3) + "%s <= {%s[1:0], %s};\n" % (rsync, rsync, self.vhdl_cdc_signal(register, "rtoggle"))
+            s += indent(3) + "if (%s[2] != %s[1]) begin\n" % (rsync, rsync)
+            for f in cdc_read_fields:
+                s += indent(4) + "%s[%s] <= %s[%s];\n" % (data, self.sv_field_range(f), self.vhdl_cdc_signal(register, "rhold"), self.sv_field_range(f))
+            s += indent(3) + "end\n"
+        # busy flags of the clock-domain crossings
+        for f in fields:
+            if f.cdc_register is not None:
+                s += indent(3) + "%s[%s] <= %s ^ %s[1];\n" % (data, self.sv_field_range(f), self.vhdl_cdc_signal(f.cdc_register, "wtoggle"), self.vhdl_cdc_signal(f.cdc_register, "wack"))
+                s += indent(3) + "if (cs && !rnw && addr == %s) begin\n" % self.address_identifier(f.cdc_register)
+                s += indent(4) + "%s[%s] <= 1'b1;\n" % (data, self.sv_field_range(f))
+                s += indent(3) + "end\n"
+        for f in fields:
+            if f.is_user_writable() and not f.is_user_clocked() and not f.is_pass_through():
+                s += indent(3) + "if (user2regs.%s.%s.strobe) begin\n" % (register.name, f.name)
+                s += indent(4) + "%s[%s] <= user2regs.%s.%s.value;\n" % (data, self.sv_field_range(f), register.name, f.name)
+                s += indent(3) + "end\n"
+        return s
+    #
+    # Returns the user_clk process of a register's clock-domain crossings (see
+    # VhdlComponentGenerator.user_clock_process)
+    def user_clock_process(self, register):
+        name = register.name.lower() + "_cdc"
+        reset = ""
+        s = ""
+        cdc_write_fields = self.cdc_write_fields(register)
+        if len(cdc_write_fields) > 0:
+            user = self.vhdl_cdc_signal(register, "user")
+            ustrobe = self.vhdl_cdc_signal(register, "ustrobe")
+            wsync = self.vhdl_cdc_signal(register, "wsync")
+            reset += indent(3) + "%s <= 32'h%.8X;\n" % (user, register.reset())
+            reset += indent(3) + "%s <= 1'b0;\n" % ustrobe
+            s += indent(3) + "%s <= {%s[1:0], %s};\n" % (wsync, wsync, self.vhdl_cdc_signal(register, "wtoggle"))
+            s += indent(3) + "%s <= 1'b0; // default\n" % ustrobe
+            for f in cdc_write_fields:
+                if f.selfClear:
+                    s += indent(3) + "%s[%s] <= '0; // self-clearing\n" % (user, self.sv_field_range(f))
+            s += indent(3) + "if (%s[2] != %s[1]) begin\n" % (wsync, wsync)
+            for f in cdc_write_fields:
+                s += indent(4) + "%s[%s] <= %s[%s];\n" % (user, self.sv_field_range(f), self.vhdl_cdc_signal(register, "whold"), self.sv_field_range(f))
+            s += indent(4) + "%s <= 1'b1;\n" % ustrobe
+            s += indent(3) + "end\n"
+        cdc_read_fields = self.cdc_read_fields(register)
+        if len(cdc_read_fields) > 0:
+            rhold = self.vhdl_cdc_signal(register, "rhold")
+            rtoggle = self.vhdl_cdc_signal(register, "rtoggle")
+            rack = self.vhdl_cdc_signal(register, "rack")
+            s += indent(3) + "%s <= {%s[0], %s[2]};\n" % (rack, rack, self.vhdl_cdc_signal(register, "rsync"))
+            # strobes are ignored until the previous value has been acknowledged
+            ready = "%s == %s[1]" % (rtoggle, rack)
+            strobes = []
+            for f in cdc_read_fields:
+                strobe = "user2regs.%s.%s.strobe" % (register.name, f.name)
+                strobes.append(strobe)
+                s += indent(3) + "if (%s && %s) begin\n" % (strobe, ready)
+                s += indent(4) + "%s[%s] <= user2regs.%s.%s.value;\n" % (rhold, self.sv_field_range(f), register.name, f.name)
+                s += indent(3) + "end\n"
+            if len(strobes) > 1:
+                strobes = "(%s)" % " || ".join(strobes)
+            else:
+                strobes = strobes[0]
+            s += indent(3) + "if (%s && %s) begin\n" % (strobes, ready)
+            s += indent(4) + "%s <= !%s;\n" % (rtoggle, rtoggle)
+            s += indent(3) + "end\n"
+        process = indent(1) + "always_ff @(posedge user_clk) begin : %s\n" % name
+        if reset:
+            process += indent(2) + "if (user_rst) begin\n" + reset
+            process += indent(2) + "end else begin\n" + s
+            process += indent(2) + "end\n"
+        else:
+            # without reset statements, the reset branch is omitted
+            process += "".join([line[len(indent(1)):] + "\n" for line in s.splitlines()])
+        process += indent(1) + "end : %s\n" % name
+        return process
+    #
+    # Returns the process of a memory's bus port, which writes the RAM (unless
+    # the memory is read-only) and reads it (unless it is write-only)
+    def memory_bus_port(self, memory):
+        name = memory.name.lower() + "_bus_port"
+        index = "addr[%s + 1:2]" % self.address_width_identifier(memory)
+        s = indent(1) + "always_ff @(posedge clk) begin : %s\n" % name
+        if memory.is_bus_writable():
+            s += indent(2) + "if (cs && !rnw && %s) begin\n" % self.sv_memory_hit(memory)
+            s += indent(3) + "%s[%s] <= datain;\n" % (self.vhdl_ram_signal(memory), index)
+            s += indent(2) + "end\n"
+        if memory.is_bus_readable():
+            s += indent(2) + "s_%s_rdata_q <= %s[%s];\n" % (memory.name.lower(), self.vhdl_ram_signal(memory), index)
+        s += indent(1) + "end : %s\n" % name
+        return s
+    #
+    # Returns the process of a memory's user-logic port, which writes the RAM
+    # if the memory is read-only, and always reads it
+    def memory_user_port(self, memory):
+        name = memory.name.lower() + "_user_port"
+        clock = "user_clk" if memory.is_user_clocked() else "clk"
+        index = "user2regs.%s.addr" % memory.name
+        s = indent(1) + "always_ff @(posedge %s) begin : %s\n" % (clock, name)
+        if memory.is_user_writable():
+            s += indent(2) + "if (user2regs.%s.we) begin\n" % memory.name
+            s += indent(3) + "%s[%s] <= user2regs.%s.data;\n" % (self.vhdl_ram_signal(memory), index, memory.name)
+            s += indent(2) + "end\n"
+        s += indent(2) + "s_%s_udata_q <= %s[%s];\n" % (memory.name.lower(), self.vhdl_ram_signal(memory), index)
+        s += indent(1) + "end : %s\n" % name
+        return s
+    #
+    # Returns the combinational process multiplexing the bus-readable
+    # registers onto the target signal
+    def bus_read_process(self, registers, target):
+        parts = [indent(1) + "always_comb begin : bus_read\n"]
+        parts.append(indent(2) + "%s = '0; // default\n" % target)
+        parts.append(indent(2) + "if (cs && rnw) begin\n")
+        for r in registers:
+            if r.is_bus_readable():
+                parts.append(indent(3) + "if (addr == %s) begin\n" % self.address_identifier(r))
+                for f in self.sorted_fields(r):
+                    if f.is_pass_through():
+                        parts.append(indent(4) + "%s[%s] = user2regs.%s.%s.value;\n" % (target, self.sv_field_range(f), r.name, f.name))
+                    elif f.is_bus_readable():
+                        parts.append(indent(4) + "%s[%s] = %s[%s];\n" % (target, self.sv_field_range(f), self.vhdl_data_signal(r), self.sv_field_range(f)))
+                parts.append(indent(3) + "end\n")
+        parts.append(indent(2) + "end\n")
+        parts.append(indent(1) + "end : bus_read\n")
+        return "".join(parts)
+    #
+    # Returns the registered read path of a module with bus-readable memories
+    # (see VhdlComponentGenerator.read_data_process)
+    def read_data_process(self, memories):
+        readable_memories = [m for m in memories if m.is_bus_readable()]
+        s = indent(1) + "always_ff @(posedge clk) begin : read_data\n"
+        s += indent(2) + "s_rdata_regs_q <= s_rdata_regs;\n"
+        for m in readable_memories:
+            s += indent(2) + "s_%s_read_q <= cs && rnw && %s;\n" % (m.name.lower(), self.sv_memory_hit(m))
+        s += indent(1) + "end : read_data\n\n"
+        s += indent(1) + "assign dataout = "
+        for m in readable_memories:
+            s += "s_%s_read_q ? s_%s_rdata_q :\n%s" % (m.name.lower(), m.name.lower(), indent(1) + " " * len("assign dataout = "))
+        s += "s_rdata_regs_q;\n"
+        return s
+#
 # C header generator
 #
 class CHeaderGenerator(CodeGenerator):
@@ -734,6 +2955,10 @@ class CHeaderGenerator(CodeGenerator):
         address_offsets = ""
         for r in module.registers:
             address_offsets += '#define %s 0x%.8X\n' % (self.address_identifier(r), r.addressOffset)
+        # Memory base addresses and depths in words
+        for m in self.sorted_memories(module):
+            address_offsets += '#define %s 0x%.8X\n' % (self.address_identifier(m), m.addressOffset)
+            address_offsets += '#define %s %d\n' % (self.depth_identifier(m), m.depth)
         # Field bit offsets
         fields = ""
         for r in module.registers:
@@ -743,7 +2968,7 @@ class CHeaderGenerator(CodeGenerator):
             fields += "//\n"
             for f in r.fields:
                 field_name = f.name.upper()
-                field_mask = (2 ** f.bitWidth - 1) << f.bitOffset
+                field_mask = self.bitMask(f)
                 fields += "// Field '%s'\n" % f.name
                 fields += "#define %s %d\n" % (self.bitOffset_identifier(f), f.bitOffset)
                 fields += "#define %s %d\n" % (self.bitWidth_identifier(f), f.bitWidth)
@@ -763,6 +2988,465 @@ class CHeaderGenerator(CodeGenerator):
         with open(filename, 'w') as f:
             f.write(self._code)
 #
+# C accessor header generator: static inline field accessors, a volatile
+# struct overlay of the register block and shadow-register helpers
+#
+class CAccessorHeaderGenerator(CodeGenerator):
+    def __init__(self, module):
+        prefix = module.name.lower()
+        # Register block overlay, with reserved words filling the address holes;
+        # memories are arrays spanning their whole address window
+        struct_members = ""
+        offset_checks = []
+        next_addr = 0
+        num_reserved = 0
+        for r in sorted(module.registers + module.memories, key=lambda r: r.addressOffset):
+            offset_checks.append("typedef char %s_%s_offset_check[(offsetof(%s_regs_t, %s) == 0x%X) ? 1 : -1];\n" % (prefix, r.name.lower(), prefix, r.name.lower(), r.addressOffset))
+            if r.addressOffset > next_addr:
+                struct_members += indent(1) + "uint32_t reserved%d[%d]; // 0x%.8X - 0x%.8X\n" % (num_reserved, (r.addressOffset - next_addr) // 4, next_addr, r.addressOffset - 4)
+                num_reserved += 1
+            if isinstance(r, Memory):
+                struct_members += indent(1) + "volatile uint32_t %s[%d]; // 0x%.8X - 0x%.8X, %d words used\n" % (r.name.lower(), r.size() // 4, r.addressOffset, r.addressOffset + r.size() - 4, r.depth)
+                next_addr = r.addressOffset + r.size()
+            else:
+                struct_members += indent(1) + "volatile uint32_t %s; // 0x%.8X\n" % (r.name.lower(), r.addressOffset)
+                next_addr = r.addressOffset + 4
+        # Shadow registers
+        shadowed_registers = [r for r in module.registers if self.has_write_only_fields(r)]
+        shadow_members = ""
+        shadow_init = ""
+        for r in shadowed_registers:
+            shadow_members += indent(1) + "uint32_t %s;\n" % r.name.lower()
+            shadow_init += indent(1) + "shadow->%s = 0x%.8X;\n" % (r.name.lower(), r.reset() & ~self.selfClear_mask(r))
+        if len(shadowed_registers) == 0:
+            shadow_members += indent(1) + "uint32_t dummy; // no registers with write-only fields\n"
+            shadow_init += indent(1) + "shadow->dummy = 0;\n"
+        # Accessor functions
+        accessors = ""
+        for r in module.registers:
+            accessors += self.to_c_accessors(r, prefix)
+        d = dict(module_name = module.name.upper() + "_REGS",
+                 header_file = module.name + "_regs.h",
+                 prefix = prefix,
+                 size = "%X" % next_addr,
+                 struct_members = struct_members,
+                 offset_checks = "".join(offset_checks),
+                 shadow_members = shadow_members,
+                 shadow_init = shadow_init,
+                 accessors = accessors,
+                 json_module_name = module.name,
+                 hdlregs_version = HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self._code = c_accessor_header_template.substitute(d)
+    #
+    # Returns True if the register has at least one write-only field
+    def has_write_only_fields(self, register):
+        for f in register.fields:
+            if f.access() == "write-only":
+                return True
+        return False
+    #
+    # Generate the C accessor functions for a register
+    def to_c_accessors(self, register, prefix):
+        reg_name = register.name.lower()
+        reg_prefix = "%s_%s" % (prefix, reg_name)
+        writable_fields = [f for f in register.fields if f.is_bus_writable()]
+        s = "\n//\n// Register '%s'\n//\n" % register.name
+        # field get/set on register values
+        for f in register.fields:
+            mask = self.bitMask_identifier(f)
+            offset = self.bitOffset_identifier(f)
+            s += "static inline uint32_t %s_get_%s(uint32_t reg) { return (reg & %s) >> %s; }\n" % (reg_prefix, f.name.lower(), mask, offset)
+            if f.is_bus_writable():
+                s += "static inline uint32_t %s_set_%s(uint32_t reg, uint32_t value) { return (reg & ~%s) | ((value << %s) & %s); }\n" % (reg_prefix, f.name.lower(), mask, offset, mask)
+        # build a register value from all of its bus-writable fields
+        if len(writable_fields) > 0:
+            params = ", ".join(["uint32_t %s" % f.name.lower() for f in writable_fields])
+            terms = ["((%s << %s) & %s)" % (f.name.lower(), self.bitOffset_identifier(f), self.bitMask_identifier(f)) for f in writable_fields]
+            s += "static inline uint32_t %s_pack(%s)\n{\n" % (reg_prefix, params)
+            s += indent(1) + "return %s;\n}\n" % (" |\n" + indent(2)).join(terms)
+        # register read/write
+        if register.is_bus_readable():
+            s += "static inline uint32_t %s_read(const %s_regs_t *regs) { return regs->%s; }\n" % (reg_prefix, prefix, reg_name)
+        if register.is_bus_writable():
+            s += "static inline void %s_write(%s_regs_t *regs, uint32_t value) { regs->%s = value; }\n" % (reg_prefix, prefix, reg_name)
+        # single-field writes: from the shadow copy if the register has
+        # write-only fields, by read-modify-write otherwise
+        if self.has_write_only_fields(register):
+            s += "static inline void %s_shadow_write(%s_regs_t *regs, %s_shadow_t *shadow, uint32_t value)\n{\n" % (reg_prefix, prefix, prefix)
+            s += indent(1) + "shadow->%s = value & 0x%.8X; // self-clearing bits are not retained\n" % (reg_name, ~self.selfClear_mask(register) & 0xFFFFFFFF)
+            s += indent(1) + "regs->%s = value;\n}\n" % reg_name
+            for f in writable_fields:
+                s += "static inline void %s_write_%s(%s_regs_t *regs, %s_shadow_t *shadow, uint32_t value)\n{\n" % (reg_prefix, f.name.lower(), prefix, prefix)
+                s += indent(1) + "%s_shadow_write(regs, shadow, %s_set_%s(shadow->%s, value));\n}\n" % (reg_prefix, reg_prefix, f.name.lower(), reg_name)
+        elif register.is_bus_readable():
+            for f in writable_fields:
+                s += "static inline void %s_write_%s(%s_regs_t *regs, uint32_t value) { regs->%s = %s_set_%s(regs->%s, value); }\n" % (reg_prefix, f.name.lower(), prefix, reg_name, reg_prefix, f.name.lower(), reg_name)
+        return s
+    #
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            f.write(self._code)
+#
+# Configuration profile generator: per profile, a table of the register
+# writes in a C header and the same table in a binary file
+#
+class CProfileGenerator(CodeGenerator):
+    ENTRY = struct.Struct("<III")  # address offset, value, mask
+    #
+    def __init__(self, module):
+        prefix = module.name.lower()
+        self.module_name = module.name
+        self.blobs = []  # (profile name, binary table)
+        profiles = ""
+        for p in module.profiles:
+            writes = p.writes()
+            count_identifier = "%s_PROFILE_%s_COUNT" % (module.name.upper(), p.name.upper())
+            profiles += "\n//\n// Profile '%s'" % p.name
+            if p.description:
+                profiles += ": %s" % p.description
+            profiles += "\n//\n"
+            profiles += "#define %s %d\n" % (count_identifier, len(writes))
+            profiles += "static const %s_init_t %s_profile_%s[%s] = {\n" % (prefix, prefix, p.name.lower(), count_identifier)
+            set_fields = dict([(id(f), True) for f, value in p.values])
+            for r, value, mask in writes:
+                field_names = [f.name for f in self.sorted_fields(r) if id(f) in set_fields]
+                profiles += indent(1) + "{ %s, 0x%.8X, 0x%.8X }, // %s\n" % (self.address_identifier(r), value, mask, ", ".join(field_names))
+            profiles += "};\n"
+            self.blobs.append((p.name, b"".join([self.ENTRY.pack(r.addressOffset, value, mask) for r, value, mask in writes])))
+        d = dict(module_name = module.name.upper() + "_REGS",
+                 prefix = prefix,
+                 header_file = module.name + "_regs.h",
+                 profiles = profiles,
+                 json_module_name = module.name,
+                 hdlregs_version = HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self._code = c_profiles_template.substitute(d)
+    #
+    # Save the header, and the binary table of each profile next to it
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            f.write(self._code)
+        for name, blob in self.blobs:
+            with open(os.path.join(os.path.dirname(filename), "%s_regs_profile_%s.bin" % (self.module_name, name)), 'wb') as f:
+                f.write(blob)
+#
+# Python register-access module generator
+#
+class PythonModuleGenerator(CodeGenerator):
+    # Attribute names that are taken by the generated Register and
+    # RegisterBlock classes
+    RESERVED_ATTRIBUTES = ("read", "write", "update", "close", "read_many", "write_many", "get_field", "set_field", "set_fields")
+    #
+    def __init__(self, module):
+        # The parts are joined once, as repeated += of unicode strings is quadratic
+        # Register address offsets
+        address_offsets = []
+        for r in module.registers:
+            address_offsets.append('%s = 0x%.8X\n' % (self.address_identifier(r), r.addressOffset))
+        # Memory base addresses and depths in words
+        for m in self.sorted_memories(module):
+            address_offsets.append('%s = 0x%.8X\n' % (self.address_identifier(m), m.addressOffset))
+            address_offsets.append('%s = %d\n' % (self.depth_identifier(m), m.depth))
+        # Field bit offsets, widths and masks
+        fields = []
+        for r in module.registers:
+            s = "#\n"
+            s += "# Fields in register '%s'\n" % r.name.upper()
+            s += "#\n"
+            for f in r.fields:
+                s += "# Field '%s'\n" % f.name
+                s += "%s = %d\n" % (self.bitOffset_identifier(f), f.bitOffset)
+                s += "%s = %d\n" % (self.bitWidth_identifier(f), f.bitWidth)
+                s += "%s = 0x%.8X\n" % (self.bitMask_identifier(f), self.bitMask(f))
+                s += "%s = (%s, %s, %s)\n" % (self.python_field_identifier(f), self.address_identifier(r), self.bitOffset_identifier(f), self.bitWidth_identifier(f))
+                s += "\n"
+            fields.append(s)
+        # Register layout
+        layout = []
+        for r in module.registers:
+            layout.append(indent(1) + "%s: (0x%.8X, 0x%.8X, 0x%.8X),\n" % (self.address_identifier(r), r.reset(), self.bus_readable_mask(r), self.selfClear_mask(r)))
+        # Typed register accessors
+        registers = []
+        register_instances = []
+        for r in module.registers:
+            class_name = self.python_class_name(r.name) + "Register"
+            s = "\n#\n# Register '%s'\n" % r.name
+            s += "class %s(Register):\n" % class_name
+            s += indent(1) + "ADDRESS = %s\n" % self.address_identifier(r)
+            s += indent(1) + "FIELDS = {%s}\n" % ", ".join(["'%s': %s" % (f.name, self.python_field_identifier(f)) for f in r.fields])
+            for f in r.fields:
+                s += indent(1) + "%s = _field_property(%s)\n" % (self.python_attribute_name(f.name), self.python_field_identifier(f))
+            registers.append(s)
+            register_instances.append(indent(2) + "self.%s = %s(self)\n" % (self.python_attribute_name(r.name), class_name))
+        d = dict(class_name = self.python_class_name(module.name) + "Regs",
+                 example_register = self.python_attribute_name(module.registers[0].name),
+                 example_address = self.address_identifier(module.registers[0]),
+                 address_offsets = "".join(address_offsets),
+                 size = "%.8X" % max([module.high_register().addressOffset + 4] + [m.addressOffset + m.size() for m in module.memories]),
+                 fields = "".join(fields),
+                 layout = "".join(layout),
+                 registers = "".join(registers),
+                 register_instances = "".join(register_instances),
+                 json_module_name = module.name,
+                 hdlregs_version = HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self._code = python_module_template.substitute(d)
+    #
+    # Returns a field's (address, offset, width) identifier, e.g. 'FIELD_CONTROL_RESET'
+    def python_field_identifier(self, field):
+        return 'FIELD_' + field.parent_reg.name.upper() + '_' + field.name.upper()
+    #
+    # Returns a CamelCase class name for an identifier, e.g. 'UartControl' for 'uart_control'
+    def python_class_name(self, name):
+        return "".join([part[0].upper() + part[1:] for part in name.split('_')])
+    #
+    # Returns the attribute name of a register or field accessor, avoiding
+    # Python keywords and the accessor classes' own attributes
+    def python_attribute_name(self, name):
+        if keyword.iskeyword(name) or name in self.RESERVED_ATTRIBUTES:
+            return name + "_"
+        return name
+    #
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            f.write(self._code)
+#
+# Python behavioural model generator
+#
+class PythonModelGenerator(CodeGenerator):
+    def __init__(self, module):
+        address_offsets = ""
+        registers = ""
+        bus_write = ""
+        bus_read = ""
+        strobed = ""
+        self_clear = ""
+        user2regs = ""
+        pass_through = ""
+        regs2user = ""
+        for i, r in enumerate(module.registers):
+            address_identifier = self.address_identifier(r)
+            address_offsets += "%s = 0x%.8X\n" % (address_identifier, r.addressOffset)
+            registers += indent(1) + "('%s', %s, 0x%.8X),\n" % (r.name, address_identifier, r.reset() & ~self.pass_through_mask(r))
+            for f in r.fields:
+                field_key = "('%s', '%s')" % (r.name, f.name)
+                field_entry = "(%d, %d, 0x%.8X)" % (i, f.bitOffset, self.bitMask(f))
+                if f.is_bus_writable():
+                    regs2user += indent(1) + "%s: %s,\n" % (field_key, field_entry)
+                if f.is_pass_through():
+                    pass_through += indent(1) + "%s: %s,\n" % (field_key, field_entry)
+                elif f.is_user_writable():
+                    user2regs += indent(1) + "%s: %s,\n" % (field_key, field_entry)
+            if r.is_bus_writable():
+                bus_write += indent(1) + "%s: (%d, 0x%.8X),\n" % (address_identifier, i, self.bus_writable_mask(r))
+                strobed += "%d, " % i
+                if self.selfClear_mask(r) != 0:
+                    self_clear += "(%d, 0x%.8X), " % (i, ~self.selfClear_mask(r) & 0xFFFFFFFF)
+            if r.is_bus_readable():
+                bus_read += indent(1) + "%s: (%d, 0x%.8X),\n" % (address_identifier, i, self.bus_readable_mask(r))
+        # With a registered read path (bus-readable memories), the register read
+        # data appear on dataout one clock cycle after the access
+        if self.read_latency(module) > 0:
+            bus_read_description = ("# the bus_read process, whose result is registered: the component drives it\n"
+                                    "# on dataout one clock cycle later (read latency %d)." % self.read_latency(module))
+        else:
+            bus_read_description = "# the combinational bus_read process."
+        d = dict(class_name = "".join([part[0].upper() + part[1:] for part in module.name.split('_')]) + "RegsModel",
+                 entity_name = self.vhdl_entity_name(module),
+                 bus_read_description = bus_read_description,
+                 address_offsets = address_offsets,
+                 registers = registers,
+                 bus_write = bus_write,
+                 bus_read = bus_read,
+                 strobed = strobed,
+                 self_clear = self_clear,
+                 user2regs = user2regs,
+                 pass_through = pass_through,
+                 regs2user = regs2user,
+                 json_module_name = module.name,
+                 hdlregs_version = HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self._code = python_model_template.substitute(d)
+    #
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            f.write(self._code)
+#
+# Synthesis resource and critical-path estimator
+#
+class ResourceEstimator(CodeGenerator):
+    LUT_INPUTS = 6  # LUT size of the target architecture
+    # Address decoder options: name -> description. Only the full decoder is
+    # generated; the others are what-if figures for comparison.
+    DECODER_OPTIONS = (("full", "compare all 32 address bits (as generated)"),
+                       ("partial", "compare only the address bits below the highest register address"),
+                       ("sparse", "compare only the address bits that differ between registers"))
+    #
+    def __init__(self, module):
+        self.module = module
+        readable_registers = [r for r in module.registers if r.is_bus_readable()]
+        writable_registers = [r for r in module.registers if r.is_bus_writable()]
+        # flip-flops: register bits holding field data, plus strobes
+        self.data_flip_flops = sum([f.bitWidth for r in module.registers for f in r.fields if not f.is_pass_through()])
+        self.strobe_flip_flops = len(writable_registers)
+        # clock-domain crossings: toggle, 3-stage synchronizer, hold and user-side
+        # registers, user-side strobe and 2-stage acknowledge synchronizer
+        self.cdc_flip_flops = 0
+        for r in module.registers:
+            cdc_write_bits = sum([f.bitWidth for f in r.fields if f.is_user_clocked() and f.is_bus_writable()])
+            cdc_read_bits = sum([f.bitWidth for f in r.fields if f.is_user_clocked() and f.is_user_writable()])
+            if cdc_write_bits > 0:
+                self.cdc_flip_flops += 1 + 3 + 2 * cdc_write_bits + 1 + 2
+            if cdc_read_bits > 0:
+                self.cdc_flip_flops += 1 + 3 + cdc_read_bits + 2
+        self.flip_flops = self.data_flip_flops + self.strobe_flip_flops + self.cdc_flip_flops
+        # read multiplexer: number of sources for each data bit
+        self.read_sources = [0] * 32
+        for r in readable_registers:
+            mask = self.bus_readable_mask(r)
+            for i in range(32):
+                if mask & (1 << i):
+                    self.read_sources[i] += 1
+        self.read_mux_width = len([n for n in self.read_sources if n > 0])
+        self.read_mux_inputs = len(readable_registers)
+        self.sensitivity_list_size = 3 + len(readable_registers)  # cs, rnw, addr + data signals
+        self.num_readable = len(readable_registers)
+        self.num_writable = len(writable_registers)
+        # address layout, from 0 to the end of the highest register or memory
+        self.addresses = [r.addressOffset for r in module.registers]
+        self.address_span = max([a + 4 for a in self.addresses] + [m.addressOffset + m.size() for m in module.memories])
+        # bus reads of one polling cycle of each poll group
+        self.poll_reads = module.poll_reads()
+        # report
+        s = "\nResource estimate for module '%s'\n" % module.name
+        s += "(approximate pre-synthesis figures for %d-input LUT architectures)\n\n" % self.LUT_INPUTS
+        s += "Registers                 : %d (%d bus-writable, %d bus-readable)\n" % (len(module.registers), self.num_writable, self.num_readable)
+        if self.cdc_flip_flops > 0:
+            s += "Flip-flops                : %d (%d data bits + %d strobes + %d clock-domain crossing)\n" % (self.flip_flops, self.data_flip_flops, self.strobe_flip_flops, self.cdc_flip_flops)
+        else:
+            s += "Flip-flops                : %d (%d data bits + %d strobes)\n" % (self.flip_flops, self.data_flip_flops, self.strobe_flip_flops)
+        if len(module.memories) > 0:
+            words = sum([m.depth for m in module.memories])
+            s += "Memories                  : %d (%d words = %d Kbit of block RAM, bus read latency %d)\n" % (len(module.memories), words, (32 * words + 1023) // 1024, self.read_latency(module))
+        s += "Read mux                  : %d inputs x %d bits, depth %d (balanced) / %d (if-chain as generated)\n" % (self.read_mux_inputs, self.read_mux_width, self.lut_tree(2 * self.read_mux_inputs)[1], self.read_mux_inputs)
+        s += "bus_read sensitivity list : %d signals\n\n" % self.sensitivity_list_size
+        s += "%-8s  %9s  %11s  %15s  %13s  %14s  %15s\n" % ("Decoder", "Addr bits", "Comparators", "Comparator LUTs", "Read-mux LUTs", "Read path LUTs", "Write path LUTs")
+        for decoder, description in self.DECODER_OPTIONS:
+            e = self.estimate(decoder)
+            if decoder != "full":
+                decoder += "*"
+            s += "%-8s  %9d  %11d  %15d  %13d  %14d  %15d\n" % (decoder, e["address_bits"], e["comparators"], e["comparator_luts"], e["read_mux_luts"], e["read_path_levels"], e["write_path_levels"])
+        s += "\n"
+        for decoder, description in self.DECODER_OPTIONS:
+            s += "%-8s: %s\n" % (decoder, description)
+        s += "* what-if figures of decoders that HDLRegs does not generate\n"
+        s += "(path lengths are given in LUT levels)\n"
+        self._code = s
+    #
+    # Returns the number of LUTs and the number of LUT levels needed to
+    # reduce the given number of inputs to a single output
+    def lut_tree(self, num_inputs):
+        luts = 0
+        levels = 0
+        while num_inputs > 1:
+            outputs = (num_inputs + self.LUT_INPUTS - 1) // self.LUT_INPUTS
+            luts += outputs
+            levels += 1
+            num_inputs = outputs
+        return luts, levels
+    #
+    # Returns the number of address bits compared by the given decoder option
+    def decoded_address_bits(self, decoder):
+        if decoder == "full":
+            return 32
+        addresses = self.addresses
+        if decoder == "partial":
+            return max(1, max(addresses).bit_length() - 2)
+        if decoder == "sparse":
+            differing_bits = 0
+            for i in range(2, 32):
+                bits = set([(a >> i) & 1 for a in addresses])
+                if len(bits) > 1:
+                    differing_bits += 1
+            return max(1, differing_bits)
+        raise ValueError("unknown decoder option '%s'" % decoder)
+    #
+    # Returns a dict of resource and path-length figures for a decoder option
+    def estimate(self, decoder):
+        address_bits = self.decoded_address_bits(decoder)
+        comparator_luts, comparator_levels = self.lut_tree(address_bits + 2)  # address bits + cs + rnw
+        read_mux_luts = 0
+        read_mux_levels = 0
+        for n in self.read_sources:
+            luts, levels = self.lut_tree(2 * n)  # AND-OR of (hit, data) pairs
+            read_mux_luts += luts
+            read_mux_levels = max(read_mux_levels, levels)
+        comparators = self.num_readable + self.num_writable
+        return dict(address_bits = address_bits,
+                    comparators = comparators,
+                    comparator_luts = comparators * comparator_luts,
+                    read_mux_luts = read_mux_luts,
+                    read_path_levels = comparator_levels + read_mux_levels,
+                    write_path_levels = comparator_levels + 1)
+    #
+    # Returns the figures by which address layouts are compared, most
+    # significant first: the comparator LUTs of the generated (full) decoder,
+    # and the address span, i.e. the address window that the register file
+    # takes up on the bus. The full decoder compares all 32 address bits
+    # whatever the layout, so only the address span can improve.
+    def layout_cost(self):
+        e = self.estimate("full")
+        return (e["comparator_luts"], self.address_span)
+    #
+    # Returns a report comparing the address decoding figures of this
+    # estimate with those of an estimate of the same module before its layout
+    # was optimized (see Module.optimize_layout)
+    def layout_report(self, before):
+        s = "\nLayout optimization for module '%s'\n\n" % self.module.name
+        s += "%-26s  %10s  %10s\n" % ("", "before", "after")
+        s += "%-26s  0x%.8X  0x%.8X\n" % ("Address span", before.address_span, self.address_span)
+        for decoder in ("full", "partial", "sparse"):
+            b = before.estimate(decoder)
+            a = self.estimate(decoder)
+            mark = "" if decoder == "full" else "*"
+            s += "%-26s  %10d  %10d\n" % ("Addr bits (%s)%s" % (decoder, mark), b["address_bits"], a["address_bits"])
+            s += "%-26s  %10d  %10d\n" % ("Comparator LUTs (%s)%s" % (decoder, mark), b["comparator_luts"], a["comparator_luts"])
+        s += "* what-if figures of decoders that HDLRegs does not generate\n"
+        groups = []
+        for r in sorted(self.module.registers, key=lambda r: r.addressOffset):
+            if r.group is not None and r.group not in groups:
+                groups.append(r.group)
+        for group in groups:
+            addresses = [r.addressOffset for r in self.module.registers if r.group == group]
+            size = 4
+            while size < max(addresses) - min(addresses) + 4:
+                size *= 2
+            if min(addresses) // size == max(addresses) // size:
+                s += "Group '%s': 0x%.8X - 0x%.8X, decoded by address bits 31:%d\n" % (group, min(addresses), max(addresses), size.bit_length() - 1)
+            else:
+                s += "Group '%s': 0x%.8X - 0x%.8X, not aligned\n" % (group, min(addresses), max(addresses))
+        return s
+    #
+    # Returns a report comparing the bus reads per polling cycle of this
+    # estimate with those of an estimate of the same module before its fields
+    # were regrouped (see Module.optimize_fields)
+    def poll_report(self, before):
+        s = "\nField optimization for module '%s'\n\n" % self.module.name
+        s += "%-26s  %10s  %10s\n" % ("Bus reads per poll", "before", "after")
+        for group in sorted(before.poll_reads.keys()):
+            s += "%-26s  %10d  %10d\n" % ("'%s'" % group, before.poll_reads[group], self.poll_reads[group])
+        s += "%-26s  %10d  %10d\n" % ("Total", sum(before.poll_reads.values()), sum(self.poll_reads.values()))
+        return s
+    #
+    # Returns the estimate report
+    def report(self):
+        return self._code
+    #
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            f.write(self._code)
+#
 # HTML code generator
 #
 class HtmlGenerator():
@@ -771,16 +3455,14 @@ class HtmlGenerator():
         
         html_overview = indent(4) + '<table id="overview">\n'
         html_cell_class = 'even'
-        for r in module.registers:
+        for r in module.registers + module.memories:
             html_overview += indent(5) + '<tr><td class="%s"><a class="overview" href="#%s">%s</d></td></tr>\n' % (html_cell_class, r.name, r.name)
             # cycle cell colors:
             if html_cell_class == 'even': html_cell_class = 'odd'
             elif html_cell_class == 'odd': html_cell_class = 'even'
         html_overview += indent(4) + '</table>\n'        
         # HTML detailed description
-        html_registers = ""
-        for r in module.registers:
-            html_registers += self.to_html(r)
+        html_registers = "".join([self.to_html(r) for r in module.registers + module.memories])
         d = dict(module_name=module.name,
                  date_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
                  hdlregs_version=HDLREGS_VERSION,
@@ -793,15 +3475,28 @@ class HtmlGenerator():
         if isinstance(element, Register):
             r = element
             fields_sorted = sorted(r.fields, key=lambda field: field.bitOffset, reverse=True)  # sort fields in order of descending bit offset
-            fields_html = ""
-            for f in fields_sorted:
-                fields_html += self.to_html(f)
+            fields_html = "".join([self.to_html(f) for f in fields_sorted])
             str_addressOffset = "0x%.8X" % r.addressOffset
             d = dict(register_name=r.name,
                      register_description=r.description,
                      register_addr_offset=str_addressOffset,
                      register_fields=fields_html)
             return HTML_REGISTER_TEMPLATE.substitute(d)
+        # Memory -> HTML: a register-like table with a single row for the data words
+        elif isinstance(element, Memory):
+            m = element
+            field_access = {"read-write": "RW", "read-only": "R", "write-only": "W"}[m.access]
+            fields_html = HTML_REGISTER_FIELD_TEMPLATE.substitute(field_range="31:0",
+                                                                  field_name="data[0:%d]" % (m.depth - 1),
+                                                                  field_access=field_access,
+                                                                  field_reset="-",
+                                                                  field_description="%d x 32-bit words in block RAM" % m.depth,
+                                                                  field_selfClear="&nbsp;")
+            d = dict(register_name=m.name,
+                     register_description=m.description,
+                     register_addr_offset="0x%.8X - 0x%.8X" % (m.addressOffset, m.addressOffset + 4 * m.depth - 4),
+                     register_fields=fields_html)
+            return HTML_REGISTER_TEMPLATE.substitute(d)
         # Field -> HTML
         elif isinstance(element, Field):
             if element.bitWidth == 1:
@@ -817,7 +3512,9 @@ class HtmlGenerator():
             elif access == "write-only":
                 field_access = "W"
             #
-            if element.selfClear:
+            if element.is_pass_through():
+                field_selfClear = "Pass-through"
+            elif element.selfClear:
                 field_selfClear = "Self-clearing"
             else:
                 field_selfClear = "&nbsp;"
@@ -825,7 +3522,7 @@ class HtmlGenerator():
             d = dict(field_range=field_range,
                      field_name=element.name,
                      field_access=field_access,
-                     field_reset=element.reset(),
+                     field_reset="-" if element.is_pass_through() else element.reset(),
                      field_description=element.description,
                      field_selfClear=field_selfClear)
             return HTML_REGISTER_FIELD_TEMPLATE.substitute(d)            
@@ -834,19 +3531,141 @@ class HtmlGenerator():
         with open(filename, 'w') as f:
             f.write(self._code)
 
+#
+# Multi-page HTML code generator, for register maps too large to be rendered on
+# a single page: writes an index page, one page per register group (split into
+# pages of at most PAGE_SIZE registers) and a search index that the pages only
+# load when the user starts searching.
+#
+class HtmlPagesGenerator(HtmlGenerator):
+    PAGE_SIZE = 256  # maximum number of registers per page
+    MAX_SEARCH_RESULTS = 50
+    INDEX_FILENAME = "index.html"
+    SEARCH_INDEX_FILENAME = "search_index.js"
+    #
+    def __init__(self, module):
+        self.module = module
+        self.date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.pages = self.paginate(module)
+        # Index page: one row per page
+        rows = ""
+        html_cell_class = 'even'
+        for title, filename, registers in self.pages:
+            address_range = "0x%.8X - 0x%.8X" % (registers[0].addressOffset, registers[-1].addressOffset)
+            rows += indent(4) + '<tr class="%s"><td><a class="overview" href="%s">%s</a></td><td>%s</td><td>%d</td></tr>\n' % (html_cell_class, filename, xml_escape(title), address_range, len(registers))
+            if html_cell_class == 'even': html_cell_class = 'odd'
+            elif html_cell_class == 'odd': html_cell_class = 'even'
+        main = indent(3) + "<h2>Register groups</h2>\n"
+        main += indent(3) + "<p>%s</p>\n" % module.description
+        main += indent(3) + '<table class="pages">\n'
+        main += indent(4) + "<tr><th>Group</th><th>Addresses</th><th>Registers</th></tr>\n"
+        main += rows
+        main += indent(3) + "</table>"
+        if len(module.memories) > 0:
+            main += "\n" + indent(3) + "<h2>Memories</h2>\n"
+            main += "".join(self.to_html(m) for m in sorted(module.memories, key=lambda m: m.addressOffset))
+        self._code = self.page("Registers in '%s' module" % module.name, "", "", main)
+        # Search index: one entry per register and field
+        entries = []
+        for title, filename, registers in self.pages:
+            for r in registers:
+                address = "0x%.8X" % r.addressOffset
+                entries.append([r.name, address, filename, r.name])
+                for f in r.fields:
+                    if f.name != r.name:  # not the artificial field of a register without fields
+                        entries.append(["%s.%s" % (r.name, f.name), address, filename, r.name])
+        self._search_index = "hdlregsSearchIndex = %s;\n" % json.dumps(entries, separators=(",", ":"))
+    #
+    # Returns the list of (title, filename, registers) pages: registers are
+    # grouped by their "group" element (in order of first appearance, ungrouped
+    # registers last) and sorted by address within a group.
+    def paginate(self, module):
+        groups = []
+        group_registers = {}
+        for r in module.registers:
+            if r.group not in group_registers:
+                group_registers[r.group] = []
+                if r.group is not None:
+                    groups.append(r.group)
+        if None in group_registers:
+            groups.append(None)
+        for r in module.registers:
+            group_registers[r.group].append(r)
+        pages = []
+        for group in groups:
+            registers = sorted(group_registers[group], key=lambda r: r.addressOffset)
+            title = group if group is not None else "Registers"
+            num_pages = (len(registers) + self.PAGE_SIZE - 1) // self.PAGE_SIZE
+            for i in range(num_pages):
+                filename = "page_%d.html" % (len(pages) + 1)
+                page_title = title if num_pages == 1 else "%s (%d/%d)" % (title, i + 1, num_pages)
+                pages.append((page_title, filename, registers[i * self.PAGE_SIZE:(i + 1) * self.PAGE_SIZE]))
+        return pages
+    #
+    # Returns a complete HTML page
+    def page(self, title, navigation, overview, main):
+        d = dict(title=xml_escape(title),
+                 navigation=navigation,
+                 overview=overview,
+                 main=main,
+                 search_index=self.SEARCH_INDEX_FILENAME,
+                 max_results=self.MAX_SEARCH_RESULTS,
+                 date_time=self.date_time,
+                 hdlregs_version=HDLREGS_VERSION)
+        return HTML_PAGE_TEMPLATE.substitute(d)
+    #
+    # Returns the register group page with the given index
+    def group_page(self, index):
+        title, filename, registers = self.pages[index]
+        links = ['<a href="%s">Index</a>' % self.INDEX_FILENAME]
+        if index > 0:
+            links.append('<a href="%s">Previous</a>' % self.pages[index - 1][1])
+        if index < len(self.pages) - 1:
+            links.append('<a href="%s">Next</a>' % self.pages[index + 1][1])
+        overview = indent(3) + "<h2>Overview</h2>\n"
+        overview += indent(3) + '<table id="overview">\n'
+        html_cell_class = 'even'
+        for r in registers:
+            overview += indent(4) + '<tr><td class="%s"><a class="overview" href="#%s">%s</a></td></tr>\n' % (html_cell_class, r.name, r.name)
+            if html_cell_class == 'even': html_cell_class = 'odd'
+            elif html_cell_class == 'odd': html_cell_class = 'even'
+        overview += indent(3) + "</table>"
+        main = indent(3) + "<h2>Detailed description</h2>\n"
+        main += "".join(self.to_html(r) for r in registers)
+        return self.page("%s: %s" % (self.module.name, title), " | ".join(links), overview, main)
+    #
+    # Write the pages to the given directory. Group pages are rendered one at
+    # a time, so that only one of them is held in memory.
+    def save(self, dirname):
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with open(os.path.join(dirname, self.INDEX_FILENAME), 'w') as f:
+            f.write(self._code)
+        with open(os.path.join(dirname, self.SEARCH_INDEX_FILENAME), 'w') as f:
+            f.write(self._search_index)
+        for index in range(len(self.pages)):
+            with open(os.path.join(dirname, self.pages[index][1]), 'w') as f:
+                f.write(self.group_page(index))
+
 # ------------------------------------------------------------------------------
 # Register file elements: Module, Register and Field classes
 #
 
 # A module definition
-class Module():
+class Module(object):
     SUPPORTED_WIDTHS = (32,)  # supported bus widths
     MANDATORY_ELEMENTS = ("name", "description", "width", "registers")
+    OPTIONAL_ELEMENTS = ("memories", "profiles")
+    CDC_STATUS_NAME = "cdc_status"  # name of the clock-domain crossing status register(s)
+    CDC_BUSY_NAME = "cdc_busy"  # name of the regs2user busy flag of user-logic writes to the bus clock domain
     #
-    # Module constructor    
-    def __init__(self, json_module):
+    # Module constructor. With elaborate=False, the caller must call
+    # elaborate() and check() before using the module.
+    def __init__(self, json_module, elaborate=True):
         # default values:
         self.name = ""        
+        self.memories = []
+        self.profiles = []
         for key in json_module.keys():
             if key == "name":
                 self.name = json_module[key]
@@ -855,9 +3674,13 @@ class Module():
             elif key == "interface":
                 self.interface = json_module[key]
             elif key == "width":
-                self.width = int(json_module[key])                
+                self.width = int_from_json(json_module[key])                
             elif key == "registers":
                 self.registers = [Register(json_reg, parent_module=self) for json_reg in json_module[key]]
+            elif key == "memories":
+                self.memories = [Memory(json_memory, parent_module=self) for json_memory in json_module[key]]
+            elif key == "profiles":
+                self.profiles = [Profile(json_profile, parent_module=self) for json_profile in json_module[key]]
         # check for missing mandatory elements
         for e in self.MANDATORY_ELEMENTS:
             if not hasattr(self, e):
@@ -865,7 +3688,7 @@ class Module():
                 raise ModuleError(self, "missing '%s' element" % e)            
         # check for unsupported elements
         for key in json_module.keys():
-            if key not in self.MANDATORY_ELEMENTS:
+            if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
                 raise ModuleError(self, "unsupported element '%s'" % key)
         # check for unsupported width
         if self.width not in self.SUPPORTED_WIDTHS:
@@ -873,15 +3696,42 @@ class Module():
             str_supported_widths = ", ".join(str_supported_widths)
             raise ModuleError(self, "unsupported width '%d' -- HDLRegs currently supports only the following register widths: %s" % (self.width, str_supported_widths))
         # elaborate & check
-        self.elaborate()   
-        self.check()                 #
+        if elaborate:
+            self.elaborate()
+            self.check()
+    #
     # Check a module
     def check(self):
         pass
     #
+    # Append the read-only status registers of the clock-domain crossings of
+    # bus writes: one busy bit per register with bus-writable fields in the
+    # user clock domain, set by a bus write to the register and cleared when
+    # the user clock domain has acknowledged it; bus writes to the register are
+    # ignored while its busy bit is set. The registers are placed like
+    # registers without an addressOffset.
+    def add_cdc_status_registers(self):
+        for r in self.registers:
+            if any([f.is_user_writable() and f.is_user_clocked() for f in r.fields]) and any([f.name.lower() == self.CDC_BUSY_NAME for f in r.fields]):
+                raise RegisterError(r, "field name '%s' is reserved for the clock-domain crossing of user-logic writes" % self.CDC_BUSY_NAME)
+        cdc_registers = [r for r in self.registers if any([f.is_bus_writable() and f.is_user_clocked() for f in r.fields])]
+        for i in range(0, len(cdc_registers), 32):
+            name = self.CDC_STATUS_NAME if i == 0 else "%s_%d" % (self.CDC_STATUS_NAME, i // 32)
+            if any([r.name.lower() == name for r in self.registers]):
+                raise ModuleError(self, "register name '%s' is reserved for the clock-domain crossing status" % name)
+            json_fields = [dict(name="%s_busy" % r.name, bitWidth=1,
+                                description="a bus write to register '%s' has not crossed to the user clock domain yet" % r.name)
+                           for r in cdc_registers[i:i + 32]]
+            status = Register(dict(name=name, description="clock-domain crossing status", access="read-only", fields=json_fields), parent_module=self)
+            for f, r in zip(status.fields, cdc_registers[i:i + 32]):
+                f.cdc_register = r
+                r.cdc_busy_field = f
+            self.registers.append(status)
+    #
     # Elaborate a module, i.e. compute values for all undefined parameters such
     # as register addresses, bit field offsets etc.
     def elaborate(self):
+        self.add_cdc_status_registers()
         # Register address sanity checks:
         addr_dict = {}
         for reg in self.registers:
@@ -899,7 +3749,11 @@ class Module():
                 conflicting_regs = ", ".join(conflicting_regs)           
                 raise(ModuleError(self, "registers [%s] have the same addressOffset" % conflicting_regs))
         #
-        # Allocate register addresses
+        # Allocate register addresses, outside of the address windows of the
+        # memories with a fixed address offset
+        fixed_memories = [m for m in self.memories if m.addressOffset is not None]
+        self.auto_registers = [r for r in self.registers if r.addressOffset == None]
+        self.auto_memories = [m for m in self.memories if m.addressOffset is None]
         for r1 in self.registers:
             if r1.addressOffset == None:
                 # Register has not been assigned an address offset -> compute the 
@@ -912,11 +3766,165 @@ class Module():
                             candidate_addressOffset += 4
                             success = False
                             break
+                    for m in fixed_memories:
+                        if m.addressOffset <= candidate_addressOffset < m.addressOffset + m.size():
+                            candidate_addressOffset = m.addressOffset + m.size()
+                            success = False
                     if success:
                         break
                 # print "elaboration: allocated address 0x%.8X for register %s" % (candidate_addressOffset, r1.name)
                 r1.addressOffset = candidate_addressOffset
             r1.elaborate()
+        self.elaborate_memories()
+        # Resolve the field values of the configuration profiles
+        names = set()
+        for p in self.profiles:
+            if p.name.lower() in names:
+                raise ModuleError(self, "profile name '%s' is used more than once" % p.name)
+            names.add(p.name.lower())
+            p.elaborate()
+    #
+    # Allocate the address windows of the memories without an address offset
+    # above all registers and other memories, aligned to their size, and check
+    # that no window overlaps a register or another window
+    def elaborate_memories(self):
+        end = max([r.addressOffset + 4 for r in self.registers] + [m.addressOffset + m.size() for m in self.memories if m.addressOffset is not None])
+        for m in self.memories:
+            if m.addressOffset is None:
+                m.addressOffset = (end + m.size() - 1) // m.size() * m.size()
+                end = m.addressOffset + m.size()
+            elif m.addressOffset % m.size() != 0:
+                raise ModuleError(self, "memory '%s': address offset 0x%.8X is not a multiple of its address window size 0x%X" % (m.name, m.addressOffset, m.size()))
+        for m in self.memories:
+            m_end = m.addressOffset + m.size()
+            for r in self.registers:
+                if m.addressOffset <= r.addressOffset < m_end:
+                    raise ModuleError(self, "register '%s' is inside the address window of memory '%s'" % (r.name, m.name))
+            for m2 in self.memories:
+                if m2 is not m and m.addressOffset <= m2.addressOffset < m_end:
+                    raise ModuleError(self, "memories '%s' and '%s' have overlapping address windows" % (m.name, m2.name))
+    #
+    # Returns the address offsets of the automatically placed registers and
+    # memories, which restore_layout() sets again
+    def auto_layout(self):
+        return [(x, x.addressOffset) for x in self.auto_registers + self.auto_memories]
+    #
+    def restore_layout(self, layout):
+        for x, addressOffset in layout:
+            x.addressOffset = addressOffset
+    #
+    # Re-allocate the addresses of the registers and memories that were placed
+    # automatically, so that the address span is as small as possible:
+    # the registers of a group are placed in a block of a power-of-two number
+    # of words, aligned to its size (larger blocks first), and ungrouped
+    # registers fill the lowest free addresses. Registers and memories with an
+    # explicit address offset are left in place.
+    def optimize_layout(self):
+        if len(self.auto_registers) + len(self.auto_memories) == 0:
+            return
+        auto = set([id(r) for r in self.auto_registers])
+        occupied = set([r.addressOffset for r in self.registers if id(r) not in auto])
+        windows = [(m.addressOffset, m.addressOffset + m.size()) for m in self.memories if m not in self.auto_memories]
+        def is_free(addr, size):
+            for start, end in windows:
+                if addr < end and start < addr + size:
+                    return False
+            return not any([a in occupied for a in range(addr, addr + size, 4)])
+        # group blocks, in order of first appearance
+        groups = []
+        group_registers = {}
+        for r in self.auto_registers:
+            if r.group is not None:
+                if r.group not in group_registers:
+                    group_registers[r.group] = []
+                    groups.append(r.group)
+                group_registers[r.group].append(r)
+        blocks = sorted([group_registers[g] for g in groups], key=lambda regs: len(regs), reverse=True)
+        for regs in blocks:
+            size = 4
+            while size < 4 * len(regs):
+                size *= 2
+            addr = 0
+            while not is_free(addr, size):
+                addr += size
+            for i, r in enumerate(regs):
+                r.addressOffset = addr + 4 * i
+                occupied.add(r.addressOffset)
+        # ungrouped registers: lowest free addresses
+        addr = 0
+        for r in self.auto_registers:
+            if r.group is None:
+                while not is_free(addr, 4):
+                    addr += 4
+                r.addressOffset = addr
+                occupied.add(addr)
+        for m in self.auto_memories:
+            m.addressOffset = None
+        self.elaborate_memories()
+    #
+    # Returns a dict of the number of registers that hold the fields of each
+    # poll group, i.e. the number of bus reads of one polling cycle
+    def poll_reads(self):
+        registers = {}
+        for r in self.registers:
+            for f in r.fields:
+                if f.pollGroup is not None:
+                    registers.setdefault(f.pollGroup, set()).add(r.name)
+        return dict((group, len(names)) for group, names in registers.items())
+    #
+    # Move the automatically placed read-only fields of each poll group into
+    # as few registers as possible. The registers that hold a group's fields
+    # are ranked by the number of group bits they hold, and the group fields
+    # of a register are moved into higher-ranked registers if all of them fit,
+    # so that the register drops out of the polling cycle. Only read-only
+    # fields are moved, so writes to the target registers are not affected;
+    # a register is never left without fields.
+    def optimize_fields(self):
+        groups = []
+        for r in self.registers:
+            for f in r.fields:
+                if f.pollGroup is not None and f.pollGroup not in groups:
+                    groups.append(f.pollGroup)
+        for group in groups:
+            registers = [r for r in self.registers if any([f.pollGroup == group for f in r.fields])]
+            registers.sort(key=lambda r: (-sum([f.bitWidth for f in r.fields if f.pollGroup == group]), r.addressOffset))
+            for i in range(len(registers) - 1, 0, -1):
+                source = registers[i]
+                fields = [f for f in source.fields if f.pollGroup == group]
+                if len(fields) == len(source.fields):
+                    continue
+                if not all([f in source.auto_fields and f.access() == "read-only" for f in fields]):
+                    continue
+                # plan the moves on copies of the bit allocations of the targets
+                bits = dict((id(r), r.allocated_bits()) for r in registers[:i])
+                moves = []
+                for f in sorted(fields, key=lambda f: f.bitWidth, reverse=True):
+                    for target in registers[:i]:
+                        if any([g.name == f.name for g in target.fields]) or any([f.name == name for t, name, offset in moves if t is target]):
+                            continue
+                        offset = target.free_bit_offset(f.bitWidth, bits[id(target)])
+                        if offset is not None:
+                            bits[id(target)][offset:offset + f.bitWidth] = [True] * f.bitWidth
+                            moves.append((target, f.name, offset))
+                            break
+                    else:
+                        break
+                if len(moves) < len(fields):
+                    continue
+                for target, name, offset in moves:
+                    f = [g for g in source.fields if g.name == name][0]
+                    # keep the values that the field inherits from its register
+                    f._reset = f.reset()
+                    f._access = f.access()
+                    f._clockDomain = f.clock_domain()
+                    source._reset &= ~(((1 << f.bitWidth) - 1) << f.bitOffset)
+                    source.fields.remove(f)
+                    source.auto_fields.remove(f)
+                    f.parent_reg = target
+                    f.bitOffset = offset
+                    target.fields.append(f)
+                    target.auto_fields.append(f)
+                    print "optimization: moved field %s of register %s to register %s, bit offset %d" % (f.name, source.name, target.name, offset)
     # 
     # Returns the module's register with the lowest address
     def base_register(self):
@@ -935,10 +3943,11 @@ class Module():
         return base_addr_reg
 
 # A register definition 
-class Register:
+class Register(object):
     MANDATORY_ELEMENTS = ("name", "description")
-    OPTIONAL_ELEMENTS = ("access", "addressOffset", "reset", "fields")
+    OPTIONAL_ELEMENTS = ("access", "addressOffset", "reset", "fields", "group", "clockDomain")
     ACCESS = ("read-write", "read-only", "write-only")  # supported access-types
+    CLOCK_DOMAINS = ("bus", "user")  # clock domains of the user-logic interface
     #
     # Register constructor
     def __init__(self, json_reg, parent_module):
@@ -951,6 +3960,9 @@ class Register:
         self.addressOffset = None
         self._reset = 0                                
         self.fields = []        
+        self.group = None  # documentation group
+        self.clockDomain = "bus"
+        self.cdc_busy_field = None  # busy flag of the clock-domain crossing of bus writes
         #
         # initialize fields from JSON    
         for key in json_reg.keys():
@@ -966,6 +3978,10 @@ class Register:
                 self._reset = int_from_json(json_reg[key])                                
             elif key == "fields":
                 self.fields = [Field(json_field, self) for json_field in json_reg[key]]
+            elif key == "group":
+                self.group = json_reg[key]
+            elif key == "clockDomain":
+                self.clockDomain = json_reg[key]
         #
         # check for missing mandatory elements
         for e in self.MANDATORY_ELEMENTS:
@@ -979,6 +3995,7 @@ class Register:
                 raise RegisterError(self, "unsupported element '%s'" % key)
         #
         # elaborate & check
+        self.auto_fields = [f for f in self.fields if f.bitOffset == None]  # fields placed by the elaboration
         self.elaborate()   
         self.check()     
     #
@@ -1006,7 +4023,7 @@ class Register:
     # Returns True if the register is user-writable, i.e. if it has at least one user-writable field
     def is_user_writable(self):
         for f in self.fields:
-            if f.access() == "read-only":
+            if f.is_user_writable():
                 return True
         return False 
     #
@@ -1033,6 +4050,10 @@ class Register:
         # check access
         if self.access not in self.ACCESS:
             raise RegisterError(self, "'%s' is not a valid access mode" % self.access)
+        #
+        # check clock domain
+        if self.clockDomain not in self.CLOCK_DOMAINS:
+            raise RegisterError(self, "'%s' is not a valid clock domain" % self.clockDomain)
         #
         # check reset value        
         if(self._reset < 0 or self._reset > 2 ** self.size() - 1):
@@ -1058,7 +4079,7 @@ class Register:
             if field.bitOffset != None:
                 for i in range(field.bitOffset, field.bitOffset + field.bitWidth):
                     if(i < 0 or i >= self.size()):
-                        error("Field '%s' has bits outside of register '%s'" % (field.name, self.name))
+                        raise RegisterError(self, "field '%s' has bits outside of the register" % field.name)
                     # print "bit %d of register %s fixed to field %s" % (i, self.name, field.name)
                     bits[i] = field
 
@@ -1085,14 +4106,29 @@ class Register:
                         success = True
                         break
                 if not success:
-                    error("could not allocate field %s in register %s" % (field.name, self.name))
+                    raise RegisterError(self, "could not allocate field '%s'" % field.name)
         for field in self.fields:
             field.elaborate()    
+    #
+    # Returns a list of flags of the register's bits that are taken by fields
+    def allocated_bits(self):
+        bits = [False] * self.size()
+        for f in self.fields:
+            bits[f.bitOffset:f.bitOffset + f.bitWidth] = [True] * f.bitWidth
+        return bits
+    #
+    # Returns the lowest offset of 'width' free bits in the given bit
+    # allocation flags, or None if there is no such gap
+    def free_bit_offset(self, width, bits):
+        for offset in range(len(bits) - width + 1):
+            if not any(bits[offset:offset + width]):
+                return offset
+        return None
     
 # A register field        
-class Field:
+class Field(object):
     MANDATORY_ELEMENTS = ("name", "description", "bitWidth")
-    OPTIONAL_ELEMENTS = ("bitOffset", "reset", "access", "selfClear")
+    OPTIONAL_ELEMENTS = ("bitOffset", "reset", "access", "selfClear", "clockDomain", "pollGroup", "passThrough")
     #
     # Field constructor    
     def __init__(self, json_field, parent_reg):
@@ -1106,6 +4142,10 @@ class Field:
         self._reset = None
         self._access = None
         self.selfClear = None
+        self._clockDomain = None
+        self.pollGroup = None  # fields that software polls together
+        self.passThrough = None
+        self.cdc_register = None  # register whose clock-domain crossing a busy flag reports
         #
         # initialize fields from JSON    
         for key in json_field.keys():
@@ -1114,7 +4154,7 @@ class Field:
             elif key == "description":
                 self.description = json_field[key]
             elif key == "bitWidth":
-                self.bitWidth = json_field[key]
+                self.bitWidth = int_from_json(json_field[key])
             elif key == "bitOffset":
                 self.bitOffset = int_from_json(json_field[key])
             elif key == "reset":
@@ -1123,6 +4163,12 @@ class Field:
                 self._access = json_field[key]
             elif key == "selfClear":
                 self.selfClear = json_field[key]
+            elif key == "clockDomain":
+                self._clockDomain = json_field[key]
+            elif key == "pollGroup":
+                self.pollGroup = json_field[key]
+            elif key == "passThrough":
+                self.passThrough = json_field[key]
             else:
                 raise FieldError(self, "unsupported element '%s'" % key)                 
         #
@@ -1130,12 +4176,12 @@ class Field:
         for e in self.MANDATORY_ELEMENTS:
             if not hasattr(self, e):
                 if(e == 'name'): self.name = '<unnamed>'
-                raise ModuleError(self, "missing '%s' element" % e)
+                raise FieldError(self, "missing '%s' element" % e)
         #
         # check for unsupported elements
         for key in json_field.keys():
             if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
-                raise RegisterError(self, "unsupported element '%s'" % key)                                
+                raise FieldError(self, "unsupported element '%s'" % key)                                
         #
         # elaborate & check
         self.elaborate()   
@@ -1161,6 +4207,13 @@ class Field:
                 raise FieldError(self, "reset value out of range")
             if(self._reset > 2 ** self.bitWidth - 1):
                 raise FieldError(self, "reset value out of range")
+        if self._clockDomain is not None and self._clockDomain not in Register.CLOCK_DOMAINS:
+            raise FieldError(self, "'%s' is not a valid clock domain" % self._clockDomain)
+        if self.passThrough:
+            if self.access() != "read-only":
+                raise FieldError(self, "pass-through fields must be read-only")
+            if self.is_user_clocked():
+                raise FieldError(self, "pass-through fields must be in the bus clock domain")
     #
     # Returns the reset value of a field, which may be inherited from the parent register
     def reset(self):
@@ -1188,6 +4241,17 @@ class Field:
             return self.parent_reg.access
         else:
             return self._access            
+    #
+    # Returns the clock domain of the field's user-logic interface ("bus" or
+    # "user"), which may be inherited from the parent register
+    def clock_domain(self):
+        if self._clockDomain is None:
+            return self.parent_reg.clockDomain
+        return self._clockDomain
+    #
+    # Returns True if the field's user-logic interface is in the user clock domain
+    def is_user_clocked(self):
+        return self.clock_domain() == "user"
     #
     # Elaborate a field, i.e. compute values for all undefined parameters
     def elaborate(self):
@@ -1205,11 +4269,177 @@ class Field:
             return True   
         return False
     #
-    # Returns True if the field is user-writable
+    # Returns True if the field is read directly from its user2regs value,
+    # without a register stage or strobe
+    def is_pass_through(self):
+        return bool(self.passThrough)
+    #
+    # Returns True if the field is user-writable. The busy flags of the
+    # clock-domain crossings are read-only, but driven by the register file.
     def is_user_writable(self):
-        if self.access() == "read-only":
+        if self.access() == "read-only" and self.cdc_register is None:
             return True   
         return False
+
+# A memory: a table of 32-bit words in block RAM, with a port on the bus and a
+# port to the user logic. The access mode is the bus side's, as for registers:
+# the user logic writes read-only memories and reads the others.
+class Memory(object):
+    MANDATORY_ELEMENTS = ("name", "description", "depth")
+    OPTIONAL_ELEMENTS = ("access", "addressOffset", "group", "clockDomain")
+    #
+    # Memory constructor
+    def __init__(self, json_memory, parent_module):
+        #
+        # default values:
+        self.parent_module_ = parent_module
+        self.name = ""
+        self.description = None
+        self.depth = None
+        self.access = "read-write"
+        self.addressOffset = None
+        self.group = None  # documentation group
+        self.clockDomain = "bus"  # clock domain of the user-logic port
+        #
+        # initialize fields from JSON
+        for key in json_memory.keys():
+            if key == "name":
+                self.name = json_memory[key]
+            elif key == "description":
+                self.description = json_memory[key]
+            elif key == "depth":
+                self.depth = int_from_json(json_memory[key])
+            elif key == "access":
+                self.access = json_memory[key]
+            elif key == "addressOffset":
+                self.addressOffset = int_from_json(json_memory[key])
+            elif key == "group":
+                self.group = json_memory[key]
+            elif key == "clockDomain":
+                self.clockDomain = json_memory[key]
+        #
+        # check for missing mandatory and unsupported elements
+        for e in self.MANDATORY_ELEMENTS:
+            if e not in json_memory:
+                if e == 'name': self.name = '<unnamed>'
+                raise MemoryBlockError(self, "missing '%s' element" % e)
+        for key in json_memory.keys():
+            if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
+                raise MemoryBlockError(self, "unsupported element '%s'" % key)
+        self.check()
+    #
+    # Check the memory
+    def check(self):
+        if not is_valid_identifier(self.name):
+            raise MemoryBlockError(self, "'%s' is not a valid identifier (it may be a reserved C or VHDL keyword)" % self.name)
+        if self.access not in Register.ACCESS:
+            raise MemoryBlockError(self, "'%s' is not a valid access mode" % self.access)
+        if self.clockDomain not in Register.CLOCK_DOMAINS:
+            raise MemoryBlockError(self, "'%s' is not a valid clock domain" % self.clockDomain)
+        if self.depth < 1:
+            raise MemoryBlockError(self, "depth (%d) is out of range" % self.depth)
+    #
+    # Returns the number of word address bits
+    def address_width(self):
+        return max(1, (self.depth - 1).bit_length())
+    #
+    # Returns the size of the memory's address window in bytes: the depth
+    # rounded up to a power of two, times 4
+    def size(self):
+        return 4 << self.address_width()
+    #
+    # Returns True if the memory is bus-writable
+    def is_bus_writable(self):
+        return self.access == "read-write" or self.access == "write-only"
+    #
+    # Returns True if the memory is bus-readable
+    def is_bus_readable(self):
+        return self.access == "read-write" or self.access == "read-only"
+    #
+    # Returns True if the memory is written by the user logic
+    def is_user_writable(self):
+        return self.access == "read-only"
+    #
+    # Returns True if the memory's user-logic port is in the user clock domain
+    def is_user_clocked(self):
+        return self.clockDomain == "user"
+
+#
+# A named configuration profile: values of bus-writable fields, e.g. the
+# settings a driver programs at boot. The values are given as an object that
+# maps "<register>.<field>" to an integer.
+#
+class Profile(object):
+    MANDATORY_ELEMENTS = ("name", "values")
+    OPTIONAL_ELEMENTS = ("description",)
+    #
+    # Profile constructor
+    def __init__(self, json_profile, parent_module):
+        #
+        # default values:
+        self.parent_module_ = parent_module
+        self.name = ""
+        self.description = None
+        self.json_values = {}
+        self.values = []  # (field, value) in specification order, see elaborate()
+        #
+        # initialize fields from JSON
+        for key in json_profile.keys():
+            if key == "name":
+                self.name = json_profile[key]
+            elif key == "description":
+                self.description = json_profile[key]
+            elif key == "values":
+                self.json_values = json_profile[key]
+        #
+        # check for missing mandatory and unsupported elements
+        for e in self.MANDATORY_ELEMENTS:
+            if e not in json_profile:
+                if e == 'name': self.name = '<unnamed>'
+                raise ProfileError(self, "missing '%s' element" % e)
+        for key in json_profile.keys():
+            if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
+                raise ProfileError(self, "unsupported element '%s'" % key)
+        if not is_valid_identifier(self.name):
+            raise ProfileError(self, "'%s' is not a valid identifier (it may be a reserved C or VHDL keyword)" % self.name)
+        if not isinstance(self.json_values, dict):
+            raise ProfileError(self, "values must be a JSON object")
+    #
+    # Resolve the "<register>.<field>" names of the values to the fields of
+    # the parent module and check the values
+    def elaborate(self):
+        fields = {}
+        for r in self.parent_module_.registers:
+            for f in r.fields:
+                fields["%s.%s" % (r.name, f.name)] = f
+        self.values = []
+        for key in sorted(self.json_values.keys(), key=lambda k: k.lower()):
+            if key not in fields:
+                raise ProfileError(self, "'%s' is not a field (expected '<register>.<field>')" % key)
+            f = fields[key]
+            value = int_from_json(self.json_values[key])
+            if not f.is_bus_writable():
+                raise ProfileError(self, "field '%s' is not bus-writable" % key)
+            if value < 0 or value >= 2 ** f.bitWidth:
+                raise ProfileError(self, "value %d of field '%s' does not fit into %d bits" % (value, key, f.bitWidth))
+            self.values.append((f, value))
+    #
+    # Returns the register writes of the profile as (register, value, mask)
+    # tuples, sorted by address: the fields of a register are merged into one
+    # write, the fields not set by the profile keep their reset values, and
+    # the mask has the bits of the fields set by the profile
+    def writes(self):
+        registers = {}
+        for f, value in self.values:
+            r = f.parent_reg
+            if id(r) not in registers:
+                registers[id(r)] = [r, r.reset(), 0]
+            entry = registers[id(r)]
+            mask = (2 ** f.bitWidth - 1) << f.bitOffset
+            entry[1] = (entry[1] & ~mask) | (value << f.bitOffset)
+            entry[2] |= mask
+        return sorted([tuple(entry) for entry in registers.values()], key=lambda entry: entry[0].addressOffset)
+
 # ------------------------------------------------------------------------------
 # Exceptions
 #
@@ -1221,13 +4451,1024 @@ class FieldError(Exception):
 class RegisterError(Exception): 
     def __init__(self, register, message):
         if len(register.name) == 0:
-            register.set_name('<unnamed>')
+            register.name = '<unnamed>'
         Exception.__init__(self, "'%s': %s" % (register.name, message))
     
 class ModuleError(Exception): 
     def __init__(self, module, message):
         Exception.__init__(self, "'%s': %s" % (module.name, message))
+
+class MemoryBlockError(Exception):
+    def __init__(self, memory, message):
+        Exception.__init__(self, "'%s': %s" % (memory.name, message))
+
+class ProfileError(Exception):
+    def __init__(self, profile, message):
+        Exception.__init__(self, "'%s': %s" % (profile.name, message))
+
+class ModelError(Exception):
+    def __init__(self, filename, message):
+        Exception.__init__(self, "'%s': %s" % (filename, message))
+
+class IpxactError(Exception):
+    def __init__(self, filename, message):
+        Exception.__init__(self, "'%s': %s" % (filename, message))
+
+class TraceError(Exception):
+    def __init__(self, filename, line_number, message):
+        Exception.__init__(self, "'%s', line %d: %s" % (filename, line_number, message))
             
+# ------------------------------------------------------------------------------
+# Validation
+#
+
+# A problem found in a register specification, located by its JSON path
+class Diagnostic():
+    #
+    def __init__(self, path, message):
+        self.path = path
+        self.message = message
+    #
+    def __str__(self):
+        return "%s: %s" % (self.path, self.message)
+
+#
+# Validates a complete register specification (as loaded from JSON) in a
+# single pass and collects all problems, instead of stopping at the first
+# one like the Module, Register and Field constructors.
+#
+class SpecValidator():
+    #
+    def __init__(self, json_module):
+        self.diagnostics = []
+        self.identifiers = {}  # upper-case generated identifier -> JSON path of its owner
+        self.validate_module(json_module, "$")
+    #
+    # Record a problem
+    def error(self, path, message):
+        self.diagnostics.append(Diagnostic(path, message))
+    #
+    # Check for missing mandatory and unsupported elements
+    def check_elements(self, json_element, path, mandatory_elements, optional_elements):
+        for e in mandatory_elements:
+            if e not in json_element:
+                self.error(path, "missing '%s' element" % e)
+        for key in json_element:
+            if key not in mandatory_elements and key not in optional_elements:
+                self.error("%s.%s" % (path, key), "unsupported element '%s'" % key)
+    #
+    # Check a clockDomain element
+    def check_clock_domain(self, json_element, path):
+        if "clockDomain" in json_element and json_element["clockDomain"] not in Register.CLOCK_DOMAINS:
+            self.error(path + ".clockDomain", "'%s' is not a valid clock domain" % (json_element["clockDomain"],))
+    #
+    # Check the passThrough element of a field, whose access mode and clock
+    # domain may be inherited from its register
+    def check_pass_through(self, json_field, json_reg, path):
+        if not isinstance(json_field, dict) or not json_field.get("passThrough"):
+            return
+        if json_field.get("access", json_reg.get("access", "read-write")) != "read-only":
+            self.error(path + ".passThrough", "pass-through fields must be read-only")
+        if json_field.get("clockDomain", json_reg.get("clockDomain", "bus")) != "bus":
+            self.error(path + ".passThrough", "pass-through fields must be in the bus clock domain")
+    #
+    # Check an identifier element, returning True if it is valid
+    def check_identifier(self, json_element, path):
+        if "name" not in json_element:
+            return False
+        name = json_element["name"]
+        if not isinstance(name, (str, type(u""))) or not is_valid_identifier(name):
+            self.error(path + ".name", "'%s' is not a valid identifier (it may be a reserved C or VHDL keyword)" % (name,))
+            return False
+        return True
+    #
+    # Index the identifiers generated for a register or field (see
+    # CodeGenerator), reporting those that collide with the identifiers of
+    # another register or field. VHDL is case-insensitive, so identifiers
+    # are compared after upper().
+    def index_identifiers(self, identifiers, path):
+        for identifier in identifiers:
+            key = identifier.upper()
+            owner = self.identifiers.get(key)
+            if owner is None:
+                self.identifiers[key] = path
+            elif owner != path:
+                self.error(path, "generated identifier '%s' collides with the one generated for %s" % (key, owner))
+    #
+    # Returns the integer value of an element, or None (after recording an
+    # error) if it is not a valid integer
+    def integer(self, json_element, key, path):
+        try:
+            return int_from_json(json_element[key])
+        except (ValueError, TypeError, AttributeError):
+            self.error("%s.%s" % (path, key), "'%s' is not a valid integer" % (json_element[key],))
+            return None
+    #
+    def validate_module(self, json_module, path):
+        if not isinstance(json_module, dict):
+            self.error(path, "module must be a JSON object")
+            return
+        self.check_elements(json_module, path, Module.MANDATORY_ELEMENTS, Module.OPTIONAL_ELEMENTS)
+        self.check_identifier(json_module, path)
+        width = 32
+        if "width" in json_module:
+            width = self.integer(json_module, "width", path)
+            if width is not None and width not in Module.SUPPORTED_WIDTHS:
+                self.error(path + ".width", "unsupported width '%d'" % width)
+                width = None
+        json_registers = json_module.get("registers", [])
+        if not isinstance(json_registers, list):
+            self.error(path + ".registers", "registers must be a JSON array")
+            return
+        if len(json_registers) == 0 and "registers" in json_module:
+            self.error(path + ".registers", "module has no registers")
+        if isinstance(json_module.get("name"), (str, type(u""))):
+            module_name = json_module["name"]
+            self.index_identifiers((module_name + "_REGS_BASEADDR", module_name + "_REGS_HIGHADDR"), path)
+        addresses = {}  # address offset -> path of the first register at that offset
+        register_names = {}  # lower-case register name -> path of the first register with that name
+        for i, json_reg in enumerate(json_registers):
+            self.validate_register(json_reg, "%s.registers[%d]" % (path, i), width, addresses, register_names)
+        json_memories = json_module.get("memories", [])
+        if not isinstance(json_memories, list):
+            self.error(path + ".memories", "memories must be a JSON array")
+            return
+        windows = []  # (start, end, path) of the address windows of memories with an address offset
+        for i, json_memory in enumerate(json_memories):
+            window = self.validate_memory(json_memory, "%s.memories[%d]" % (path, i), register_names)
+            if window is not None:
+                windows.append(window)
+        for i, (start, end, memory_path) in enumerate(windows):
+            for addr in sorted(addresses):
+                if start <= addr < end:
+                    self.error(memory_path + ".addressOffset", "address window 0x%.8X - 0x%.8X contains %s" % (start, end - 1, addresses[addr]))
+                    break
+            for other_start, other_end, other_path in windows[:i]:
+                if start < other_end and other_start < end:
+                    self.error(memory_path + ".addressOffset", "address window 0x%.8X - 0x%.8X overlaps the one of %s" % (start, end - 1, other_path))
+        json_profiles = json_module.get("profiles", [])
+        if not isinstance(json_profiles, list):
+            self.error(path + ".profiles", "profiles must be a JSON array")
+            return
+        profile_names = {}  # lower-case profile name -> path of the first profile with that name
+        for i, json_profile in enumerate(json_profiles):
+            self.validate_profile(json_profile, "%s.profiles[%d]" % (path, i), json_registers, profile_names)
+    #
+    # Check a configuration profile, whose values must be given for
+    # bus-writable fields and fit into them
+    def validate_profile(self, json_profile, path, json_registers, profile_names):
+        if not isinstance(json_profile, dict):
+            self.error(path, "profile must be a JSON object")
+            return
+        self.check_elements(json_profile, path, Profile.MANDATORY_ELEMENTS, Profile.OPTIONAL_ELEMENTS)
+        if self.check_identifier(json_profile, path):
+            key = json_profile["name"].lower()
+            if key in profile_names:
+                self.error(path + ".name", "profile name '%s' is already used by %s" % (json_profile["name"], profile_names[key]))
+            else:
+                profile_names[key] = path
+        json_values = json_profile.get("values", {})
+        if not isinstance(json_values, dict):
+            self.error(path + ".values", "values must be a JSON object")
+            return
+        fields = {}  # "<register>.<field>" -> (JSON field, JSON register)
+        for json_reg in json_registers:
+            if isinstance(json_reg, dict) and isinstance(json_reg.get("fields"), list):
+                for json_field in json_reg["fields"]:
+                    if isinstance(json_field, dict):
+                        fields["%s.%s" % (json_reg.get("name"), json_field.get("name"))] = (json_field, json_reg)
+        for key in sorted(json_values):
+            value_path = "%s.values.%s" % (path, key)
+            if key not in fields:
+                self.error(value_path, "'%s' is not a field (expected '<register>.<field>')" % key)
+                continue
+            json_field, json_reg = fields[key]
+            if json_field.get("access", json_reg.get("access", "read-write")) == "read-only":
+                self.error(value_path, "field '%s' is not bus-writable" % key)
+            value = self.integer(json_values, key, path + ".values")
+            if value is None or "bitWidth" not in json_field:
+                continue
+            try:
+                bit_width = int_from_json(json_field["bitWidth"])
+            except (ValueError, TypeError, AttributeError):
+                continue  # reported by validate_field
+            if value < 0 or value >= 2 ** bit_width:
+                self.error(value_path, "value %d does not fit into %d bits" % (value, bit_width))
+    #
+    def validate_register(self, json_reg, path, width, addresses, register_names):
+        if not isinstance(json_reg, dict):
+            self.error(path, "register must be a JSON object")
+            return
+        self.check_elements(json_reg, path, Register.MANDATORY_ELEMENTS, Register.OPTIONAL_ELEMENTS)
+        reg_name = None
+        if self.check_identifier(json_reg, path):
+            key = json_reg["name"].lower()
+            if key in register_names:
+                self.error(path + ".name", "register name '%s' is already used by %s" % (json_reg["name"], register_names[key]))
+            else:
+                register_names[key] = path
+                reg_name = json_reg["name"]
+                self.index_identifiers(("ADDR_" + reg_name, "s_%s_r" % reg_name, "s_%s_strobe_r" % reg_name, "t_%s_user2regs" % reg_name, "t_%s_regs2user" % reg_name), path)
+                json_fields = json_reg.get("fields")
+                if json_reg.get("clockDomain") == "user" or (isinstance(json_fields, list) and any(isinstance(f, dict) and f.get("clockDomain") == "user" for f in json_fields)):
+                    self.index_identifiers(["s_%s_%s_r" % (reg_name, suffix) for suffix in VhdlComponentGenerator.CDC_SIGNALS], path)
+        access = json_reg.get("access", "read-write")
+        if access not in Register.ACCESS:
+            self.error(path + ".access", "'%s' is not a valid access mode" % access)
+        if "group" in json_reg and not isinstance(json_reg["group"], (str, type(u""))):
+            self.error(path + ".group", "group must be a string")
+        self.check_clock_domain(json_reg, path)
+        if "addressOffset" in json_reg:
+            addr = self.integer(json_reg, "addressOffset", path)
+            if addr is not None:
+                if addr < 0:
+                    self.error(path + ".addressOffset", "negative address offset")
+                elif addr in addresses:
+                    self.error(path + ".addressOffset", "address offset 0x%.8X is already used by %s" % (addr, addresses[addr]))
+                else:
+                    addresses[addr] = path
+        reset = 0
+        if "reset" in json_reg:
+            reset = self.integer(json_reg, "reset", path)
+            if reset is not None and width is not None and (reset < 0 or reset > 2 ** width - 1):
+                self.error(path + ".reset", "reset value (%d) is out of range" % reset)
+        json_fields = json_reg.get("fields", [])
+        if not isinstance(json_fields, list):
+            self.error(path + ".fields", "fields must be a JSON array")
+            return
+        if width is None:
+            return
+        # fixed fields: check bounds and overlaps using a bit mask
+        used_bits = 0
+        auto_fields = []
+        field_names = {}  # lower-case field name -> path of the first field with that name
+        for j, json_field in enumerate(json_fields):
+            field_path = "%s.fields[%d]" % (path, j)
+            bits = self.validate_field(json_field, field_path, width)
+            self.check_pass_through(json_field, json_reg, field_path)
+            if self.check_identifier(json_field, field_path):
+                key = json_field["name"].lower()
+                if key in field_names:
+                    self.error(field_path + ".name", "field name '%s' is already used by %s" % (json_field["name"], field_names[key]))
+                else:
+                    field_names[key] = field_path
+                    if reg_name is not None:
+                        suffix = "%s_%s" % (reg_name, json_field["name"])
+                        self.index_identifiers(("OFFSET_" + suffix, "WIDTH_" + suffix, "MASK_" + suffix, "t_" + suffix), field_path)
+            if bits is None:
+                continue
+            offset, bitWidth = bits
+            if offset is None:
+                auto_fields.append((field_path, bitWidth))
+                continue
+            mask = (2 ** bitWidth - 1) << offset
+            if used_bits & mask:
+                self.error(field_path, "overlaps another field of the register")
+            used_bits |= mask
+        # auto-placed fields: same first-fit allocation as Register.elaborate()
+        for field_path, bitWidth in auto_fields:
+            field_mask = 2 ** bitWidth - 1
+            for offset in range(width - bitWidth + 1):
+                if used_bits & (field_mask << offset) == 0:
+                    used_bits |= field_mask << offset
+                    break
+            else:
+                self.error(field_path, "could not allocate field (not enough free bits in the register)")
+    #
+    # Returns the (start, end, path) address window of a memory, or None if it
+    # has no valid address offset. Memory names share the name space of the
+    # registers.
+    def validate_memory(self, json_memory, path, names):
+        if not isinstance(json_memory, dict):
+            self.error(path, "memory must be a JSON object")
+            return None
+        self.check_elements(json_memory, path, Memory.MANDATORY_ELEMENTS, Memory.OPTIONAL_ELEMENTS)
+        if self.check_identifier(json_memory, path):
+            key = json_memory["name"].lower()
+            if key in names:
+                self.error(path + ".name", "name '%s' is already used by %s" % (json_memory["name"], names[key]))
+            else:
+                names[key] = path
+                name = json_memory["name"]
+                self.index_identifiers(("ADDR_" + name, "DEPTH_" + name, "ADDR_WIDTH_" + name, "t_%s_user2regs" % name, "t_%s_regs2user" % name,
+                                        "t_%s_ram" % name, "s_%s_ram" % name, "s_%s_rdata_q" % name, "s_%s_read_q" % name), path)
+        access = json_memory.get("access", "read-write")
+        if access not in Register.ACCESS:
+            self.error(path + ".access", "'%s' is not a valid access mode" % access)
+        if "group" in json_memory and not isinstance(json_memory["group"], (str, type(u""))):
+            self.error(path + ".group", "group must be a string")
+        self.check_clock_domain(json_memory, path)
+        if "depth" not in json_memory:
+            return None
+        depth = self.integer(json_memory, "depth", path)
+        if depth is None:
+            return None
+        if depth < 1:
+            self.error(path + ".depth", "depth (%d) is out of range" % depth)
+            return None
+        if "addressOffset" not in json_memory:
+            return None
+        addr = self.integer(json_memory, "addressOffset", path)
+        if addr is None:
+            return None
+        size = 4 << max(1, (depth - 1).bit_length())
+        if addr < 0:
+            self.error(path + ".addressOffset", "negative address offset")
+            return None
+        if addr % size != 0:
+            self.error(path + ".addressOffset", "address offset 0x%.8X is not a multiple of the address window size 0x%X" % (addr, size))
+            return None
+        return addr, addr + size, path
+    #
+    # Returns (bitOffset, bitWidth) of a field, with bitOffset None for
+    # auto-placed fields, or None if the field's position is invalid
+    def validate_field(self, json_field, path, width):
+        if not isinstance(json_field, dict):
+            self.error(path, "field must be a JSON object")
+            return None
+        self.check_elements(json_field, path, Field.MANDATORY_ELEMENTS, Field.OPTIONAL_ELEMENTS)
+        if "access" in json_field and json_field["access"] not in Register.ACCESS:
+            self.error(path + ".access", "'%s' is not a valid access mode" % json_field["access"])
+        self.check_clock_domain(json_field, path)
+        if "bitWidth" not in json_field:
+            return None
+        bitWidth = self.integer(json_field, "bitWidth", path)
+        if bitWidth is None:
+            return None
+        if bitWidth <= 0 or bitWidth > width:
+            self.error(path + ".bitWidth", "bit width (%d) is out of range" % bitWidth)
+            return None
+        if "reset" in json_field:
+            reset = self.integer(json_field, "reset", path)
+            if reset is not None and (reset < 0 or reset > 2 ** bitWidth - 1):
+                self.error(path + ".reset", "reset value (%d) is out of range" % reset)
+        offset = None
+        if "bitOffset" in json_field:
+            offset = self.integer(json_field, "bitOffset", path)
+            if offset is None:
+                return None
+            if offset < 0 or offset + bitWidth > width:
+                self.error(path + ".bitOffset", "field bits [%d:%d] are outside of register bounds" % (offset + bitWidth - 1, offset))
+                return None
+        return offset, bitWidth
+
+#
+# Validate a register specification, returning the list of Diagnostics
+def validate(json_module):
+    return SpecValidator(json_module).diagnostics
+
+# ------------------------------------------------------------------------------
+# Elaborated model cache
+#
+# An elaborated module can be saved to a compact binary file and loaded again
+# without parsing the JSON specification or re-running the elaboration. All
+# integers are little-endian. The file consists of:
+#
+#   header     MODEL_HEADER: magic, format version, number of registers,
+#              number of fields, number of memories, number of profiles,
+#              number of profile values, number of strings, module name,
+#              module description (string indexes) and module width
+#   registers  MODEL_REGISTER per register, in specification order
+#   fields     MODEL_FIELD per field, grouped by register
+#   memories   MODEL_MEMORY per memory, in specification order
+#   profiles   MODEL_PROFILE per profile, in specification order
+#   values     MODEL_PROFILE_VALUE per profile value, grouped by profile
+#   strings    one uint32 end offset (in characters) per string, followed
+#              by the UTF-8 encoded concatenation of the strings
+#
+# String references are indexes into the string table, starting at 1; index
+# NO_STRING (0) stands for None.
+# MODEL_FORMAT_VERSION must be incremented whenever the layout changes.
+#
+
+MODEL_MAGIC = b"HDLREGS\x00"
+MODEL_FORMAT_VERSION = 7
+MODEL_HEADER = struct.Struct("<8sIIIIIIIIII")
+# name, description, group, access, clockDomain, addressOffset, reset, number of fields,
+# placed by the elaboration
+MODEL_REGISTER = struct.Struct("<IIIBBQQIB")
+# name, description, access, clockDomain, bitWidth, bitOffset, has reset, reset, selfClear, passThrough,
+# index of the register whose clock-domain crossing the field reports as busy (NO_REGISTER if none),
+# pollGroup, placed by the elaboration
+MODEL_FIELD = struct.Struct("<IIBBHHBQBBIIB")
+# name, description, group, access, clockDomain, addressOffset, depth, placed by the elaboration
+MODEL_MEMORY = struct.Struct("<IIIBBQIB")
+# name, description, number of values
+MODEL_PROFILE = struct.Struct("<III")
+# field index (in file order), value
+MODEL_PROFILE_VALUE = struct.Struct("<IQ")
+NO_STRING = 0
+NO_ACCESS = 0xFF
+NO_CLOCK_DOMAIN = 0xFF
+NO_REGISTER = 0xFFFFFFFF
+SELF_CLEAR_CODES = (None, False, True)
+
+#
+# Save an elaborated module to a binary model file
+def save_model(module, filename):
+    strings = []
+    string_indexes = {None: NO_STRING}
+    def string_index(s):
+        try:
+            return string_indexes[s]
+        except KeyError:
+            strings.append(s)
+            string_indexes[s] = len(strings)
+            return string_indexes[s]
+    name = string_index(module.name)
+    description = string_index(module.description)
+    parts = []
+    num_fields = 0
+    field_indexes = {}  # id(field) -> index of the field in the file
+    register_indexes = dict([(id(r), i) for i, r in enumerate(module.registers)])
+    # the automatic placements, which --optimize-layout and --optimize-fields may change
+    auto_registers = set([id(r) for r in module.auto_registers])
+    auto_memories = set([id(m) for m in module.auto_memories])
+    auto_fields = set([id(f) for r in module.registers for f in r.auto_fields])
+    for r in module.registers:
+        parts.append(MODEL_REGISTER.pack(string_index(r.name), string_index(r.description), string_index(r.group),
+                                         Register.ACCESS.index(r.access), Register.CLOCK_DOMAINS.index(r.clockDomain),
+                                         r.addressOffset, r._reset, len(r.fields), id(r) in auto_registers))
+    for r in module.registers:
+        for f in r.fields:
+            access = NO_ACCESS if f._access is None else Register.ACCESS.index(f._access)
+            clock_domain = NO_CLOCK_DOMAIN if f._clockDomain is None else Register.CLOCK_DOMAINS.index(f._clockDomain)
+            self_clear = SELF_CLEAR_CODES.index(None if f.selfClear is None else bool(f.selfClear))
+            cdc_register = NO_REGISTER if f.cdc_register is None else register_indexes[id(f.cdc_register)]
+            parts.append(MODEL_FIELD.pack(string_index(f.name), string_index(f.description), access, clock_domain, f.bitWidth, f.bitOffset,
+                                          f._reset is not None, f._reset or 0, self_clear, f.is_pass_through(), cdc_register,
+                                          string_index(f.pollGroup), id(f) in auto_fields))
+            field_indexes[id(f)] = num_fields
+            num_fields += 1
+    for m in module.memories:
+        parts.append(MODEL_MEMORY.pack(string_index(m.name), string_index(m.description), string_index(m.group),
+                                       Register.ACCESS.index(m.access), Register.CLOCK_DOMAINS.index(m.clockDomain),
+                                       m.addressOffset, m.depth, id(m) in auto_memories))
+    num_profile_values = 0
+    for p in module.profiles:
+        parts.append(MODEL_PROFILE.pack(string_index(p.name), string_index(p.description), len(p.values)))
+    for p in module.profiles:
+        for f, value in p.values:
+            parts.append(MODEL_PROFILE_VALUE.pack(field_indexes[id(f)], value))
+            num_profile_values += 1
+    header = MODEL_HEADER.pack(MODEL_MAGIC, MODEL_FORMAT_VERSION, len(module.registers), num_fields, len(module.memories),
+                               len(module.profiles), num_profile_values, len(strings), name, description, module.width)
+    ends = []
+    end = 0
+    for s in strings:
+        end += len(s)
+        ends.append(end)
+    with open(filename, "wb") as f:
+        f.write(header)
+        f.write(b"".join(parts))
+        f.write(struct.pack("<%dI" % len(ends), *ends))
+        f.write(u"".join(strings).encode("utf-8"))
+
+#
+# Returns True if the given file is a binary model file
+def is_model_file(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MODEL_MAGIC)) == MODEL_MAGIC
+
+#
+# Load an elaborated module from a binary model file. The file is read in one
+# piece, and the Module, Register and Field objects are created without running
+# their constructors, i.e. without checks or elaboration.
+def load_model(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    try:
+        if len(data) < MODEL_HEADER.size:
+            raise ModelError(filename, "file is too short")
+        magic, version, num_registers, num_fields, num_memories, num_profiles, num_profile_values, num_strings, name, description, width = MODEL_HEADER.unpack_from(data, 0)
+        if magic != MODEL_MAGIC:
+            raise ModelError(filename, "not a HDLRegs model file")
+        if version != MODEL_FORMAT_VERSION:
+            raise ModelError(filename, "unsupported format version %d (expected %d)" % (version, MODEL_FORMAT_VERSION))
+        registers_offset = MODEL_HEADER.size
+        fields_offset = registers_offset + num_registers * MODEL_REGISTER.size
+        memories_offset = fields_offset + num_fields * MODEL_FIELD.size
+        profiles_offset = memories_offset + num_memories * MODEL_MEMORY.size
+        profile_values_offset = profiles_offset + num_profiles * MODEL_PROFILE.size
+        strings_offset = profile_values_offset + num_profile_values * MODEL_PROFILE_VALUE.size
+        blob_offset = strings_offset + 4 * num_strings
+        ends = struct.unpack_from("<%dI" % num_strings, data, strings_offset)
+        text = data[blob_offset:].decode("utf-8")
+        if num_strings > 0 and ends[-1] != len(text):
+            raise ModelError(filename, "file is truncated or corrupt")
+        strings = [None]
+        start = 0
+        for end in ends:
+            strings.append(text[start:end])
+            start = end
+        module = Module.__new__(Module)
+        module.name = strings[name]
+        module.description = strings[description]
+        module.width = width
+        module.registers = []
+        module.auto_registers = []
+        fields = []
+        field_index = 0
+        for i in range(num_registers):
+            name, description, group, access, clock_domain, addressOffset, reset, register_num_fields, auto_register = MODEL_REGISTER.unpack_from(data, registers_offset + i * MODEL_REGISTER.size)
+            r = Register.__new__(Register)
+            r.parent_module_ = module
+            r.name = strings[name]
+            r.description = strings[description]
+            r.group = strings[group]
+            r.access = Register.ACCESS[access]
+            r.clockDomain = Register.CLOCK_DOMAINS[clock_domain]
+            r.addressOffset = addressOffset
+            r._reset = reset
+            r.fields = []
+            r.cdc_busy_field = None  # set below from the busy flags
+            r.auto_fields = []
+            for j in range(field_index, field_index + register_num_fields):
+                name, description, access, clock_domain, bitWidth, bitOffset, has_reset, reset, self_clear, pass_through, cdc_register, poll_group, auto_field = MODEL_FIELD.unpack_from(data, fields_offset + j * MODEL_FIELD.size)
+                f = Field.__new__(Field)
+                f.parent_reg = r
+                f.name = strings[name]
+                f.description = strings[description]
+                f._access = None if access == NO_ACCESS else Register.ACCESS[access]
+                f._clockDomain = None if clock_domain == NO_CLOCK_DOMAIN else Register.CLOCK_DOMAINS[clock_domain]
+                f.bitWidth = bitWidth
+                f.bitOffset = bitOffset
+                f._reset = reset if has_reset else None
+                f.selfClear = SELF_CLEAR_CODES[self_clear]
+                f.passThrough = bool(pass_through) or None
+                f.pollGroup = strings[poll_group]
+                f.cdc_register = cdc_register  # resolved below, once all registers are loaded
+                r.fields.append(f)
+                if auto_field:
+                    r.auto_fields.append(f)
+                fields.append(f)
+            field_index += register_num_fields
+            module.registers.append(r)
+            if auto_register:
+                module.auto_registers.append(r)
+        for f in fields:
+            f.cdc_register = None if f.cdc_register == NO_REGISTER else module.registers[f.cdc_register]
+            if f.cdc_register is not None:
+                f.cdc_register.cdc_busy_field = f
+        module.auto_memories = []
+        module.memories = []
+        for i in range(num_memories):
+            name, description, group, access, clock_domain, addressOffset, depth, auto_memory = MODEL_MEMORY.unpack_from(data, memories_offset + i * MODEL_MEMORY.size)
+            m = Memory.__new__(Memory)
+            m.parent_module_ = module
+            m.name = strings[name]
+            m.description = strings[description]
+            m.group = strings[group]
+            m.access = Register.ACCESS[access]
+            m.clockDomain = Register.CLOCK_DOMAINS[clock_domain]
+            m.addressOffset = addressOffset
+            m.depth = depth
+            module.memories.append(m)
+            if auto_memory:
+                module.auto_memories.append(m)
+        module.profiles = []
+        value_index = 0
+        for i in range(num_profiles):
+            name, description, profile_num_values = MODEL_PROFILE.unpack_from(data, profiles_offset + i * MODEL_PROFILE.size)
+            p = Profile.__new__(Profile)
+            p.parent_module_ = module
+            p.name = strings[name]
+            p.description = strings[description]
+            p.values = []
+            for j in range(value_index, value_index + profile_num_values):
+                field_index, value = MODEL_PROFILE_VALUE.unpack_from(data, profile_values_offset + j * MODEL_PROFILE_VALUE.size)
+                p.values.append((fields[field_index], value))
+            value_index += profile_num_values
+            p.json_values = dict([("%s.%s" % (f.parent_reg.name, f.name), value) for f, value in p.values])
+            module.profiles.append(p)
+    except (struct.error, IndexError, UnicodeDecodeError):
+        raise ModelError(filename, "file is truncated or corrupt")
+    return module
+
+# ------------------------------------------------------------------------------
+# IP-XACT import
+#
+# An IP-XACT component (IEEE 1685-2009, 1685-2014 or SPIRIT 1.x) is converted
+# to the JSON specification of a module: the registers of the address blocks
+# of all memory maps, at absolute addresses, with their fields. Registers in
+# register files are named <register file>_<register>, and register arrays
+# (dim) are expanded to <register>0, <register>1, etc. The file is parsed
+# incrementally and each element is dropped as soon as it has been converted,
+# so memory use is bounded by the size of the specification, not of the file.
+#
+
+IPXACT_ACCESS = {"read-write": "read-write", "read-only": "read-only", "write-only": "write-only",
+                 "read-writeOnce": "read-write", "writeOnce": "write-only"}
+# elements that are kept until their parent element has been converted
+IPXACT_PROPERTIES = frozenset(("name", "description", "baseAddress", "addressOffset", "size", "access",
+                               "bitOffset", "bitWidth", "dim", "range", "reset", "resets", "value"))
+
+IPXACT_TAGS = {}  # cache of ipxact_tag()
+
+#
+# Returns the local name of an element, without the namespace
+def ipxact_tag(element):
+    try:
+        return IPXACT_TAGS[element.tag]
+    except KeyError:
+        tag = IPXACT_TAGS[element.tag] = element.tag.rpartition("}")[2]
+        return tag
+
+#
+# Returns the integer value of an IP-XACT number, e.g. "16", "0x10", "'h10",
+# "32'h0000_0010" or "#10"
+def ipxact_integer(text):
+    s = text.strip().replace("_", "")
+    if "'" in s:
+        digits = s.partition("'")[2]
+        return int(digits[1:], {"h": 16, "d": 10, "o": 8, "b": 2}[digits[:1].lower()])
+    elif s.startswith("#"):
+        return int(s[1:], 16)
+    elif s.lower().startswith("0x"):
+        return int(s, 16)
+    else:
+        return int(s, 10)
+
+#
+# Converts an IP-XACT file to a module specification (see load_json)
+class IpxactImporter(object):
+    def __init__(self, filename):
+        self.filename = filename
+        self.registers = []
+    #
+    # Returns the stripped text of the child element with the given local
+    # name, or None
+    def child_text(self, element, name):
+        for child in element:
+            if ipxact_tag(child) == name:
+                return (child.text or "").strip()
+        return None
+    #
+    # Returns the integer value of the child element with the given local
+    # name, or default
+    def child_integer(self, element, name, default=None):
+        text = self.child_text(element, name)
+        if text is None:
+            return default
+        try:
+            return ipxact_integer(text)
+        except (ValueError, KeyError):
+            raise IpxactError(self.filename, "'%s' is not a valid %s" % (text, name))
+    #
+    # Returns the description of an element on one line, with non-ASCII
+    # characters replaced by '?'
+    def description(self, element):
+        text = self.child_text(element, "description") or ""
+        return " ".join(text.split()).encode("ascii", "replace")
+    #
+    # Returns the access mode of an element in HDLRegs terms, or None
+    def access(self, element):
+        access = self.child_text(element, "access")
+        if access is None:
+            return None
+        if access not in IPXACT_ACCESS:
+            raise IpxactError(self.filename, "'%s': unsupported access '%s'" % (self.child_text(element, "name"), access))
+        return IPXACT_ACCESS[access]
+    #
+    # Returns the reset value of a register or field, given by reset/value
+    # (IP-XACT 1685-2009) or resets/reset/value (1685-2014), or None
+    def reset(self, element):
+        for child in element:
+            if ipxact_tag(child) == "reset":
+                return self.child_integer(child, "value")
+            if ipxact_tag(child) == "resets":
+                for reset in child:
+                    if ipxact_tag(reset) == "reset":
+                        return self.child_integer(reset, "value")
+        return None
+    #
+    # Convert a field
+    def field(self, element):
+        json_field = {"name" : self.child_text(element, "name"),
+                      "description" : self.description(element),
+                      "bitOffset" : self.child_integer(element, "bitOffset"),
+                      "bitWidth" : self.child_integer(element, "bitWidth")}
+        access = self.access(element)
+        if access is not None:
+            json_field["access"] = access
+        reset = self.reset(element)
+        if reset is not None:
+            json_field["reset"] = reset
+        return json_field
+    #
+    # Returns the (name prefix, address offset) of each copy of the elements
+    # in a register file: one, or one per element of a register file array
+    # (dim), which are 'range' address units apart
+    def register_file_copies(self, element):
+        name = self.child_text(element, "name")
+        address = self.child_integer(element, "addressOffset", 0)
+        dims = [child for child in element if ipxact_tag(child) == "dim"]
+        if len(dims) == 0:
+            return [(name + "_", address)]
+        if len(dims) > 1:
+            raise IpxactError(self.filename, "register file '%s': multi-dimensional register file arrays are not supported" % name)
+        dim = self.child_integer(element, "dim")
+        size = self.child_integer(element, "range")
+        if size is None:
+            raise IpxactError(self.filename, "register file '%s': array (dim) without range" % name)
+        return [("%s%d_" % (name, i), address + i * size) for i in range(dim)]
+    #
+    # Convert a register with its fields; ancestors are the enclosing
+    # elements, outermost first
+    def register(self, element, ancestors, json_fields):
+        name = self.child_text(element, "name")
+        size = self.child_integer(element, "size", 32)
+        if size != 32:
+            raise IpxactError(self.filename, "register '%s': unsupported size %d -- HDLRegs supports only 32-bit registers" % (name, size))
+        access = self.access(element)
+        # (name prefix, address offset) of each copy of the register
+        copies = [("", self.child_integer(element, "addressOffset", 0))]
+        for ancestor in ancestors:
+            if ipxact_tag(ancestor) == "addressBlock":
+                base = self.child_integer(ancestor, "baseAddress", 0)
+                copies = [(prefix, address + base) for prefix, address in copies]
+                access = access or self.access(ancestor)
+            elif ipxact_tag(ancestor) == "registerFile":
+                copies = [(prefix + file_prefix, address + file_address)
+                          for prefix, address in copies for file_prefix, file_address in self.register_file_copies(ancestor)]
+        for prefix, address in copies:
+            self.register_copy(element, prefix + name, address, access, json_fields)
+    #
+    # Convert one copy of a register, or the elements of a register array
+    def register_copy(self, element, name, address, access, json_fields):
+        json_reg = {"name" : name,
+                    "description" : self.description(element)}
+        if access is not None:
+            json_reg["access"] = access
+        reset = self.reset(element)
+        if reset is not None:
+            json_reg["reset"] = "0x%.8X" % reset
+        if len(json_fields) > 0:
+            json_reg["fields"] = json_fields
+        dim = self.child_integer(element, "dim")
+        if dim is None:
+            json_reg["addressOffset"] = "0x%.8X" % address
+            self.registers.append(json_reg)
+        else:
+            for i in range(dim):
+                json_element = dict(json_reg)
+                json_element["name"] = "%s%d" % (name, i)
+                json_element["addressOffset"] = "0x%.8X" % (address + 4 * i)
+                self.registers.append(json_element)
+    #
+    # Parse the file, returning the module specification
+    def parse(self):
+        ancestors = []
+        json_fields = []
+        try:
+            for event, element in ElementTree.iterparse(self.filename, events=("start", "end")):
+                if event == "start":
+                    ancestors.append(element)
+                    continue
+                ancestors.pop()
+                tag = ipxact_tag(element)
+                if tag in IPXACT_PROPERTIES:
+                    continue
+                if tag == "field":
+                    # the fields of an alternate register overlay those of
+                    # its register, which is imported without them
+                    if not any([ipxact_tag(ancestor) == "alternateRegister" for ancestor in ancestors]):
+                        json_fields.append(self.field(element))
+                elif tag == "register":
+                    self.register(element, ancestors, json_fields)
+                    json_fields = []
+                # drop the converted element; the root is the component
+                if len(ancestors) > 0:
+                    ancestors[-1].remove(element)
+        except ElementTree.ParseError as ex:
+            raise IpxactError(self.filename, str(ex))
+        if tag != "component":
+            raise IpxactError(self.filename, "not an IP-XACT component")
+        return {"name" : self.child_text(element, "name"),
+                "description" : self.description(element),
+                "width" : 32,
+                "registers" : self.registers}
+
+#
+# Returns True if the given file is an IP-XACT (XML) file
+def is_ipxact_file(filename):
+    return os.path.splitext(filename)[1].lower() == ".xml"
+
+#
+# Load an IP-XACT file as a module specification
+def load_ipxact(filename):
+    return IpxactImporter(filename).parse()
+
+# ------------------------------------------------------------------------------
+# Bus-trace decoding
+#
+# A trace has one bus transaction per line: an optional timestamp, the
+# direction ('r' or 'w'), the address and the data in hexadecimal, separated
+# by whitespace or commas, e.g. "1250ns,w,0x00000100,0x80000000". Empty lines
+# and lines starting with '#' are skipped.
+#
+
+#
+# Decodes a bus trace into register and field names. Registers are found by a
+# direct lookup of their address, memories by bisecting the sorted starts of
+# their address windows. Reads are decoded into the bus-readable fields and
+# writes into the bus-writable fields, using precomputed offsets and masks.
+# The trace is read in chunks and decoded (direction, address, data) triples
+# are cached, so that decoding keeps up with reading.
+#
+class TraceDecoder(object):
+    FORMATS = ("csv", "json")
+    CHUNK_SIZE = 1 << 20  # characters read at a time
+    CACHE_SIZE = 1 << 16  # maximum number of cached decoded triples
+    CSV_HEADER = "time,direction,address,register,data,fields\n"
+    #
+    def __init__(self, module, format="csv"):
+        self.format = format
+        # address -> (register name, {direction: [(field name, bitOffset, mask)]})
+        self.registers = {}
+        for r in module.registers:
+            fields = sorted(r.fields, key=lambda f: f.bitOffset)
+            self.registers[r.addressOffset] = (r.name, {
+                "r": [(f.name, f.bitOffset, 2 ** f.bitWidth - 1) for f in fields if f.is_bus_readable()],
+                "w": [(f.name, f.bitOffset, 2 ** f.bitWidth - 1) for f in fields if f.is_bus_writable()]})
+        # (start, end, name, depth) of the memory address windows, sorted by start
+        self.windows = sorted([(m.addressOffset, m.addressOffset + m.size(), m.name, m.depth) for m in module.memories])
+        self.window_starts = [w[0] for w in self.windows]
+        self.cache = {}
+        self.transactions = 0
+        self.unmapped = 0
+    #
+    # Returns the name of the register or memory word at an address and its
+    # fields as (name, value) pairs, or (None, []) for unmapped addresses
+    def lookup(self, direction, address, data):
+        try:
+            name, fields = self.registers[address]
+            return name, [(field_name, (data >> offset) & mask) for field_name, offset, mask in fields[direction]]
+        except KeyError:
+            pass
+        i = bisect.bisect_right(self.window_starts, address) - 1
+        if i >= 0:
+            start, end, name, depth = self.windows[i]
+            index = (address - start) >> 2
+            if address < end and index < depth and address & 3 == 0:
+                return "%s[%d]" % (name, index), []
+        return None, []
+    #
+    # Returns the output columns of a transaction that follow the timestamp,
+    # in the output format, and whether its address is unmapped
+    def decode(self, filename, line_number, direction, address, data):
+        direction = direction.lower()
+        if direction != "r" and direction != "w":
+            raise TraceError(filename, line_number, "'%s' is not a valid direction (expected 'r' or 'w')" % direction)
+        try:
+            address = int(address, 16)
+            data = int(data, 16)
+        except ValueError:
+            raise TraceError(filename, line_number, "invalid hexadecimal address or data")
+        if not 0 <= address <= 0xFFFFFFFF or not 0 <= data <= 0xFFFFFFFF:
+            raise TraceError(filename, line_number, "address or data does not fit into 32 bits")
+        name, fields = self.lookup(direction, address, data)
+        if self.format == "csv":
+            columns = "%s,0x%.8X,%s,0x%.8X,%s" % (direction, address, name or "", data, " ".join(["%s=%d" % field for field in fields]))
+        else:
+            columns = '"direction": "%s", "address": %d, "register": %s, "data": %d, "fields": {%s}' % (direction, address, '"%s"' % name if name else "null",
+                                                                                                    data, ", ".join(['"%s": %d' % field for field in fields]))
+        return columns, name is None
+    #
+    # Returns the decoded rows of a list of trace lines, the first of which
+    # has the given line number. Transactions are cached by their direction,
+    # address and data as written in the trace.
+    def decode_lines(self, filename, lines, line_number):
+        rows = []
+        append = rows.append  # local names keep the loop fast
+        unmapped = 0
+        cache = self.cache
+        lookup = cache.get
+        csv = self.format == "csv"
+        for line in lines:
+            columns = line.replace(",", " ").split()
+            if len(columns) == 0 or columns[0][0] == "#":
+                line_number += 1
+                continue
+            if len(columns) == 4:
+                time = columns[0]
+                key = (columns[1], columns[2], columns[3])
+            elif len(columns) == 3:
+                time = None
+                key = tuple(columns)
+            else:
+                raise TraceError(filename, line_number, "expected [time] direction address data")
+            entry = lookup(key)
+            if entry is None:
+                if len(cache) >= self.CACHE_SIZE:
+                    cache.clear()
+                entry = cache[key] = self.decode(filename, line_number, *key)
+            unmapped += entry[1]
+            if csv:
+                append("%s,%s\n" % (time or "", entry[0]))
+            else:
+                append('{"time": %s, %s}\n' % (json.dumps(time), entry[0]))
+            line_number += 1
+        self.transactions += len(rows)
+        self.unmapped += unmapped
+        return rows
+    #
+    # Decode a trace file to a CSV file, or to a JSON Lines file with one
+    # object per transaction. The output is written to a temporary file that
+    # replaces the output file only if the whole trace could be decoded.
+    def decode_file(self, trace_filename, output_filename):
+        temp_filename = output_filename + ".tmp"
+        try:
+            self.decode_to(trace_filename, temp_filename)
+        except:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+        if os.path.exists(output_filename):
+            os.remove(output_filename)  # os.rename does not replace files on Windows
+        os.rename(temp_filename, output_filename)
+    #
+    def decode_to(self, trace_filename, output_filename):
+        with open(trace_filename, "r") as trace:
+            with open(output_filename, "w") as output:
+                if self.format == "csv":
+                    output.write(self.CSV_HEADER)
+                rest = ""
+                line_number = 1
+                while True:
+                    chunk = trace.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    lines = (rest + chunk).split("\n")
+                    rest = lines.pop()
+                    output.write("".join(self.decode_lines(trace_filename, lines, line_number)))
+                    line_number += len(lines)
+                output.write("".join(self.decode_lines(trace_filename, [rest], line_number)))
+    #
+    # Returns a one-line summary of the decoded trace
+    def report(self, output_filename):
+        return "Decoded %d transactions (%d to unmapped addresses) to '%s'" % (self.transactions, self.unmapped, output_filename)
+
+# ------------------------------------------------------------------------------
+# Profiling
+#
+
+#
+# Collects the wall time and peak memory growth of the phases of a run.
+# Callbacks registered with add_hook() are called as
+# hook(name, seconds, peak_memory) after each phase, e.g. to feed build
+# telemetry.
+#
+class Profiler():
+    #
+    def __init__(self):
+        self.phases = []  # list of (name, seconds, peak memory growth in bytes or None)
+        self._hooks = []
+    #
+    # Register a callback, called after each phase
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+    #
+    # Run function(*args) as a named phase and return its result
+    def run(self, name, function, *args):
+        peak_before = self.peak_memory()
+        start = default_timer()
+        result = function(*args)
+        seconds = default_timer() - start
+        peak_memory = self.peak_memory()
+        if peak_memory is not None:
+            peak_memory -= peak_before
+        self.phases.append((name, seconds, peak_memory))
+        for hook in self._hooks:
+            hook(name, seconds, peak_memory)
+        return result
+    #
+    # Returns the process' resident set size high-water mark in bytes. As it
+    # only ever grows, a phase is charged with the amount by which it raised
+    # the high-water mark, which is zero for phases that stay below an earlier
+    # peak.
+    def peak_memory(self):
+        if resource is not None:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if sys.platform == "darwin":
+                return maxrss  # bytes on Mac OS X
+            return maxrss * 1024  # kilobytes elsewhere
+        return None
+    #
+    # Returns a table of all phases
+    def report(self):
+        s = "%-32s %12s %14s\n" % ("Phase", "Time [ms]", "Peak mem +[kB]")
+        total = 0.0
+        for name, seconds, peak_memory in self.phases:
+            if peak_memory is None:
+                str_peak_memory = "-"
+            else:
+                str_peak_memory = "%d" % (peak_memory // 1024)
+            s += "%-32s %12.3f %14s\n" % (name, 1000 * seconds, str_peak_memory)
+            total += seconds
+        s += "%-32s %12.3f\n" % ("total", 1000 * total)
+        return s
+
 # ------------------------------------------------------------------------------
 # Function definitions
 #
@@ -1249,73 +5490,234 @@ def int_from_json(json):
 #   basic_identifier ::=
 #     letter { [ underline ] letter_or_digit } 
 #
+# Results are memoized, as the same field names recur across many registers.
+#
 def is_valid_identifier(str):
-    if len(str) == 0: 
-        return False
-    if str.lower() in RESERVED_VHDL_KEYWORDS:
-        return False
-    if str in RESERVED_C_KEYWORDS:
-        return False
-    pattern = r'[a-zA-Z](_?[a-zA-Z0-9])*$'
-    if re.match(pattern, str):
-        return True
-    else:
-        return False
+    try:
+        return _identifier_cache[str]
+    except KeyError:
+        pass
+    valid = (str.lower() not in RESERVED_VHDL_KEYWORDS and
+             str.lower() not in RESERVED_C_KEYWORDS and
+             IDENTIFIER_PATTERN.match(str) is not None)
+    _identifier_cache[str] = valid
+    return valid
+
+_identifier_cache = {}
     
 def indent(level):
     return " " * INDENTATION_WIDTH * level    
     
-# ------------------------------------------------------------------------------
-# The main() function
-#
-if __name__ == "__main__":
-    
-    if len(sys.argv) != 2:
-        print "usage: python hdlregs.py <register definition file>"
-        sys.exit(-1)
-        
-    try:
-        register_definition_file = sys.argv[1]
-        
-        # Check for non-ascii characters in JSON file, as these are not supported yet
-        num_ascii_errors = 0
-        with open(register_definition_file, 'r') as f:
-            line_number = 1
-            for line in f:
-                for char in line:
-                    if ord(char) > 127:
-                        print "Error in line %d: detected non-ascii character '%c'" % (line_number, char)
-                        num_ascii_errors += 1
-                line_number += 1
-        if num_ascii_errors > 0:
-            sys.exit(-1)
-        
-        # Load JSON file
-        json_data = json.load(open(register_definition_file, 'r'))
-        module = Module(json_data)
-           
-        # Write HTML output
-        g = HtmlGenerator(module)
-        g.save(module.name + '_regs.html')
+# ------------------------------------------------------------------------------
+# The main() function
+#
+
+#
+# Check for non-ascii characters in a JSON file, as these are not supported
+# yet. Returns the number of non-ascii characters found.
+def check_ascii(filename):
+    num_ascii_errors = 0
+    with open(filename, 'r') as f:
+        line_number = 1
+        for line in f:
+            for char in line:
+                if ord(char) > 127:
+                    print "Error in line %d: detected non-ascii character '%c'" % (line_number, char)
+                    num_ascii_errors += 1
+            line_number += 1
+    return num_ascii_errors
+
+#
+# Load a JSON file
+def load_json(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+#
+# Run a code generator and save its output, as two profiled phases
+def generate(profiler, generator_class, module, filename, *args):
+    g = profiler.run(generator_class.__name__, generator_class, module, *args)
+    profiler.run("save " + filename, g.save, filename)
+    return g
+
+#
+# Run HDLRegs with the given command-line arguments. A Profiler may be passed
+# in to collect the per-phase timings, e.g. with hooks for build telemetry.
+def main(argv=None, profiler=None):
+    parser = argparse.ArgumentParser(description="HDLRegs register file generator")
+    parser.add_argument("register_definition_file", help="register definition file (JSON or IP-XACT XML) or saved model (see --save-model)")
+    parser.add_argument("--html-pages", action="store_true", help="write the HTML documentation as an index page, one page per register group and a search index (<module>_regs_html/) instead of a single page")
+    parser.add_argument("--c-accessors", action="store_true", help="also generate a C header with inline register/field accessors (<module>_regs_access.h)")
+    parser.add_argument("--python-module", action="store_true", help="also generate a Python register-access module (<module>_regs.py)")
+    parser.add_argument("--python-model", action="store_true", help="also generate a Python behavioural model of the register file (<module>_regs_model.py)")
+    parser.add_argument("--testbench", action="store_true", help="also generate a self-checking VHDL testbench (<module>_regs_tb.vhd)")
+    parser.add_argument("--estimate", action="store_true", help="report estimated synthesis resources and path lengths (<module>_regs_estimate.txt)")
+    parser.add_argument("--split-processes", choices=VhdlComponentGenerator.SPLIT_OPTIONS, help="write one register-write and one bus-read process per register or per register group, combined by an OR tree, instead of one of each")
+    parser.add_argument("--optimize-layout", action="store_true", help="re-allocate the automatically placed registers and memories to minimize the address span, with register groups in power-of-two aligned blocks, and report the address decoding figures")
+    parser.add_argument("--optimize-fields", action="store_true", help="move automatically placed read-only fields with the same \"pollGroup\" into as few registers as possible, and report the bus reads per polling cycle")
+    parser.add_argument("--compact-vhdl", action="store_true", help="generate a compact VHDL component: adjacent fields share one slice assignment, each strobe is set once and bit indexes are literals; reports the saved lines")
+    parser.add_argument("--systemverilog", action="store_true", help="also generate a SystemVerilog package and module (<module>_regs_pkg.sv, <module>_regs.sv)")
+    parser.add_argument("--decode-trace", metavar="TRACE", help="decode the bus transactions in the file TRACE into register and field names (<TRACE>_decoded.csv or .json)")
+    parser.add_argument("--trace-format", choices=TraceDecoder.FORMATS, default="csv", help="output format of --decode-trace: CSV, or JSON Lines with one object per transaction (default: csv)")
+    parser.add_argument("--save-model", metavar="FILE", help="save the elaborated register file to the binary model FILE, which can be given instead of the JSON specification to skip parsing and elaboration")
+    parser.add_argument("--template", metavar="NAME=FILE", action="append", default=[], help="replace the built-in template NAME (e.g. HTML_REGISTER_TEMPLATE) with the one in FILE; may be repeated")
+    parser.add_argument("--profile", action="store_true", help="report the wall time and peak memory growth of each phase")
+    parser.add_argument("--cprofile", metavar="FILE", help="dump cProfile statistics of the run to FILE (read with pstats)")
+    args = parser.parse_args(argv)
+
+    if profiler is None:
+        profiler = Profiler()
+    # the templates given with --template only apply to this run
+    builtin_templates = dict((name, globals()[name]) for name in USER_TEMPLATES)
+    for option in args.template:
+        name, _, filename = option.partition("=")
+        try:
+            load_template(name, filename)
+        except (ValueError, IOError) as ex:
+            globals().update(builtin_templates)
+            print "Error: %s" % ex
+            return -1
+    if args.cprofile:
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    try:
+        register_definition_file = args.register_definition_file
+
+        if is_model_file(register_definition_file):
+            # Load the saved elaborated model
+            module = profiler.run("load model", load_model, register_definition_file)
+        else:
+            if is_ipxact_file(register_definition_file):
+                # Convert the IP-XACT file
+                json_data = profiler.run("IP-XACT import", load_ipxact, register_definition_file)
+            else:
+                if profiler.run("ascii check", check_ascii, register_definition_file) > 0:
+                    return -1
+
+                # Load JSON file
+                json_data = profiler.run("json.load", load_json, register_definition_file)
+
+            # Validate the whole specification, reporting all problems at once
+            diagnostics = profiler.run("validate", validate, json_data)
+            if len(diagnostics) > 0:
+                for diagnostic in diagnostics:
+                    print "Error at %s" % diagnostic
+                print "%d error(s) found in '%s'" % (len(diagnostics), register_definition_file)
+                return -1
+            module = profiler.run("Module", Module, json_data, False)
+            profiler.run("elaborate", module.elaborate)
+            module.check()
+
+        # Optimize the address layout
+        if args.optimize_layout:
+            before = ResourceEstimator(module)
+            layout = module.auto_layout()
+            profiler.run("optimize layout", module.optimize_layout)
+            after = ResourceEstimator(module)
+            print after.layout_report(before)
+            if after.layout_cost() > before.layout_cost():
+                module.restore_layout(layout)
+                print "The optimized layout is worse, keeping the original layout"
+
+        # Regroup the fields that are polled together
+        if args.optimize_fields:
+            before = ResourceEstimator(module)
+            profiler.run("optimize fields", module.optimize_fields)
+            print ResourceEstimator(module).poll_report(before)
+
+        # Save the elaborated model
+        if args.save_model:
+            profiler.run("save model", save_model, module, args.save_model)
+
+        # Write HTML output
+        if args.html_pages:
+            generate(profiler, HtmlPagesGenerator, module, module.name + '_regs_html')
+        else:
+            generate(profiler, HtmlGenerator, module, module.name + '_regs.html')
 
         # Write C header
-        g = CHeaderGenerator(module)
-        g.save(module.name + '_regs.h')
+        generate(profiler, CHeaderGenerator, module, module.name + '_regs.h')
+
+        # Write C accessor header
+        if args.c_accessors:
+            generate(profiler, CAccessorHeaderGenerator, module, module.name + '_regs_access.h')
+
+        # Write configuration profiles
+        if len(module.profiles) > 0:
+            generate(profiler, CProfileGenerator, module, module.name + '_regs_profiles.h')
 
         # Write VHDL package
-        g = VhdlPackageGenerator(module)
-        g.save(module.name + '_regs_pkg.vhd')
+        generate(profiler, VhdlPackageGenerator, module, module.name + '_regs_pkg.vhd')
 
         # Write VHDL component
-        g = VhdlComponentGenerator(module)
-        g.save(module.name + '_regs.vhd')
-                            
-    except RegisterError as ex:
-        print "Error in register " + str(ex)
-    
-    except FieldError as ex:
-        print "Error in field " + str(ex)
-    
-    except ModuleError as ex:
-        print "Error in module " + str(ex)        
-
+        g = generate(profiler, VhdlComponentGenerator, module, module.name + '_regs.vhd', args.split_processes, args.compact_vhdl)
+        if args.compact_vhdl:
+            lines = g._code.count("\n")
+            full_lines = VhdlComponentGenerator(module, args.split_processes)._code.count("\n")
+            print "Compact VHDL component: %d lines instead of %d (%d fewer, %.1f%%)" % (lines, full_lines, full_lines - lines, 100.0 * (full_lines - lines) / full_lines)
+
+        # Write VHDL testbench
+        if args.testbench:
+            generate(profiler, VhdlTestbenchGenerator, module, module.name + '_regs_tb.vhd')
+
+        # Write SystemVerilog package and module
+        if args.systemverilog:
+            generate(profiler, SystemVerilogPackageGenerator, module, module.name + '_regs_pkg.sv')
+            generate(profiler, SystemVerilogModuleGenerator, module, module.name + '_regs.sv')
+
+        # Write Python register-access module
+        if args.python_module:
+            generate(profiler, PythonModuleGenerator, module, module.name + '_regs.py')
+
+        # Write resource estimate
+        if args.estimate:
+            g = generate(profiler, ResourceEstimator, module, module.name + '_regs_estimate.txt')
+            print g.report()
+
+        # Write Python behavioural model
+        if args.python_model:
+            generate(profiler, PythonModelGenerator, module, module.name + '_regs_model.py')
+
+        # Decode a bus trace
+        if args.decode_trace:
+            decoder = TraceDecoder(module, args.trace_format)
+            output_filename = os.path.splitext(args.decode_trace)[0] + "_decoded." + args.trace_format
+            profiler.run("decode trace", decoder.decode_file, args.decode_trace, output_filename)
+            print decoder.report(output_filename)
+
+    except RegisterError as ex:
+        print "Error in register " + str(ex)
+
+    except FieldError as ex:
+        print "Error in field " + str(ex)
+
+    except ModuleError as ex:
+        print "Error in module " + str(ex)
+
+    except MemoryBlockError as ex:
+        print "Error in memory " + str(ex)
+
+    except ProfileError as ex:
+        print "Error in profile " + str(ex)
+
+    except ModelError as ex:
+        print "Error in model file " + str(ex)
+
+    except IpxactError as ex:
+        print "Error in IP-XACT file " + str(ex)
+
+    except TraceError as ex:
+        print "Error in trace " + str(ex)
+
+    finally:
+        globals().update(builtin_templates)
+        if args.cprofile:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.cprofile)
+        if args.profile:
+            print profiler.report()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())